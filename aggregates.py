@@ -0,0 +1,237 @@
+import copy
+
+import pandas as pd
+import numpy as np
+
+
+# Bucket levels from finest to coarsest: pandas period frequency and approximate days per bucket
+trend_levels = {
+    "week":("W", 7),
+    "month":("M", 30.4),
+    "season":("Q", 91.3)
+}
+
+level_labels = {"round":"Per Round", "week":"Weekly", "month":"Monthly", "season":"Seasonal (Quarterly)"}
+
+stats = ["sum", "count", "min", "max"]
+
+# Re-ranked for every earlier round whenever a round is added, so it can't be merged incrementally
+unaggregated = ["counting_rank"]
+
+
+
+class TrendPyramid:
+    """
+    Weekly, monthly and seasonal sum/count/min/max of every metric for every player. Sums and counts rather than means so
+    new rounds merge in exactly, and a trend query reads one row per player per bucket instead of one per round
+    """
+
+    def __init__(self, metrics:list):
+        self.metrics = list(metrics)
+        self.tables = {level:None for level in trend_levels}
+        self.first_date = None
+        self.last_date = None
+
+        # Levels whose table is shared with another fork, copied before their buckets are changed in place
+        self._shared = set()
+
+    @classmethod
+    def from_rounds(cls, data:pd.DataFrame, metrics:list=None):
+        """
+        Build every level from a full round history
+
+        Args:
+        -------------
+        data:pd.DataFrame | source of data
+        metrics:list | numeric columns to aggregate, defaults to every numeric column except those in unaggregated
+
+        Returns:
+        -------------
+        pyramid:TrendPyramid | populated aggregates
+        """
+
+        if metrics is None:
+            metrics = [c for c in data.select_dtypes("number").columns if data[c].notna().any() and c not in unaggregated]
+        pyramid = cls(metrics)
+        pyramid.update(data)
+        return pyramid
+
+    def fork(self):
+        """
+        Pyramid for the next version of the data that shares this one's tables. A level's table is only copied when an
+        update changes buckets it already has, new buckets are added to a new table either way
+
+        Returns:
+        -------------
+        pyramid:TrendPyramid | pyramid that update() can extend without changing this one
+        """
+        fork = copy.copy(self)
+        fork.tables = dict(self.tables)
+        fork._shared = {level for level, table in self.tables.items() if table is not None}
+        self._shared = set(fork._shared)
+        return fork
+
+    def _bucket(self, rounds:pd.DataFrame, level:str) -> pd.DataFrame:
+        """
+        Aggregate rounds into one level's buckets with one scatter-add per statistic across every metric at once.
+        Columns are (metric, stat), all float so the table is a single block that can be updated in place
+        """
+
+        freq, _ = trend_levels[level]
+        keys = pd.MultiIndex.from_arrays([rounds["name"], rounds["date"].dt.to_period(freq).dt.start_time], names=["name", "bucket"])
+        codes, buckets = pd.factorize(keys)
+        buckets = buckets.set_names(keys.names)
+
+        values = rounds.reindex(columns=self.metrics).to_numpy(dtype=float)
+        totals = np.zeros((len(stats), len(buckets), len(self.metrics)))
+        totals[2], totals[3] = np.inf, -np.inf
+        np.add.at(totals[0], codes, np.nan_to_num(values))
+        np.add.at(totals[1], codes, ~np.isnan(values))
+        np.fmin.at(totals[2], codes, values)
+        np.fmax.at(totals[3], codes, values)
+
+        return self._frame(totals, buckets)
+
+    def _frame(self, totals:np.ndarray, buckets:pd.MultiIndex) -> pd.DataFrame:
+        """
+        stats x buckets x metrics array -> buckets x (metric, stat) frame, nan min/max for buckets without values
+        """
+        totals[2:, totals[1] == 0] = np.nan
+        columns = pd.MultiIndex.from_product([self.metrics, stats])
+        return pd.DataFrame(totals.transpose(1, 2, 0).reshape(len(buckets), -1), index=buckets, columns=columns)
+
+    def update(self, rounds:pd.DataFrame):
+        """
+        Merge newly recorded rounds into every level. Only the buckets the new rounds fall in change
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | new rows of round data, rounds already added should not be passed again
+        """
+
+        rounds = rounds.dropna(subset="date")
+        if rounds.empty:
+            return
+
+        self.first_date = min(filter(None, [self.first_date, rounds["date"].min()]))
+        self.last_date = max(filter(None, [self.last_date, rounds["date"].max()]))
+
+        for level in trend_levels:
+            new = self._bucket(rounds, level)
+            table = self.tables[level]
+            if table is None:
+                self.tables[level] = new.sort_index()
+                continue
+
+            # Combine the touched buckets with their stored totals in place, only brand new buckets grow the table
+            positions = table.index.get_indexer(new.index)
+            touched = positions >= 0
+            if touched.any():
+                if level in self._shared:
+                    table = table.copy()
+                    self.tables[level] = table
+                    self._shared.discard(level)
+
+                shape = (-1, len(self.metrics), len(stats))
+                stored = table.to_numpy()[positions[touched]].reshape(shape)
+                added = new.to_numpy()[touched].reshape(shape)
+                stored[..., :2] += added[..., :2]
+                stored[..., 2] = np.fmin(stored[..., 2], added[..., 2])
+                stored[..., 3] = np.fmax(stored[..., 3], added[..., 3])
+                table.iloc[positions[touched]] = stored.reshape(touched.sum(), -1)
+
+            if not touched.all():
+                self.tables[level] = pd.concat([table, new.loc[~touched]]).sort_index()
+                self._shared.discard(level)
+
+    def rounds_in_range(self, start=None, end=None, metric:str=None) -> pd.Series:
+        """
+        Rounds each player has in a date range, read from the weekly counts rather than the rounds themselves. Weeks that
+        straddle either end of the range count in full, so this can overcount by up to a week of rounds at each end
+
+        Args:
+        -------------
+        start:date-like | first date of the range, defaults to the first round
+        end:date-like | last date of the range, defaults to the last round
+        metric:str | count only rounds with a value for this metric, defaults to rounds with a value for any metric
+
+        Returns:
+        -------------
+        rounds:pd.Series | number of rounds indexed by player name, players without rounds in the range left out
+        """
+
+        weekly = self.tables["week"]
+        if weekly is None or (metric is not None and metric not in self.metrics):
+            return pd.Series(dtype=float)
+
+        start = pd.Timestamp(start) if start is not None else self.first_date
+        end = pd.Timestamp(end) if end is not None else self.last_date
+
+        buckets = weekly.index.get_level_values("bucket")
+        in_range = weekly.loc[(buckets >= start - pd.Timedelta(days=6)) & (buckets <= end)]
+        counts = in_range[metric]["count"] if metric is not None else in_range.xs("count", axis=1, level=1).max(axis=1)
+        rounds = counts.groupby(level="name").sum()
+        return rounds.loc[rounds > 0]
+
+    def choose_level(self, start=None, end=None, max_points:int=60, metric:str=None) -> str:
+        """
+        Finest level that keeps each player's line under max_points: the raw rounds if there are few enough, otherwise the
+        first bucket size with few enough buckets in the date range
+
+        Args:
+        -------------
+        start:date-like | first date of the range, defaults to the first round
+        end:date-like | last date of the range, defaults to the last round
+        max_points:int | most points to draw per player
+        metric:str | metric being drawn, only its rounds count toward max_points, see rounds_in_range()
+
+        Returns:
+        -------------
+        level:str | "round", "week", "month" or "season"
+        """
+
+        rounds = self.rounds_in_range(start, end, metric)
+        if rounds.empty or rounds.max() <= max_points:
+            return "round"
+
+        start = pd.Timestamp(start) if start is not None else self.first_date
+        end = pd.Timestamp(end) if end is not None else self.last_date
+
+        span = (end - start).days + 1
+        for level, (_, days) in trend_levels.items():
+            if span / days <= max_points:
+                return level
+        return "season"
+
+    def query(self, metric:str, level:str, start=None, end=None) -> pd.DataFrame:
+        """
+        One level's aggregates of a metric over a date range
+
+        Args:
+        -------------
+        metric:str | metric to read
+        level:str | "week", "month" or "season"
+        start:date-like | first date of the range
+        end:date-like | last date of the range
+
+        Returns:
+        -------------
+        trend:pd.DataFrame | columns: name, date (bucket start), mean, min, max, count, only buckets with rounds
+        """
+
+        table = self.tables[level]
+        if table is None:
+            return pd.DataFrame(columns=["name", "date", "mean", "min", "max", "count"])
+
+        values = table[metric]
+        buckets = values.index.get_level_values("bucket")
+        keep = values["count"] > 0
+        if start is not None:
+            keep &= buckets >= pd.Period(pd.Timestamp(start), trend_levels[level][0]).start_time
+        if end is not None:
+            keep &= buckets <= pd.Timestamp(end)
+
+        values = values.loc[keep]
+        trend = pd.DataFrame({"mean":values["sum"] / values["count"], "min":values["min"], "max":values["max"],
+                              "count":values["count"].astype(int)})
+        return trend.reset_index().rename(columns={"bucket":"date"})
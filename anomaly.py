@@ -0,0 +1,147 @@
+import pandas as pd
+import numpy as np
+
+from utils import player_order, differential_windows
+
+
+# Scales the median absolute deviation to a standard deviation for normally distributed differentials
+MAD_SCALE = 1.4826
+
+anomaly_labels = {
+    "robust_z":"Robust Z-Score",
+    "trend_z":"Recent Form Z-Score",
+    "suspicious_round":"Suspicious Round",
+    "inflated_round":"Inflated Differential",
+    "money_spike":"Unusually Low in a Money Match",
+    "suspicious_trend":"Sustained Inflation"
+}
+
+
+def _row_medians(windows:np.ndarray):
+    """
+    Median of the valid values in each row of a nan-padded array, from one row-wise sort
+
+    Returns:
+    -------------
+    medians:np.ndarray | median of each row, nan for rows without values
+    n:np.ndarray | number of valid values in each row
+    """
+
+    ordered = np.sort(windows, axis=1)
+    n = (~np.isnan(windows)).sum(axis=1)
+    rows = np.arange(len(windows))
+    lower = np.maximum((n - 1) // 2, 0)
+    upper = np.minimum(n // 2, windows.shape[1] - 1)
+
+    medians = np.where(n > 0, (ordered[rows, lower] + ordered[rows, upper]) / 2, np.nan)
+    return medians, n
+
+
+def rolling_robust_z(data:pd.DataFrame, column:str="handicap_diff", window:int=20, min_rounds:int=5) -> pd.Series:
+    """
+    How far each round is from the player's form going into it: (value - median) / (1.4826 x MAD) over the player's previous rounds.
+    Median and MAD aren't dragged around by the outliers being looked for, unlike a mean and standard deviation
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    column:str | variable to score
+    window:int | number of previous rounds that make up a player's form
+    min_rounds:int | previous rounds required before a round is scored
+
+    Returns:
+    -------------
+    z:pd.Series | robust z-score aligned with data, nan for rounds without enough history or without a value
+    """
+
+    rounds = data.dropna(subset=column)
+    order, codes, _ = player_order(rounds)
+    values = rounds[column].to_numpy(dtype=float)[order]
+
+    # Each round's window of the player's rounds up to and including it, the form is every column but the last
+    prior = differential_windows(values, codes, window=window + 1)[:, :-1]
+    medians, n = _row_medians(prior)
+    mad, _ = _row_medians(np.abs(prior - medians[:, None]))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where((n >= min_rounds) & (mad > 0), (values - medians) / (MAD_SCALE * mad), np.nan)
+
+    unsorted = np.empty(len(rounds))
+    unsorted[order] = z
+
+    return pd.Series(unsorted, index=rounds.index, name="robust_z").reindex(data.index)
+
+
+def detect_anomalies(data:pd.DataFrame, window:int=20, min_rounds:int=5, z_threshold:float=3.0, trend_window:int=5,
+                     trend_threshold:float=1.0) -> pd.DataFrame:
+    """
+    Flag rounds and stretches of rounds that look out of line with a player's form, for every player in one grouped pass.
+    Sandbagging shows up as differentials posted well above form, which inflate the handicap index, and as rounds well below form
+    in matches where money was won
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    window:int | number of previous rounds that make up a player's form
+    min_rounds:int | previous rounds required before a round is scored
+    z_threshold:float | robust z-score beyond which a single round is suspicious
+    trend_window:int | number of most recent rounds averaged for the trend score
+    trend_threshold:float | average robust z-score over trend_window rounds beyond which a player's recent form is suspicious
+
+    Returns:
+    -------------
+    flags:pd.DataFrame | aligned with data, columns:
+                         robust_z - see rolling_robust_z()
+                         trend_z - average robust z-score of the player's last trend_window scored rounds
+                         suspicious_round - |robust_z| at or beyond z_threshold
+                         inflated_round - differential z_threshold or more above form
+                         money_spike - differential z_threshold or more below form in a round with money won
+                         suspicious_trend - differentials consistently above form over the last trend_window rounds
+    """
+
+    z = rolling_robust_z(data, "handicap_diff", window, min_rounds)
+
+    # Trend score over each player's most recent scored rounds, from the same grouped windows
+    scored = z.dropna()
+    order, codes, _ = player_order(data.loc[scored.index])
+    recent = differential_windows(scored.to_numpy()[order], codes, window=trend_window)
+    full = ~np.isnan(recent).any(axis=1)
+    trend = np.full(len(scored), np.nan)
+    trend[order[full]] = recent[full].mean(axis=1)
+    trend = pd.Series(trend, index=scored.index).reindex(data.index)
+
+    won = data["profit/loss"].fillna(0) > 0 if "profit/loss" in data.columns else pd.Series(False, index=data.index)
+
+    flags = pd.DataFrame({
+        "robust_z":z,
+        "trend_z":trend,
+        "suspicious_round":z.abs() >= z_threshold,
+        "inflated_round":z >= z_threshold,
+        "money_spike":(z <= -z_threshold) & won,
+        "suspicious_trend":trend >= trend_threshold
+    }, index=data.index)
+
+    return flags
+
+
+def flagged_rounds(data:pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """
+    Rounds with at least one anomaly flag, most recent first
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    **kwargs | passed to detect_anomalies()
+
+    Returns:
+    -------------
+    flagged:pd.DataFrame | the flagged rounds' name, date, course, differential and profit/loss, followed by their flags
+    """
+
+    flags = detect_anomalies(data, **kwargs)
+    any_flag = flags[["suspicious_round", "money_spike", "suspicious_trend"]].any(axis=1)
+
+    columns = [c for c in ["name", "date", "golf_course", "handicap_diff", "profit/loss"] if c in data.columns]
+    flagged = data.loc[any_flag, columns].join(flags.loc[any_flag])
+
+    return flagged.sort_values("date", ascending=False)
@@ -0,0 +1,209 @@
+import json
+import os
+import uuid
+
+import pandas as pd
+import numpy as np
+
+from utils import get_handicaps
+from aggregates import TrendPyramid, stats
+
+
+# Bumped whenever the derived columns are computed differently, so snapshots written by older code are recomputed
+SNAPSHOT_FORMAT = 2
+META_FILE = "meta.json"
+
+
+def snapshot_dir(path:str) -> str:
+    """
+    Directory holding the snapshot of a round data file, "real_data.csv" -> "real_data.csv.snapshot"
+    """
+    return f"{path}.snapshot"
+
+
+def source_stamp(path:str) -> list:
+    """
+    [modification time, size] of the round data file, the version a snapshot was computed from
+    """
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _encode(values:pd.Series):
+    """
+    Column -> (array to save, meta). Numbers, dates and flags are saved as they are, text as integer codes into a list of
+    labels kept in the meta, with -1 for missing
+
+    Returns:
+    -------------
+    array:np.ndarray | fixed-width array for the .npy file
+    meta:dict | dtype, and the labels for text columns
+    """
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").view("int64"), {"dtype":"datetime64[ns]"}
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        array = values.to_numpy()
+        return array, {"dtype":array.dtype.str}
+
+    codes, labels = pd.factorize(values)
+    return codes.astype(np.int32), {"dtype":"labels", "labels":labels.tolist()}
+
+
+def _decode(array:np.ndarray, meta:dict) -> np.ndarray:
+    """
+    Inverse of _encode(), numeric and date columns stay views of the mapped file
+    """
+
+    if meta["dtype"] == "datetime64[ns]":
+        return array.view("datetime64[ns]")
+    if meta["dtype"] == "labels":
+        # Missing (-1) indexes the nan appended after the labels
+        return np.array(meta["labels"] + [np.nan], dtype=object)[array]
+    return array
+
+
+def write_snapshot(data:pd.DataFrame, trends:TrendPyramid, path:str, stamp:list, handicaps:bool=True):
+    """
+    Save every column of the round data, its row labels and the trend aggregates as .npy files next to the data file. The row
+    labels are the rounds' rows in the data file, which the notes index is keyed on. The arrays are written
+    under a fresh token first and meta.json is replaced last, so a reader sees either the old snapshot or the new one
+
+    Args:
+    -------------
+    data:pd.DataFrame | round data with derived columns computed
+    trends:TrendPyramid | trend aggregates of data
+    path:str | location of the round data file the snapshot was computed from
+    stamp:list | source_stamp() of that file, taken before it was read
+    handicaps:bool | whether handicaps were recomputed from the differentials
+    """
+
+    directory = snapshot_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    token = uuid.uuid4().hex[:12]
+    save = lambda name, array: np.save(os.path.join(directory, f"{token}.{name}.npy"), np.ascontiguousarray(array))
+
+    columns = {}
+    for idx, column in enumerate(data.columns):
+        array, columns[column] = _encode(data[column])
+        save(f"col{idx}", array)
+    array, index = _encode(data.index.to_series())
+    save("index", array)
+
+    levels = {}
+    for level, table in trends.tables.items():
+        if table is None:
+            continue
+        names, buckets = table.index.get_level_values("name"), table.index.get_level_values("bucket")
+        codes, labels = pd.factorize(names)
+        save(f"{level}_values", table.to_numpy(dtype=float))
+        save(f"{level}_names", codes.astype(np.int32))
+        save(f"{level}_buckets", buckets.to_numpy(dtype="datetime64[ns]").view("int64"))
+        levels[level] = labels.tolist()
+
+    meta = {"format":SNAPSHOT_FORMAT, "source":stamp, "handicaps":handicaps, "token":token, "rows":len(data),
+            "columns":list(columns), "dtypes":list(columns.values()), "index":index,
+            "trends":{"metrics":trends.metrics, "levels":levels,
+                      "first_date":None if trends.first_date is None else str(trends.first_date),
+                      "last_date":None if trends.last_date is None else str(trends.last_date)}}
+
+    tmp = os.path.join(directory, f".{token}.{META_FILE}")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, META_FILE))
+
+    # Earlier snapshots' arrays, readers that still have them mapped keep their pages until they let go
+    for entry in os.listdir(directory):
+        if entry.endswith(".npy") and not entry.startswith(f"{token}."):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+
+def read_snapshot(path:str, handicaps:bool=True):
+    """
+    Open the snapshot of a round data file without copying its arrays: numeric and date columns are copy-on-write memory maps,
+    so pages are read from disk as the dashboard touches them and changes never reach the file
+
+    Args:
+    -------------
+    path:str | location of the round data file
+    handicaps:bool | whether the snapshot must have handicaps recomputed from the differentials
+
+    Returns:
+    -------------
+    snapshot:tuple|None | (data, trends), None if there is no snapshot or the data file has changed since it was written
+    """
+
+    directory = snapshot_dir(path)
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        if (meta["format"] != SNAPSHOT_FORMAT or meta["source"] != source_stamp(path) or meta["handicaps"] != handicaps):
+            return None
+
+        # Plain ndarray views of the maps, so values pulled out of the frame behave like any other array
+        load = lambda name: np.asarray(np.load(os.path.join(directory, f"{meta['token']}.{name}.npy"), mmap_mode="c"))
+        data = pd.DataFrame({column:_decode(load(f"col{idx}"), dtype)
+                             for idx, (column, dtype) in enumerate(zip(meta["columns"], meta["dtypes"]))},
+                            columns=meta["columns"], copy=False)
+        data.index = pd.Index(_decode(load("index"), meta["index"]))
+
+        trends = TrendPyramid(meta["trends"]["metrics"])
+        trends.first_date = pd.Timestamp(meta["trends"]["first_date"]) if meta["trends"]["first_date"] else None
+        trends.last_date = pd.Timestamp(meta["trends"]["last_date"]) if meta["trends"]["last_date"] else None
+        columns = pd.MultiIndex.from_product([trends.metrics, stats])
+        for level, labels in meta["trends"]["levels"].items():
+            index = pd.MultiIndex.from_arrays([np.array(labels, dtype=object)[load(f"{level}_names")],
+                                               load(f"{level}_buckets").view("datetime64[ns]")], names=["name", "bucket"])
+            trends.tables[level] = pd.DataFrame(load(f"{level}_values"), index=index, columns=columns, copy=False)
+
+    except (OSError, ValueError, KeyError):
+        # Missing, half-deleted or unreadable snapshots are recomputed
+        return None
+
+    return data, trends
+
+
+def load_rounds(path:str, columns:list=None, handicaps:bool=True) -> tuple:
+    """
+    Round data with its derived columns and trend aggregates, from the snapshot when it matches the data file, otherwise
+    computed from the file and snapshotted for the next cold start
+
+    Args:
+    -------------
+    path:str | location of the round data file
+    columns:list | columns of the round data, in order
+    handicaps:bool | whether to recompute handicaps from the differentials, otherwise the file's handicaps are kept
+
+    Returns:
+    -------------
+    data:pd.DataFrame | round data
+    trends:TrendPyramid | trend aggregates of the round data
+    """
+
+    snapshot = read_snapshot(path, handicaps)
+    if snapshot is not None:
+        data, trends = snapshot
+        if columns is not None and list(data.columns) != list(columns):
+            data = data.reindex(columns=columns)
+        return data, trends
+
+    stamp = source_stamp(path)
+    data = pd.read_csv(path, parse_dates=["date"])
+    if columns is not None:
+        data = data.reindex(columns=columns)
+    if handicaps and data["handicap_diff"].notna().any():
+        data = get_handicaps(data)
+    trends = TrendPyramid.from_rounds(data)
+
+    try:
+        write_snapshot(data, trends, path, stamp, handicaps)
+    except (OSError, TypeError):
+        # Read-only directories or labels that can't be saved as JSON, the app still runs from the data file
+        pass
+
+    return data, trends
@@ -0,0 +1,237 @@
+import warnings
+
+import pandas as pd
+import numpy as np
+
+from utils import handicap_differentials, update_handicaps
+
+
+def load_courses(path:str="courses.csv") -> pd.DataFrame:
+    """
+    Load the course/tee registry
+
+    Args:
+    -------------
+    path:str | location of the registry file
+
+    Returns:
+    -------------
+    courses:pd.DataFrame | one row per course and tee, indexed by course_id
+    """
+    return pd.read_csv(path, index_col="course_id")
+
+
+def save_courses(courses:pd.DataFrame, path:str="courses.csv"):
+    """
+    Write the course/tee registry back to disk
+
+    Args:
+    -------------
+    courses:pd.DataFrame | registry indexed by course_id
+    path:str | location of the registry file
+    """
+    courses.sort_index().to_csv(path)
+
+
+def register_course(courses:pd.DataFrame, golf_course:str, course_rating:float, slope_rating:float, tee:str="Standard",
+                    par:int=np.nan):
+    """
+    Add a course/tee to the registry, or find it if it is already there with the same ratings
+
+    Args:
+    -------------
+    courses:pd.DataFrame | registry indexed by course_id
+    golf_course:str | name of the course
+    course_rating:float | course rating found on the scorecard
+    slope_rating:float | slope rating found on the scorecard
+    tee:str | name of the set of tees
+    par:int | par for the tees, used for the course rating - par term of course handicaps. Registering tees without it warns,
+              and a par given for registered tees that have none fills it in
+
+    Returns:
+    -------------
+    courses:pd.DataFrame | registry including the course/tee
+    course_id:int | id for rounds to reference
+
+    Errors
+    -----------
+    ValueError if the course/tee is registered with a different course rating, slope rating or par, see correct_course()
+    """
+
+    match = courses.loc[(courses["golf_course"] == golf_course) & (courses["tee"] == tee)]
+    if not match.empty:
+        course_id = int(match.index[0])
+        registered = courses.loc[course_id]
+        given = {"course_rating":course_rating, "slope_rating":slope_rating, "par":par}
+        conflicts = {column:(registered[column], value) for column, value in given.items()
+                     if pd.notna(value) and pd.notna(registered[column]) and not np.isclose(registered[column], value)}
+        if conflicts:
+            details = ", ".join(f"{column} {old} registered, {new} given" for column, (old, new) in conflicts.items())
+            raise ValueError(f"{golf_course} ({tee}) is already registered as course_id {course_id} with different values: {details}. "
+                             "Use correct_course() to change its ratings")
+
+        if pd.notna(par) and pd.isna(registered["par"]):
+            courses = courses.copy()
+            courses.loc[course_id, "par"] = par
+        return courses, course_id
+
+    if pd.isna(par):
+        warnings.warn(f"{golf_course} ({tee}) registered without a par, its course handicaps will leave out Course Rating - Par",
+                      stacklevel=2)
+
+    course_id = int(courses.index.max()) + 1 if len(courses) else 1
+    courses = courses.copy()
+    courses.loc[course_id] = {"golf_course":golf_course, "tee":tee, "course_rating":course_rating,
+                              "slope_rating":slope_rating, "par":par}
+    return courses, course_id
+
+
+def attach_course_ids(data:pd.DataFrame, courses:pd.DataFrame) -> pd.DataFrame:
+    """
+    Fill in course_id for rounds entered before the registry, matching on course name, course rating and slope rating
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    courses:pd.DataFrame | registry indexed by course_id
+
+    Returns:
+    -------------
+    data:pd.DataFrame | copy of the data with a course_id column, nan where no registered tee matches
+    """
+
+    keys = ["golf_course", "course_rating", "slope_rating"]
+    lookup = courses.reset_index().drop_duplicates(keys)[keys + ["course_id"]]
+    matched = data[keys].merge(lookup, on=keys, how="left")["course_id"].to_numpy()
+
+    data = data.copy()
+    if "course_id" in data.columns:
+        data["course_id"] = data["course_id"].fillna(pd.Series(matched, index=data.index))
+    else:
+        data["course_id"] = matched
+    return data
+
+
+def apply_course_ratings(data:pd.DataFrame, courses:pd.DataFrame) -> pd.DataFrame:
+    """
+    Look up course and slope ratings for rounds that reference a course_id
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data with a course_id column
+    courses:pd.DataFrame | registry indexed by course_id
+
+    Returns:
+    -------------
+    data:pd.DataFrame | copy of the data with ratings taken from the registry where a course_id is present
+    """
+
+    data = data.copy()
+    for column in ["course_rating", "slope_rating"]:
+        data[column] = data["course_id"].map(courses[column]).fillna(data[column])
+    return data
+
+
+def course_handicaps(indexes:pd.Series, courses:pd.DataFrame) -> pd.DataFrame:
+    """
+    Course handicap of every player on every course/tee in one broadcast:
+    Handicap Index x Slope Rating / 113 + (Course Rating - Par). The par term is left out for tees without a par
+
+    Args:
+    -------------
+    indexes:pd.Series | current handicap index indexed by player name, e.g. utils.current_handicaps()
+    courses:pd.DataFrame | registry indexed by course_id
+
+    Returns:
+    -------------
+    handicaps:pd.DataFrame | players x course_id matrix of unrounded course handicaps
+    """
+
+    if courses["par"].isna().any():
+        missing = courses.loc[courses["par"].isna(), ["golf_course", "tee"]].agg(" ".join, axis=1).tolist()
+        warnings.warn(f"No par registered for {', '.join(missing)}, their course handicaps leave out Course Rating - Par",
+                      stacklevel=2)
+
+    slope = courses["slope_rating"].to_numpy(dtype=float)
+    rating_adj = (courses["course_rating"] - courses["par"]).fillna(0).to_numpy(dtype=float)
+    values = indexes.to_numpy(dtype=float)[:, None] * slope[None, :] / 113 + rating_adj[None, :]
+
+    return pd.DataFrame(values, index=indexes.index, columns=courses.index)
+
+
+def playing_handicaps(indexes:pd.Series, courses:pd.DataFrame, allowance:float=0.95) -> pd.DataFrame:
+    """
+    Playing handicap of every player on every course/tee: the course handicap times the format's allowance, rounded
+
+    Args:
+    -------------
+    indexes:pd.Series | current handicap index indexed by player name
+    courses:pd.DataFrame | registry indexed by course_id
+    allowance:float | handicap allowance for the format, e.g. 0.95 for individual stroke play, 1.0 for match play
+
+    Returns:
+    -------------
+    handicaps:pd.DataFrame | players x course_id matrix of whole-stroke playing handicaps
+    """
+    return np.rint(course_handicaps(indexes, courses) * allowance).astype(int)
+
+
+def stroke_allocation(playing:pd.DataFrame) -> pd.DataFrame:
+    """
+    Strokes each player receives from the lowest playing handicap in the group, for every course/tee
+
+    Args:
+    -------------
+    playing:pd.DataFrame | players x course_id output of playing_handicaps()
+
+    Returns:
+    -------------
+    strokes:pd.DataFrame | players x course_id matrix of strokes received
+    """
+    return playing - playing.min(axis=0)
+
+
+def correct_course(data:pd.DataFrame, courses:pd.DataFrame, course_id:int, course_rating:float=None, slope_rating:float=None):
+    """
+    Correct a course/tee's ratings and recompute only what depends on them: the differentials of rounds played on those tees,
+    then the handicaps of the players involved from their earliest affected round onward
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    courses:pd.DataFrame | registry indexed by course_id
+    course_id:int | id of the course/tee being corrected
+    course_rating:float | corrected course rating, None to leave as is
+    slope_rating:float | corrected slope rating, None to leave as is
+
+    Returns:
+    -------------
+    data:pd.DataFrame | copy of the data with corrected ratings, differentials and handicaps
+    courses:pd.DataFrame | copy of the registry with the corrected ratings
+    report:dict | number of rounds and handicaps recomputed, and the players affected
+    """
+
+    if course_id not in courses.index:
+        raise KeyError(f"course_id {course_id} is not in the course registry")
+
+    # Match rounds against the ratings they were recorded with, before the registry changes
+    data = attach_course_ids(data, courses)
+
+    courses = courses.copy()
+    if course_rating is not None:
+        courses.loc[course_id, "course_rating"] = course_rating
+    if slope_rating is not None:
+        courses.loc[course_id, "slope_rating"] = slope_rating
+
+    affected = data["course_id"] == course_id
+    data.loc[affected, ["course_rating", "slope_rating"]] = courses.loc[course_id, ["course_rating", "slope_rating"]].to_numpy()
+    data.loc[affected, "handicap_diff"] = handicap_differentials(data.loc[affected])
+
+    players = data.loc[affected, "name"].unique().tolist()
+    n_handicaps = 0
+    if players:
+        data, n_handicaps = update_handicaps(data, players, data.loc[affected, "date"].min())
+
+    report = {"rounds":int(affected.sum()), "handicaps":n_handicaps, "players":players}
+
+    return data, courses, report
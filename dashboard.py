@@ -4,17 +4,41 @@ import plotly.express as px
 import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import streamlit as st
-from utils import add_round, get_handicaps, fill_handicaps, plot_statistics, histplot, pie_chart, dist_plot, rolling_avg, scatter, mean_med_stats, find_round, handicap_differentials, total_profit, agg_features_by_cat, add_border
-
-
-def dashboard(data):
+from utils import add_round, get_handicaps, counting_differentials, fill_handicaps, plot_statistics, plot_bucketed_statistics, histplot, pie_chart_counts, pie_charts, dist_plot, rolling_avg, scatter, mean_med_stats, find_round, handicap_differentials, total_profit, agg_features_by_cat, head_to_head_heatmap, add_border, num_names, cat_names
+from head_to_head import h2h_labels
+from simulation import simulate_match, match_formats
+from anomaly import flagged_rounds, anomaly_labels
+from settlement import settle, settlement_methods
+from notes_index import NotesIndex
+from aggregates import TrendPyramid, level_labels
+from skill_model import SkillModel
+from forecast import HandicapForecast
+from leaderboard import Leaderboard, leaderboard_metrics
+
+
+def dashboard(data, notes_index:NotesIndex=None, trends:TrendPyramid=None, skills:SkillModel=None, forecast:HandicapForecast=None,
+              leaderboard:Leaderboard=None):
     """
     Display plots and input options for the simulated data
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    notes_index:NotesIndex | index over data's notes, built in memory if not supplied
+    trends:TrendPyramid | weekly/monthly/seasonal aggregates of data, built in memory if not supplied
+    skills:SkillModel | player skill / course difficulty fit to data, fitted in memory if not supplied
+    forecast:HandicapForecast | handicap forecasting state for data, fitted in memory if not supplied and a forecast is shown
+    leaderboard:Leaderboard | players ranked by handicap, profit/loss and recent form, built in memory if not supplied
     """
 
     # Data load
     if "df" not in st.session_state:
         data = pd.read_csv("synthetic_data.csv", parse_dates=["date"])   
+        notes_index = None
+        trends = None
+        skills = None
+        forecast = None
+        leaderboard = None
 
     # Colors for plots to avoid repeating colors
     color_map = dict(zip([name for name in data["name"].unique()], px.colors.qualitative.Vivid))
@@ -43,9 +67,6 @@ def dashboard(data):
     reverse_labels = {val:key for key, val in label_dict.items()}
 
     # Numerical Features
-    num_names = ["putts", "3_putts", "fairways_hit", "gir", "penalty/ob", "birdies", "trpl_bogeys_plus", "adj_gross_score", "profit/loss"]
-    cat_names = ["golf_course", "match_format", "opponent/s"]
-
     num_features = [label_dict[i] for i in num_names]
     cat_features = [label_dict[j] for j in cat_names]
 
@@ -61,54 +82,32 @@ def dashboard(data):
             <b><u><i>Up-To-Date Player Handicaps:</i></u></b>
             </div>""", unsafe_allow_html=True)
     
-    # finding unique players with valid handicaps
-    names = data.dropna(subset="handicap")["name"].unique()
-    col1, col2, col3 = st.columns(3)
-    
-    # Create a column for each player with their most up-to-date handicap
-    for idx, name in enumerate(names):
-        if idx % 3 == 0:
-            with col1:
-                
-                # Find the most recent value of "handicap" for the current name
-                recent_handicap = data.loc[data['name'] == name, 'handicap'].iloc[-1]
-    
-                # Display that player's handicap
-                st.markdown(f"""
-            <div style="text-align: center;">
-                <h2 style="font-size:35px; color: #40a3ff;">{name}</h2>
-                <h2 style="font-size:30px; color: #cc0000;">{recent_handicap:.4f}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-                st.markdown("""<hr style="border: 2px solid #e5e4e2">""", unsafe_allow_html=True)
-                
-        elif idx % 3 == 1:
-            with col2:
-                # Find the most recent value of "handicap" for the current name
-                recent_handicap = data.loc[data['name'] == name, 'handicap'].iloc[-1]
+    # Every player with a handicap gets a tile, ordered by current handicap
+    if leaderboard is None:
+        leaderboard = Leaderboard.from_rounds(data)
+    tile_cols = st.columns(3)
     
-                # Display that player's handicap
-                st.markdown(f"""
-            <div style="text-align: center;">
-                <h2 style="font-size:35px; color: #40a3ff;">{name}</h2>
-                <h2 style="font-size:30px; color: #cc0000;">{recent_handicap:.4f}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-                st.markdown("""<hr style="border: 2px solid #e5e4e2">""", unsafe_allow_html=True)
-
-        else:
-            with col3:
-                # Find the most recent value of "handicap" for the current name
-                recent_handicap = data.loc[data['name'] == name, 'handicap'].iloc[-1]
-    
-                # Display that player's handicap
-                st.markdown(f"""
-            <div style="text-align: center;">
-                <h2 style="font-size:35px; color: #40a3ff;">{name}</h2>
-                <h2 style="font-size:30px; color: #cc0000;">{recent_handicap:.4f}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-                st.markdown("""<hr style="border: 2px solid #e5e4e2">""", unsafe_allow_html=True)
+    for idx, (rank, name, recent_handicap) in enumerate(leaderboard.top("handicap", k=None).itertuples(index=False)):
+        with tile_cols[idx % 3]:
+            st.markdown(f"""
+        <div style="text-align: center;">
+            <h2 style="font-size:35px; color: #40a3ff;">#{rank} {name}</h2>
+            <h2 style="font-size:30px; color: #cc0000;">{recent_handicap:.4f}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+            st.markdown("""<hr style="border: 2px solid #e5e4e2">""", unsafe_allow_html=True)
+
+    # Full standings and any player's ranks, read straight off the leaderboard
+    with st.expander("Leaderboard"):
+        board_metric = st.radio("Rank players by:", [*leaderboard_metrics.keys()], horizontal=True,
+                                format_func=lambda m: leaderboard_metrics[m][0])
+        board_size = st.number_input("Number of players:", min_value=1, max_value=max(len(leaderboard), 1), value=min(10, max(len(leaderboard), 1)))
+        st.dataframe(leaderboard.top(board_metric, k=board_size).rename(
+                        columns={"rank":"Rank", "name":"Player", "value":leaderboard_metrics[board_metric][0]}), hide_index=True)
+
+        board_player = st.selectbox("Find a player:", sorted(data["name"].dropna().unique()))
+        for metric, (rank, value) in leaderboard.ranks(board_player).items():
+            st.write(f"{leaderboard_metrics[metric][0]}: " + (f"#{rank} of {leaderboard.n_ranked(metric)} ({value:.2f})" if rank else "not ranked yet"))
         
 
 
@@ -118,6 +117,19 @@ def dashboard(data):
     st.subheader(":blue[Overall Profit/Loss in Betting Units:]")
     st.plotly_chart(total_profit(data, color_map=color_map))
 
+    # Who owes whom, from the opponents listed on each round
+    st.write("Settle up: the transfers that clear everyone's profit/loss over the selected dates")
+    ledger_min, ledger_max = data["date"].min().date(), data["date"].max().date()
+    settle_start, settle_end = st.slider("Settlement Dates", min_value=ledger_min, max_value=ledger_max,
+                                         value=(ledger_min, ledger_max), format="YYYY-MM-DD")
+    settle_method = st.radio("Settlement Method:", settlement_methods, horizontal=True,
+                             format_func=lambda m: {"greedy":"Greedy", "optimal":"Fewest Transfers"}[m])
+    transfers = settle(data, start=settle_start, end=settle_end, method=settle_method)
+    if transfers.empty:
+        st.write("Everyone is square")
+    else:
+        st.dataframe(transfers.rename(columns={"payer":"Pays", "payee":"To", "amount":"Units"}), hide_index=True)
+
     add_border()
     
     # Aggregation of stats by different categories
@@ -144,24 +156,108 @@ def dashboard(data):
                                         feature=reverse_labels[agg_feat], aggfunc=agg_dict_rev[agg_func]))
     
     add_border()
+
+    # Course difficulty separated from who played there, fitted jointly with player skill
+    st.subheader(":blue[Course difficulty:]")
+    st.write("How many strokes harder (+) or easier (-) than its ratings each course plays for the group, fitted together with each "
+             "player's skill so a course isn't judged by who happened to play it")
+    if skills is None:
+        skills = SkillModel.from_rounds(data)
+    course_col, skill_col = st.columns(2)
+    with course_col:
+        st.dataframe(skills.course_offsets().reset_index().rename(columns={"golf_course":"Golf Course", "offset":"Strokes vs Rating",
+                                                                                "rounds":"Rounds"}), hide_index=True, use_container_width=True)
+    with skill_col:
+        st.dataframe(skills.player_skills().reset_index().rename(columns={"name":"Player", "skill":"Course-Adjusted Differential",
+                                                                               "rounds":"Rounds"}), hide_index=True, use_container_width=True)
+    add_border()
+
+    # Head-to-head records between players
+    st.subheader(":blue[Head-to-head records:]")
+    st.write("Use the dropdown menu to select a head-to-head metric, each row shows a player's record against each opponent")
+    h2h_var = st.selectbox("Head-to-Head Metric:", [*h2h_labels.values()], index=1)
+    st.plotly_chart(head_to_head_heatmap(data, {val:key for key, val in h2h_labels.items()}[h2h_var]))
+    add_border()
+
+    # Fair betting lines from simulated matches
+    st.subheader(":blue[Fair betting lines:]")
+    st.write("Choose the players and a match format to simulate matches from each player's recent handicap differentials")
+    n_diffs = data.dropna(subset="handicap_diff").groupby("name").size()
+    eligible = n_diffs.index[n_diffs >= 3].tolist()
+    sim_players = st.multiselect("Players in the Match:", eligible, default=eligible[:2])
+    sim_format = st.selectbox("Simulated Match Format:", match_formats, index=1)
+
+    if st.button("Simulate Match"):
+        try:
+            lines = simulate_match(data, sim_players, sim_format, n_sims=200_000)
+        except ValueError as e:
+            st.write(f":red[{e}]")
+        else:
+            st.dataframe(lines.reset_index().rename(columns={"name":"Player", "win_prob":"Win Probability", "tie_prob":"Tie Probability",
+                                                             "expected_profit":"Expected Profit/Loss", "fair_odds":"Fair Odds (Decimal)"}),
+                         hide_index=True, use_container_width=True)
+    add_border()
+
+    # Rounds out of line with a player's recent form
+    st.subheader(":blue[Round integrity checks:]")
+    st.write("Rounds whose handicap differential is far from the player's recent form, measured in robust z-scores (median/MAD of the previous 20 rounds)")
+    z_threshold = st.slider("Z-Score Threshold:", min_value=2.0, max_value=5.0, value=3.0, step=0.5)
+    flagged = flagged_rounds(data, z_threshold=z_threshold)
+    if flagged.empty:
+        st.write("No rounds flagged")
+    else:
+        st.dataframe(flagged.rename(columns={**label_dict, **anomaly_labels, "name":"Player", "date":"Date"}),
+                     hide_index=True, use_container_width=True)
+    add_border()
     
     # Trends, line plots
     st.subheader(":blue[Trends Over Time:]")
     st.write("Use the dropdown menu to select a metric and the date slider to select a range of dates")
     
-    trend_var = st.selectbox("Trend Metric:", num_features, index=7)
-    trend_data = data.dropna(subset=reverse_labels[trend_var])
+    trend_var = st.selectbox("Trend Metric:", [*num_features, label_dict["handicap_diff"], label_dict["handicap"]], index=7)
+    trend_metric = reverse_labels[trend_var]
+    if trends is None:
+        trends = TrendPyramid.from_rounds(data)
 
     # Set up min and max dates
-    min_date = trend_data['date'].min().date() 
-    max_date = trend_data['date'].max().date() + pd.Timedelta(days=1)
+    min_date = trends.first_date.date()
+    max_date = trends.last_date.date() + pd.Timedelta(days=1)
     
     # Use st.date_input to select start and end dates
     start_date, end_date = st.slider("Date Range", min_value = min_date, max_value=max_date, \
                         value=(min_date, max_date), format="YYYY-MM-DD")
     
-    # Line plot of all data with time slider to choose time window
-    st.plotly_chart(plot_statistics(data=trend_data.loc[(trend_data["date"] >= pd.to_datetime(start_date)) & (trend_data["date"] <= pd.to_datetime(end_date))], column = reverse_labels[trend_var], color_map=color_map))
+    # Line plot of every round while each player has few enough in the range, otherwise the coarsest level of the pyramid needed.
+    # The per-player counts come from the pyramid, the raw rounds are only filtered when they are drawn
+    level = trends.choose_level(start_date, end_date, metric=trend_metric)
+    if level == "round":
+        in_range = data.loc[data[trend_metric].notna() & (data["date"] >= pd.to_datetime(start_date)) & (data["date"] <= pd.to_datetime(end_date))]
+
+        # Differentials counting toward each player's current index are highlighted on the differential trend. get_handicaps() and
+        # the incremental updates keep the flags current, they're only computed here for data loaded without them
+        if trend_metric == "handicap_diff":
+            if "counting_diff" not in in_range.columns or in_range["counting_diff"].isna().any():
+                flags = counting_differentials(data.dropna(subset="handicap_diff"))
+                in_range = in_range.drop(columns=["counting_diff", "counting_rank"], errors="ignore").join(flags)
+            st.write("Stars mark the differentials that count toward each player's current handicap index")
+
+    # Handicaps and differentials can be projected forward while the range runs up to the latest round
+    trend_forecast = None
+    if trend_metric in ("handicap", "handicap_diff") and pd.to_datetime(end_date) >= trends.last_date:
+        horizon = st.slider("Forecast Rounds Ahead:", min_value=0, max_value=20, value=5)
+        if horizon:
+            if forecast is None:
+                forecast = HandicapForecast.from_rounds(data)
+            trend_forecast = forecast.forecast(horizon)
+            st.write("Dashed lines project each player's " + ("handicap index" if trend_metric == "handicap" else "differential level")
+                     + " over their next rounds from exponential smoothing of their differentials, shaded bands are 80% prediction intervals")
+
+    if level == "round":
+        st.plotly_chart(plot_statistics(data=in_range, column = trend_metric, color_map=color_map, forecast=trend_forecast))
+    else:
+        st.write(f"{level_labels[level]} averages of the range with each period's min-max band, narrow the date range to see individual rounds")
+        st.plotly_chart(plot_bucketed_statistics(trends.query(trend_metric, level, start_date, end_date),
+                                                 trend_metric, level_labels[level], color_map=color_map, forecast=trend_forecast))
     add_border()
 
     # Rolling averages to evaluate smoothed trends
@@ -197,26 +293,22 @@ def dashboard(data):
     
     
     names_list = data.dropna(subset=reverse_labels[pie_var])["name"].unique()
-    col1, col2, col3 = st.columns(3)
-    
-    # Create a column for each player with their most up-to-date handicap
-    for idx, name in enumerate(names_list):
-        if idx % 3 == 0:
-            with col1:
-                
-                st.plotly_chart(pie_chart(data, reverse_labels[pie_var], name))
-                st.markdown("---")
-                
-        elif idx % 3 == 1:
-            with col2:
-                st.plotly_chart(pie_chart(data, reverse_labels[pie_var], name))
-                st.markdown("---")
-                
+    pie_counts = pie_chart_counts(data, reverse_labels[pie_var])
+    max_pies = 9
 
-        else:
-            with col3:
-                st.plotly_chart(pie_chart(data, reverse_labels[pie_var], name))
-                st.markdown("---")
+    # Only the first few players are rendered up front, the rest reuse the same counts on request
+    pie_players = names_list
+    if len(names_list) > max_pies and not st.checkbox(f"Show all {len(names_list)} players", value=False):
+        pie_players = names_list[:max_pies]
+
+    pie_figs = pie_charts(data, reverse_labels[pie_var], players=pie_players, max_players=None, counts=pie_counts)
+    pie_cols = st.columns(3)
+
+    # Create a column for each player's pie chart
+    for idx, (name, fig) in enumerate(pie_figs.items()):
+        with pie_cols[idx % 3]:
+            st.plotly_chart(fig)
+            st.markdown("---")
 
 
     # Scatter plots of adj_gross_score vs other numeric variables with size option
@@ -289,10 +381,26 @@ def dashboard(data):
         
         query_df = data.loc[data["date"] == selected_date]
         
-        st.dataframe(query_df.drop(columns=["jittered_col", "notes", "handicap"]).rename(columns=label_dict)\
+        st.dataframe(query_df.drop(columns=["notes", "handicap", "counting_diff", "counting_rank", "esr_reduction"], errors="ignore").rename(columns=label_dict)\
                      .rename(columns={"name":"Player", "date":"Date", "course_rating":"Course Rating", "slope_rating":"Slope Rating"}),\
                      hide_index=True, use_container_width=True)
         add_border()
         for name in query_df["name"].unique():
             st.plotly_chart(find_round(query_df, name, selected_date))
-            add_border()
\ No newline at end of file
+            add_border()
+
+    # Full-text search over the round notes
+    st.subheader(":blue[Search Round Notes:]")
+    st.write('Search the notes from every round by keyword, or by "exact phrase" in quotes')
+    if notes_index is None:
+        notes_index = NotesIndex.from_rounds(data)
+    notes_query = st.text_input("Search Notes:", value="")
+    notes_players = st.multiselect("Only Rounds From:", data["name"].unique().tolist())
+
+    if notes_query:
+        matches = notes_index.search(notes_query, players=notes_players or None)
+        matches = [label for label in matches if label in data.index]
+        st.write(f"{len(matches)} matching round{'s' if len(matches) != 1 else ''}")
+        if matches:
+            st.dataframe(data.loc[matches, ["name", "date", "golf_course", "handicap_diff", "notes"]].rename(columns=label_dict)\
+                         .rename(columns={"name":"Player", "date":"Date"}), hide_index=True, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,291 @@
+"""
+Static export of the dashboard for read-only viewers: every section rendered for every dropdown option into an HTML bundle
+
+    python export_report.py --path real_data.csv --out report
+    python export_report.py --group "Saturday Skins Crew" --out report/saturday
+
+The bundle is index.html, plotly.min.js and one sections/<section>.js per section holding its pre-rendered figures and
+tables, so it can be served by any static file host or opened straight from disk. manifest.json keeps a fingerprint of
+each section's inputs, and a re-export only re-renders the sections whose inputs changed
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+import plotly.express as px
+from plotly.offline import get_plotlyjs
+
+from utils import (label_dict, num_names, cat_names, current_handicaps, counting_differentials, plot_statistics,
+                   plot_bucketed_statistics, histplot, pie_charts, rolling_avg, scatter, mean_med_stats, total_profit,
+                   agg_features_by_cat, head_to_head_heatmap)
+from head_to_head import h2h_labels
+from anomaly import flagged_rounds
+from settlement import settle, settlement_methods
+from aggregates import TrendPyramid, level_labels
+from column_snapshot import load_rounds
+from groups import partition_path
+from figure_cache import data_fingerprint
+
+
+# Bumped whenever a section is rendered differently, so every section of an older export is re-rendered
+REPORT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+
+agg_funcs = {"mean":"Average Value", "median":"Median Value", "sum":"Sum/Total"}
+rolling_windows = [5, 10, 20]
+z_thresholds = [2.5, 3.0, 3.5]
+
+
+def _figure(fig) -> dict:
+    return {"figure":json.loads(fig.to_json())}
+
+
+def _table(table:pd.DataFrame) -> dict:
+    return {"html":table.to_html(index=False, border=0, classes="table", float_format=lambda x: f"{x:,.2f}", na_rep="")}
+
+
+def _text(text:str) -> dict:
+    return {"html":f"<p>{html.escape(text)}</p>"}
+
+
+def report_sections(data:pd.DataFrame, trends:TrendPyramid=None) -> dict:
+    """
+    The dashboard's sections that can be rendered ahead of time, each with the columns it reads and a renderer per option.
+    Renderers are only called for sections that need re-rendering
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    trends:TrendPyramid | trend aggregates of data, built if not supplied
+
+    Returns:
+    -------------
+    sections:dict | {key: {"title", "columns", "options":{label: renderer}}}, renderers return a list of figures/tables
+    """
+
+    color_map = dict(zip([name for name in data["name"].unique()], px.colors.qualitative.Vivid))
+    if trends is None:
+        trends = TrendPyramid.from_rounds(data)
+
+    def handicaps():
+        table = current_handicaps(data).round(4).reset_index().rename(columns={"name":"Player", "handicap":"Handicap Index"})
+        return [_table(table)]
+
+    def settlement(method):
+        transfers = settle(data, method=method)
+        if transfers.empty:
+            return [_text("Everyone is square")]
+        return [_table(transfers.rename(columns={"payer":"Pays", "payee":"To", "amount":"Units"}))]
+
+    def integrity(z_threshold):
+        flagged = flagged_rounds(data, z_threshold=z_threshold)
+        return [_text("No rounds flagged")] if flagged.empty else [_table(flagged.rename(columns={**label_dict, "name":"Player", "date":"Date"}))]
+
+    def trend(column):
+        trend_data = data.dropna(subset=column)
+        if column == "handicap_diff":
+            trend_data = trend_data.drop(columns=["counting_diff", "counting_rank"], errors="ignore").join(counting_differentials(trend_data))
+        level = trends.choose_level() if trend_data["name"].value_counts().max() > 60 else "round"
+        if level == "round":
+            return [_figure(plot_statistics(data=trend_data, column=column, color_map=color_map))]
+        return [_figure(plot_bucketed_statistics(trends.query(column, level), column, level_labels[level], color_map=color_map))]
+
+    def correlation(column):
+        corr = data[["adj_gross_score", column]].corr().iloc[0, 1]
+        by_player = data.groupby("name")[["adj_gross_score", column]].corr().reset_index() \
+            .rename(columns={column:"Correlation", "name":"Player Name"}).loc[::2, ["Player Name", "Correlation"]]
+        return [_figure(scatter(data=data, column=column, color_map=color_map)),
+                _text(f"Across all players and data, the Pearson Correlation for Adjusted Gross Score and {label_dict[column]} is {corr:.3f}"),
+                _table(by_player)]
+
+    pie_names = [key for key, label in label_dict.items() if label not in ["Adjusted Gross Score", "Handicap Differential", "Handicap Index", "Notes"]]
+    scatter_names = [key for key in pie_names if key not in ["match_format", "opponent/s", "golf_course"]]
+
+    return {
+        "handicaps":{"title":"Up-To-Date Player Handicaps", "columns":["name", "date", "handicap"],
+                     "options":{"All Players":handicaps}},
+        "profit":{"title":"Overall Profit/Loss in Betting Units", "columns":["name", "date", "profit/loss"],
+                  "options":{"All Rounds":lambda: [_figure(total_profit(data, color_map=color_map))]}},
+        "settlement":{"title":"Settle Up (All Dates)", "columns":["name", "date", "profit/loss", "opponent/s"],
+                      "options":{{"greedy":"Greedy", "optimal":"Fewest Transfers"}[m]:(lambda m=m: settlement(m)) for m in settlement_methods}},
+        "aggregates":{"title":"Aggregate Statistics by Category", "columns":["name", *num_names, *cat_names],
+                      "options":{f"{label_dict[feature]} by {label_dict[category]} ({agg_label})":
+                                 (lambda f=feature, c=category, a=agg: [_figure(agg_features_by_cat(data=data, category=c, feature=f, aggfunc=a))])
+                                 for feature in num_names for category in cat_names for agg, agg_label in agg_funcs.items()}},
+        "head_to_head":{"title":"Head-to-Head Records", "columns":["name", "date", "opponent/s", "handicap_diff", "profit/loss"],
+                        "options":{label:(lambda m=metric: [_figure(head_to_head_heatmap(data, m))]) for metric, label in h2h_labels.items()}},
+        "integrity":{"title":"Round Integrity Checks", "columns":["name", "date", "golf_course", "handicap_diff", "profit/loss"],
+                     "options":{f"Z-Score Threshold {z}":(lambda z=z: integrity(z)) for z in z_thresholds}},
+        "trends":{"title":"Trends Over Time", "columns":["name", "date", *num_names, "handicap_diff"],
+                  "options":{label_dict[column]:(lambda c=column: trend(c)) for column in [*num_names, "handicap_diff"]}},
+        "rolling":{"title":"Rolling Average Statistics", "columns":["name", "date", *num_names],
+                   "options":{f"{label_dict[column]}, {window} Rounds":(lambda c=column, w=window: [_figure(rolling_avg(data, c, w, color_map=color_map))])
+                              for column in num_names for window in rolling_windows}},
+        "averages":{"title":"Average, Median, and Standard Deviation", "columns":["name", *num_names],
+                    "options":{label_dict[column]:(lambda c=column: [_figure(mean_med_stats(data, c))]) for column in num_names}},
+        "distributions":{"title":"Distributions", "columns":["name", *num_names],
+                         "options":{label_dict[column]:(lambda c=column: [_figure(histplot(data, c, color_map=color_map))]) for column in num_names}},
+        "proportions":{"title":"Proportions of Contributing Statistics", "columns":["name", *pie_names],
+                       "options":{label_dict[column]:(lambda c=column: [_figure(pie_charts(data, c, max_players=None, subplots=True))])
+                                  for column in pie_names}},
+        "correlations":{"title":"Adjusted Gross Score vs Selected Metrics", "columns":["name", "adj_gross_score", *scatter_names],
+                        "options":{label_dict[column]:(lambda c=column: correlation(c)) for column in scatter_names}}
+    }
+
+
+def section_fingerprint(data:pd.DataFrame, key:str, section:dict) -> str:
+    """
+    Hash of everything a section's output depends on: every value of the columns it reads, its options and the report format.
+    The player order is part of it since it sets the colors
+    """
+
+    columns = [c for c in section["columns"] if c in data.columns]
+    inputs = (REPORT_FORMAT, key, list(section["options"]), tuple(data["name"].unique()), data_fingerprint(data[columns]))
+    return hashlib.sha1(repr(inputs).encode()).hexdigest()
+
+
+def _write_atomic(path:str, text:str):
+    """
+    Write a bundle file through a temporary file so a viewer never loads half of it
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _index_html(title:str, sections:dict, manifest:dict) -> str:
+    """
+    Page with one dropdown per section, showing the pre-rendered output of the selected option
+    """
+
+    blocks, scripts = [], []
+    for key, section in sections.items():
+        options = "".join(f'<option value="{i}">{html.escape(label)}</option>' for i, label in enumerate(section["options"]))
+        select = f'<select onchange="show(\'{key}\', this.value)">{options}</select>' if len(section["options"]) > 1 else ""
+        blocks.append(f'<section><h2>{html.escape(section["title"])}</h2>{select}<div id="{key}"></div></section>')
+        scripts.append(f'<script src="sections/{key}.js?v={manifest[key][:12]}"></script>')
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{font-family: sans-serif; margin: 2em auto; max-width: 1200px;}}
+h2 {{color: #1f77b4;}}
+section {{border-bottom: 2px solid #e5e4e2; padding-bottom: 1em;}}
+.table {{border-collapse: collapse; margin: 1em 0;}}
+.table td, .table th {{padding: 4px 12px; text-align: left; border-bottom: 1px solid #ddd;}}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>Exported {time.strftime("%Y-%m-%d %H:%M")}</p>
+{"".join(blocks)}
+<script>var REPORT = {{}};</script>
+{"".join(scripts)}
+<script>
+function show(key, option) {{
+    var target = document.getElementById(key);
+    target.innerHTML = "";
+    REPORT[key][option].forEach(function(part) {{
+        var div = document.createElement("div");
+        target.appendChild(div);
+        if (part.figure) {{ Plotly.newPlot(div, part.figure.data, part.figure.layout); }}
+        else {{ div.innerHTML = part.html; }}
+    }});
+}}
+Object.keys(REPORT).forEach(function(key) {{ show(key, 0); }});
+</script>
+</body>
+</html>
+"""
+
+
+def export_report(data:pd.DataFrame, out_dir:str, trends:TrendPyramid=None, title:str="Golf Group Report", force:bool=False) -> dict:
+    """
+    Render the report bundle, re-rendering only the sections whose fingerprint differs from the last export
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data with handicaps computed
+    out_dir:str | directory of the bundle
+    trends:TrendPyramid | trend aggregates of data, built if not supplied
+    title:str | heading of the page
+    force:bool | re-render every section
+
+    Returns:
+    -------------
+    results:dict | {"rendered": [...], "unchanged": [...]} section keys
+    """
+
+    os.makedirs(os.path.join(out_dir, "sections"), exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    sections = report_sections(data, trends)
+    manifest, results = {}, {"rendered":[], "unchanged":[]}
+
+    for key, section in sections.items():
+        manifest[key] = section_fingerprint(data, key, section)
+        path = os.path.join(out_dir, "sections", f"{key}.js")
+        if not force and previous.get(key) == manifest[key] and os.path.exists(path):
+            results["unchanged"].append(key)
+            continue
+
+        rendered = [render() for render in section["options"].values()]
+        _write_atomic(path, f"REPORT[{json.dumps(key)}] = {json.dumps(rendered)};\n")
+        results["rendered"].append(key)
+
+    # Sections dropped from the report
+    for entry in os.listdir(os.path.join(out_dir, "sections")):
+        if entry.endswith(".js") and entry[:-3] not in sections:
+            os.remove(os.path.join(out_dir, "sections", entry))
+
+    if not os.path.exists(os.path.join(out_dir, "plotly.min.js")):
+        _write_atomic(os.path.join(out_dir, "plotly.min.js"), get_plotlyjs())
+
+    _write_atomic(os.path.join(out_dir, "index.html"), _index_html(title, sections, manifest))
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the dashboard as a static HTML report")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--path", default="real_data.csv", help="round data file to report on")
+    source.add_argument("--group", help="golf group to report on, instead of --path")
+    parser.add_argument("--out", default="report", help="directory of the bundle")
+    parser.add_argument("--force", action="store_true", help="re-render every section")
+    args = parser.parse_args()
+
+    path = partition_path(args.group) if args.group else args.path
+    data, trends = load_rounds(path)
+    title = f"{args.group or 'Golf Group'} Report"
+
+    start = time.perf_counter()
+    results = export_report(data, args.out, trends, title=title, force=args.force)
+    print(f"Rendered {len(results['rendered'])} sections, {len(results['unchanged'])} unchanged, "
+          f"in {time.perf_counter() - start:.1f}s -> {os.path.join(args.out, 'index.html')}")
+
+
+if __name__ == "__main__":
+    main()
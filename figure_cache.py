@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+import plotly.io as pio
+
+
+@functools.lru_cache(maxsize=8)
+def _weights(n:int) -> np.ndarray:
+    """
+    Row positions 1..n as floats, shared between calls for frames of the same length
+    """
+    return np.arange(1, n + 1, dtype=float)
+
+
+def _numeric_summary(x:np.ndarray) -> tuple:
+    """
+    Count, sum and position-weighted sum of a float array, the weighted sum also moves when rows are reordered
+    """
+    present = ~np.isnan(x)
+    filled = np.where(present, x, 0.0)
+    return (int(np.count_nonzero(present)), float(filled.sum()), float(np.dot(_weights(len(x)), filled)))
+
+
+def _text_summary(values:np.ndarray) -> tuple:
+    """
+    Digest of every value of a text column in order, from pandas' vectorized per-value hashes. The same across processes,
+    so it can be stored, see export_report.section_fingerprint()
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(values, dtype=object), index=False).to_numpy()
+    return (hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest(),)
+
+
+def _as_float(values) -> np.ndarray:
+    """
+    Numeric or date values as floats, missing values as nan
+    """
+    kind = values.dtype.kind
+    if kind in "mM":
+        x = np.asarray(values, dtype="datetime64[ns]" if kind == "M" else "timedelta64[ns]")
+        return np.where(np.isnat(x), np.nan, x.view("int64").astype(float))
+    if kind in "biuf" and isinstance(values.dtype, np.dtype):
+        return np.asarray(values, dtype=float)
+    return values.to_numpy(dtype=float, na_value=np.nan)
+
+
+def data_fingerprint(data:pd.DataFrame) -> tuple:
+    """
+    Cheap fingerprint of a dataframe: its shape, column names, dtypes, index and a summary of each column. Numeric and date
+    columns give their count, sum and position-weighted sum, text columns a digest of every value, so it costs a few
+    vectorized passes over the columns
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+
+    Returns:
+    -------------
+    fingerprint:tuple | hashable summary that changes when the data does
+    """
+
+    columns = []
+    for _, values in data.items():
+        columns.append(_numeric_summary(_as_float(values)) if values.dtype.kind in "biufmM" else _text_summary(values.to_numpy()))
+
+    index = data.index
+    index_summary = _numeric_summary(_as_float(index)) if index.dtype.kind in "biufmM" else _text_summary(index.to_numpy())
+    return (data.shape, tuple(data.columns), tuple(map(str, data.dtypes)), index_summary, tuple(columns))
+
+
+def _freeze(value):
+    """
+    Convert a plotting argument into something hashable for the cache key
+    """
+
+    if isinstance(value, pd.DataFrame):
+        return ("frame", data_fingerprint(value))
+    elif isinstance(value, pd.Series):
+        return ("series", data_fingerprint(value.to_frame()))
+    elif isinstance(value, dict):
+        return ("dict", tuple(sorted((str(k), _freeze(v)) for k, v in value.items())))
+    elif isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return ("seq", tuple(_freeze(v) for v in value))
+
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class FigureCache:
+    """
+    Size-bounded LRU of serialized plotly figures, safe to share between Streamlit sessions
+    """
+
+    def __init__(self, maxsize:int=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, fig_json:str):
+        with self._lock:
+            self._figures[key] = fig_json
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        -------------
+        stats:dict | hits, misses, hit rate, number of cached figures and their total size in bytes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits":self.hits, "misses":self.misses, "hit_rate":self.hits / lookups if lookups else 0.0,
+                    "size":len(self._figures), "bytes":sum(len(f) for f in self._figures.values())}
+
+
+# One cache per process, so every session of the app shares it
+figure_cache = FigureCache()
+
+
+def cached_figure(func):
+    """
+    Decorator that memoizes a plotting function on its name, its arguments and the fingerprint of any dataframe arguments
+
+    Args:
+    -------------
+    func:callable | function returning a plotly figure
+
+    Returns:
+    -------------
+    wrapper:callable | same function, returning a figure rebuilt from the cached JSON when nothing has changed
+    """
+
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__module__, func.__qualname__, tuple((name, _freeze(value)) for name, value in bound.arguments.items()))
+
+        fig_json = figure_cache.get(key)
+        if fig_json is not None:
+            return pio.from_json(fig_json)
+
+        fig = func(*args, **kwargs)
+        figure_cache.put(key, fig.to_json())
+        return fig
+
+    return wrapper
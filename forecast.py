@@ -0,0 +1,252 @@
+import copy
+
+import pandas as pd
+import numpy as np
+from scipy.signal import lfilter
+from scipy.special import ndtri
+
+from utils import player_order, handicap_from_windows
+
+
+# Smoothing weights tried for each player, the one with the smallest one-step-ahead error is kept
+smoothing_grid = np.round(np.arange(0.05, 1.0, 0.05), 2)
+
+# Differentials kept per player to project the index: the 20-round window minus the round being projected
+HISTORY = 19
+
+
+def smooth_levels(diffs:np.ndarray, alpha:np.ndarray) -> np.ndarray:
+    """
+    Local level of every player after each of their rounds, level = level + alpha * (diff - level), starting from the first
+    differential. Runs as one linear filter along the rounds axis per distinct smoothing weight, covering all players at once
+
+    Args:
+    -------------
+    diffs:np.ndarray | players x rounds array of differentials, oldest first, padded with nan after each player's last round
+    alpha:np.ndarray | smoothing weight of each player
+
+    Returns:
+    -------------
+    levels:np.ndarray | players x rounds array of levels, nan after each player's last round
+    """
+
+    levels = np.full(diffs.shape, np.nan)
+    if diffs.size == 0:
+        return levels
+
+    for a in np.unique(alpha):
+        rows = alpha == a
+        first = diffs[rows, :1]
+        levels[rows] = lfilter([a], [1, -(1 - a)], diffs[rows], axis=1, zi=(1 - a) * first)[0]
+    return levels
+
+
+def _one_step_errors(diffs:np.ndarray, levels:np.ndarray) -> np.ndarray:
+    """
+    Each round's differential minus the level before it, nan for the first round
+    """
+    errors = np.full(diffs.shape, np.nan)
+    errors[:, 1:] = diffs[:, 1:] - levels[:, :-1]
+    return errors
+
+
+class HandicapForecast:
+    """
+    Per-player local level (simple exponential smoothing) model of handicap differentials, fitted for all players at once
+    and kept up to date round by round. Projects the differential level and the handicap index for the next rounds with
+    prediction intervals
+    """
+
+    def __init__(self):
+        self.players = pd.Index([])
+        self.alpha = np.empty(0)
+        self.level = np.empty(0)
+        self.sse = np.empty(0)
+        self.n_rounds = np.empty(0, dtype=int)
+        self.first_date = np.empty(0, dtype="datetime64[ns]")
+        self.last_date = np.empty(0, dtype="datetime64[ns]")
+
+        # Most recent differentials, oldest first, nan padded at the front for players with fewer rounds
+        self.recent = np.empty((0, HISTORY))
+
+    def fork(self):
+        """
+        Model for the next version of the data. The per-player state update() changes in place is copied, which is one row per
+        player rather than the round history
+
+        Returns:
+        -------------
+        forecast:HandicapForecast | model that update() can extend without changing this one
+        """
+        fork = copy.copy(self)
+        for attr in ["level", "sse", "n_rounds", "first_date", "last_date", "recent"]:
+            setattr(fork, attr, getattr(self, attr).copy())
+        return fork
+
+    @classmethod
+    def from_rounds(cls, data:pd.DataFrame):
+        """
+        Fit every player's smoothing weight and level from a full round history
+
+        Args:
+        -------------
+        data:pd.DataFrame | source of data with handicap_diff
+
+        Returns:
+        -------------
+        forecast:HandicapForecast | fitted model
+        """
+
+        model = cls()
+        rounds = data.dropna(subset=["handicap_diff", "date"])
+        if rounds.empty:
+            return model
+
+        order, codes, n_rounds = player_order(rounds)
+        diffs = rounds["handicap_diff"].to_numpy(dtype=float)[order]
+        dates = rounds["date"].to_numpy(dtype="datetime64[ns]")[order]
+        players = pd.Index(pd.unique(rounds["name"]))
+
+        # Players x rounds, oldest first
+        n_players, lengths = len(players), np.bincount(codes, minlength=len(players))
+        matrix = np.full((n_players, lengths.max()), np.nan)
+        matrix[codes, n_rounds - 1] = diffs
+
+        # Sum of squared one-step errors of every player under every candidate weight, keep each player's best
+        sse = np.stack([np.nansum(_one_step_errors(matrix, smooth_levels(matrix, np.full(n_players, a))) ** 2, axis=1)
+                        for a in smoothing_grid])
+        alpha = smoothing_grid[sse.argmin(axis=0)]
+        levels = smooth_levels(matrix, alpha)
+
+        last = lengths - 1
+        recent = np.full((n_players, HISTORY), np.nan)
+        take = np.minimum(lengths, HISTORY)
+        rows = np.repeat(np.arange(n_players), take)
+        cols = np.concatenate([np.arange(HISTORY - t, HISTORY) for t in take])
+        src = np.concatenate([np.arange(n - t, n) for n, t in zip(lengths, take)])
+        recent[rows, cols] = matrix[rows, src]
+
+        starts = np.r_[0, np.cumsum(lengths)[:-1]]
+        model.players = players
+        model.alpha = alpha
+        model.level = levels[np.arange(n_players), last]
+        model.sse = sse.min(axis=0)
+        model.n_rounds = lengths
+        model.first_date = dates[starts]
+        model.last_date = dates[starts + last]
+        model.recent = recent
+        return model
+
+    def update(self, rounds:pd.DataFrame) -> bool:
+        """
+        Fold new rounds into each player's level, error total and recent differentials. Smoothing weights are kept from the
+        last fit, players seen for the first time get the median weight
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | new rows of round data, each dated on or after its player's last round
+
+        Returns:
+        -------------
+        updated:bool | False, with nothing changed, if a round is older than its player's last round and the model needs refitting
+        """
+
+        rounds = rounds.dropna(subset=["handicap_diff", "date"]).sort_values("date", kind="stable")
+        if rounds.empty:
+            return True
+
+        known = self.players.get_indexer(rounds["name"])
+        dates = rounds["date"].to_numpy(dtype="datetime64[ns]")
+        if (dates[known >= 0] < self.last_date[known[known >= 0]]).any():
+            return False
+
+        new_players = pd.Index(pd.unique(rounds.loc[known < 0, "name"]))
+        if len(new_players):
+            n = len(new_players)
+            self.players = self.players.append(new_players)
+            self.alpha = np.r_[self.alpha, np.full(n, np.median(self.alpha) if len(self.alpha) else 0.3)]
+            self.level = np.r_[self.level, np.full(n, np.nan)]
+            self.sse = np.r_[self.sse, np.zeros(n)]
+            self.n_rounds = np.r_[self.n_rounds, np.zeros(n, dtype=int)]
+            self.first_date = np.r_[self.first_date, np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")]
+            self.last_date = np.r_[self.last_date, np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")]
+            self.recent = np.vstack([self.recent, np.full((n, HISTORY), np.nan)])
+
+        codes = self.players.get_indexer(rounds["name"])
+        diffs = rounds["handicap_diff"].to_numpy(dtype=float)
+
+        # One vectorized step per round number within the batch, usually a single step
+        step = rounds.groupby("name").cumcount().to_numpy()
+        for k in range(step.max() + 1):
+            rows, y, idx = codes[step == k], diffs[step == k], np.flatnonzero(step == k)
+            started = self.n_rounds[rows] > 0
+            error = np.where(started, y - self.level[rows], 0.0)
+            self.sse[rows] += error ** 2
+            self.level[rows] = np.where(started, self.level[rows] + self.alpha[rows] * error, y)
+            self.recent[rows] = np.column_stack([self.recent[rows, 1:], y])
+            self.first_date[rows] = np.where(started, self.first_date[rows], dates[idx])
+            self.last_date[rows] = dates[idx]
+            self.n_rounds[rows] += 1
+
+        return True
+
+    def forecast(self, horizon:int=10, interval:float=0.8, n_sims:int=500, seed:int=0) -> pd.DataFrame:
+        """
+        Expected differential level and handicap index for each of the next rounds, with prediction intervals.
+        The differential band is the local level model's analytic interval, sd * sqrt(1 + (h - 1) * alpha^2). The index
+        is projected by simulating future differentials from the same model and taking the best 8 of the last 20 in each
+        path (soft/hard caps and exceptional score reductions are not applied to projected rounds)
+
+        Args:
+        -------------
+        horizon:int | number of future rounds to project
+        interval:float | coverage of the prediction intervals
+        n_sims:int | simulated paths per player for the index projection
+        seed:int | random seed for the simulated paths
+
+        Returns:
+        -------------
+        forecast:pd.DataFrame | one row per player and future round: name, step, date (spaced by the player's average gap
+                                between rounds), diff_mean, diff_low, diff_high, index_mean, index_low, index_high.
+                                Players with fewer than 3 rounds are left out
+        """
+
+        columns = ["name", "step", "date", "diff_mean", "diff_low", "diff_high", "index_mean", "index_low", "index_high"]
+        players = np.flatnonzero(self.n_rounds >= 3)
+        if horizon < 1 or not len(players):
+            return pd.DataFrame(columns=columns)
+
+        alpha, level, n = self.alpha[players], self.level[players], self.n_rounds[players]
+        sd = np.sqrt(self.sse[players] / np.maximum(n - 2, 1))
+        steps = np.arange(1, horizon + 1)
+        z = ndtri(0.5 + interval / 2)
+
+        # Analytic interval of the differential level, players x steps
+        spread = z * sd[:, None] * np.sqrt(1 + (steps - 1) * alpha[:, None] ** 2)
+
+        # Simulated paths, players x sims x steps: each shock moves the level by alpha times itself
+        rng = np.random.default_rng(seed)
+        shocks = rng.standard_normal((len(players), n_sims, horizon)) * sd[:, None, None]
+        paths = level[:, None, None] + alpha[:, None, None] * (np.cumsum(shocks, axis=2) - shocks) + shocks
+
+        # Each step's 20-round window is the tail of the history followed by the simulated rounds so far
+        history = np.broadcast_to(self.recent[players][:, None, :], (len(players), n_sims, HISTORY))
+        windows = np.lib.stride_tricks.sliding_window_view(np.concatenate([history, paths], axis=2), HISTORY + 1, axis=2)
+        index = handicap_from_windows(windows.reshape(-1, HISTORY + 1),
+                                      np.broadcast_to((n[:, None] + steps)[:, None, :], windows.shape[:3]).ravel())
+        index = index.reshape(len(players), n_sims, horizon)
+        tail = (1 - interval) / 2
+
+        gap = (self.last_date[players] - self.first_date[players]) / np.maximum(n - 1, 1)
+        forecast = pd.DataFrame({
+            "name":np.repeat(self.players[players], horizon),
+            "step":np.tile(steps, len(players)),
+            "date":pd.to_datetime((self.last_date[players][:, None] + gap[:, None] * steps).ravel()).floor("D"),
+            "diff_mean":np.repeat(level, horizon),
+            "diff_low":(level[:, None] - spread).ravel(),
+            "diff_high":(level[:, None] + spread).ravel(),
+            "index_mean":np.nanmean(index, axis=1).ravel(),
+            "index_low":np.nanquantile(index, tail, axis=1).ravel(),
+            "index_high":np.nanquantile(index, 1 - tail, axis=1).ravel()
+        })
+        return forecast[columns]
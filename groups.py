@@ -0,0 +1,219 @@
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from notes_index import NotesIndex, load_notes_index
+from column_snapshot import load_rounds
+from skill_model import SkillModel
+from forecast import HandicapForecast
+from leaderboard import Leaderboard
+
+
+# Each group's rounds live in their own partition: groups/<group>/rounds.csv
+GROUPS_DIR = "groups"
+ROUNDS_FILE = "rounds.csv"
+
+# The original single-group dataset stays where it is and is listed as the default group
+DEFAULT_GROUP = "Our Group"
+DEFAULT_PATH = "real_data.csv"
+
+
+def group_slug(group:str) -> str:
+    """
+    Directory name for a group, "Saturday Skins Crew" -> "saturday_skins_crew"
+    """
+    return re.sub(r"[^a-z0-9]+", "_", group.strip().lower()).strip("_")
+
+
+def partition_path(group:str, root:str=GROUPS_DIR) -> str:
+    """
+    Location of a group's round data
+    """
+    return DEFAULT_PATH if group == DEFAULT_GROUP else os.path.join(root, group_slug(group), ROUNDS_FILE)
+
+
+def list_groups(root:str=GROUPS_DIR) -> list:
+    """
+    Groups with a partition on disk, the default group first
+
+    Args:
+    -------------
+    root:str | directory holding the group partitions
+
+    Returns:
+    -------------
+    groups:list | group names
+    """
+
+    groups = [DEFAULT_GROUP] if os.path.exists(DEFAULT_PATH) else []
+    if os.path.isdir(root):
+        groups += sorted(entry for entry in os.listdir(root) if os.path.exists(os.path.join(root, entry, ROUNDS_FILE)))
+    return groups
+
+
+def create_group(group:str, columns:list, root:str=GROUPS_DIR) -> str:
+    """
+    Start an empty partition for a new group
+
+    Args:
+    -------------
+    group:str | name of the group
+    columns:list | columns of the round data
+    root:str | directory holding the group partitions
+
+    Returns:
+    -------------
+    path:str | location of the group's round data
+    """
+
+    path = partition_path(group, root)
+    if os.path.exists(path):
+        raise FileExistsError(f"group {group!r} already exists at {path}")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(columns=columns).to_csv(path, index=False)
+    return path
+
+
+class GroupState:
+    """
+    Everything loaded for one group: its rounds with handicaps computed, its notes index, its trend aggregates, its
+    player skill / course difficulty model, its handicap forecasting state and its leaderboard
+    """
+
+    def __init__(self, group:str, path:str, columns:list=None):
+        self.group = group
+        self.path = path
+        self.version = os.stat(path).st_mtime_ns
+
+        # Opened from the binary snapshot when it is current, recomputed from the partition otherwise
+        data, trends = load_rounds(path, columns)
+
+        self.data = data
+        self.notes_index = load_notes_index(data, path) if len(data) else NotesIndex()
+        self.trends = trends
+        self.skills = SkillModel.from_rounds(data)
+        self.forecast = HandicapForecast.from_rounds(data)
+        self.leaderboard = Leaderboard.from_rounds(data)
+        self.last_access = time.monotonic()
+
+
+class GroupRegistry:
+    """
+    Lazily loaded group datasets shared by every session of the app. A group is read from its partition the first time it is
+    asked for, reloaded if its file changes, and dropped once nobody has asked for it in idle_seconds, so memory follows
+    the groups in use rather than the groups on disk. Idle groups are dropped on any access to the registry and by a timer
+    that runs while groups are loaded. Each group loads under its own lock, so a slow load doesn't hold up other groups
+    """
+
+    def __init__(self, root:str=GROUPS_DIR, columns:list=None, idle_seconds:float=1800, max_groups:int=8):
+        self.root = root
+        self.columns = columns
+        self.idle_seconds = idle_seconds
+        self.max_groups = max_groups
+        self._groups = {}
+        self._load_locks = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def groups(self) -> list:
+        """
+        Returns:
+        -------------
+        groups:list | every group with a partition on disk
+        """
+        with self._lock:
+            self._evict_idle()
+        return list_groups(self.root)
+
+    def loaded(self) -> list:
+        """
+        Returns:
+        -------------
+        groups:list | groups currently held in memory
+        """
+        with self._lock:
+            self._evict_idle()
+            return list(self._groups)
+
+    def get(self, group:str) -> GroupState:
+        """
+        A group's data, loading it on first access or when its partition has changed
+
+        Args:
+        -------------
+        group:str | name of the group
+
+        Returns:
+        -------------
+        state:GroupState | the group's rounds and notes index
+        """
+
+        path = partition_path(group, self.root)
+        if not os.path.exists(path):
+            raise KeyError(f"no data found for group {group!r} at {path}")
+
+        with self._lock:
+            self._evict_idle()
+            load_lock = self._load_locks.setdefault(group, threading.Lock())
+
+        # Sessions asking for the same group wait for one load, other groups are served meanwhile
+        with load_lock:
+            with self._lock:
+                state = self._groups.get(group)
+            if state is None or state.version != os.stat(path).st_mtime_ns:
+                state = GroupState(group, path, self.columns)
+
+            with self._lock:
+                self._groups[group] = state
+                state.last_access = time.monotonic()
+
+                # Least recently used groups go first if too many are active at once
+                while len(self._groups) > self.max_groups:
+                    oldest = min(self._groups, key=lambda name: self._groups[name].last_access)
+                    del self._groups[oldest]
+
+                self._schedule_sweep()
+
+        return state
+
+    def evict(self, group:str):
+        """
+        Drop a group from memory, it is reloaded on its next access
+        """
+        with self._lock:
+            self._groups.pop(group, None)
+            self._evict_idle()
+
+    def _evict_idle(self):
+        """
+        Drop every group that hasn't been accessed in idle_seconds, caller holds the lock
+        """
+        cutoff = time.monotonic() - self.idle_seconds
+        for group in [name for name, state in self._groups.items() if state.last_access < cutoff]:
+            del self._groups[group]
+
+    def _schedule_sweep(self):
+        """
+        Start a timer for when the least recently used group goes idle, unless one is pending or nothing is loaded. Caller holds
+        the lock
+        """
+        if self._timer is not None or not self._groups:
+            return
+
+        due = min(state.last_access for state in self._groups.values()) + self.idle_seconds
+        self._timer = threading.Timer(max(due - time.monotonic(), 0) + 0.01, self._sweep)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _sweep(self):
+        """
+        Timer callback: drop idle groups and wait for the next one to go idle
+        """
+        with self._lock:
+            self._timer = None
+            self._evict_idle()
+            self._schedule_sweep()
@@ -0,0 +1,199 @@
+import pandas as pd
+import numpy as np
+
+
+# "Pete | Eric", "Pete, Eric", "Pete & Eric", "Pete and Eric" all list two opponents
+OPPONENT_SEPARATORS = r"\s*(?:\||,|&|/|\band\b)\s*"
+
+h2h_labels = {
+    "rounds":"Rounds Played Together",
+    "profit/loss":"Net Profit/Loss",
+    "diff_gap":"Average Differential Gap",
+    "win_rate":"Win Rate"
+}
+
+
+def opponent_edges(data:pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (player, opponent) pairing in each round, with the round's profit/loss split evenly across the opponents listed
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+
+    Returns:
+    -------------
+    edges:pd.DataFrame | columns: name, opponent, date, handicap_diff, pl_share
+    """
+
+    rounds = data.dropna(subset="opponent/s")
+
+    # Split each distinct opponent string once rather than once per round
+    codes, unique_opponents = pd.factorize(rounds["opponent/s"].astype(str))
+    split = pd.Series(unique_opponents).str.split(OPPONENT_SEPARATORS).explode().str.strip()
+    split = pd.DataFrame({"code":split.index, "opponent":split.values})
+
+    edges = rounds[["name", "date", "handicap_diff", "profit/loss"]].assign(code=codes, row=np.arange(len(rounds)))
+    edges = edges.merge(split, on="code").drop(columns="code")
+    edges = edges.loc[(edges["opponent"] != "") & (edges["opponent"] != edges["name"])]
+
+    n_opponents = edges.groupby("row")["opponent"].transform("size")
+    edges["pl_share"] = edges["profit/loss"].fillna(0) / n_opponents
+
+    return edges.drop(columns=["profit/loss", "row"]).reset_index(drop=True)
+
+
+class HeadToHead:
+    """
+    Dense N x N head-to-head totals for every pair of players, built with one grouped reduction and updated incrementally.
+    Entry [a, b] is from player a's point of view against opponent b
+    """
+
+    def __init__(self):
+        self.players = pd.Index([], dtype=object)
+        self.rounds = np.zeros((0, 0))
+        self.profit = np.zeros((0, 0))
+        self.gap_sum = np.zeros((0, 0))
+        self.matched = np.zeros((0, 0))
+        self.wins = np.zeros((0, 0))
+
+        # Sum and count of the differentials each player posted on each date, pairings already compared against them, and
+        # pairings whose opponent hasn't posted yet
+        self._posted = pd.DataFrame(columns=["diff_sum", "n"], index=pd.MultiIndex.from_arrays([[], []], names=["date", "opponent"]))
+        self._resolved = None
+        self._pending = None
+
+    @classmethod
+    def from_rounds(cls, data:pd.DataFrame):
+        """
+        Build the head-to-head totals from a full round history
+
+        Args:
+        -------------
+        data:pd.DataFrame | source of data
+
+        Returns:
+        -------------
+        h2h:HeadToHead | populated head-to-head structure
+        """
+        h2h = cls()
+        h2h.update(data)
+        return h2h
+
+    def _grow(self, names):
+        """
+        Add any new player names, padding the matrices with zeros
+        """
+        new = pd.Index(pd.unique(np.asarray(names, dtype=object))).difference(self.players)
+        if len(new) == 0:
+            return
+
+        self.players = self.players.append(new)
+        pad = len(new)
+        for attr in ["rounds", "profit", "gap_sum", "matched", "wins"]:
+            setattr(self, attr, np.pad(getattr(self, attr), ((0, pad), (0, pad))))
+
+    def _add(self, matrix:np.ndarray, edges:pd.DataFrame, weights=None):
+        """
+        Scatter-add edge weights into an N x N matrix with a single bincount
+        """
+        n = len(self.players)
+        flat = self.players.get_indexer(edges["name"]) * n + self.players.get_indexer(edges["opponent"])
+        matrix += np.bincount(flat, weights=weights, minlength=n * n).reshape(n, n)
+
+    def _add_results(self, edges:pd.DataFrame, sign:float=1.0):
+        """
+        Differential gap and wins for pairings where both players posted a differential, sign=-1 takes them back out
+        """
+        gap = (edges["handicap_diff"] - edges["opp_diff"]).to_numpy(dtype=float)
+        self._add(self.matched, edges, np.full(len(edges), sign))
+        self._add(self.gap_sum, edges, sign * gap)
+        self._add(self.wins, edges, sign * np.where(gap < 0, 1.0, np.where(gap == 0, 0.5, 0.0)))
+
+    def _opp_diffs(self, keys:pd.DataFrame) -> np.ndarray:
+        """
+        Differential each (date, opponent) posted, averaged over their rounds that day so it doesn't depend on row order
+        """
+        posted = self._posted.reindex(pd.MultiIndex.from_frame(keys[["date", "opponent"]]))
+        return (posted["diff_sum"] / posted["n"]).to_numpy(dtype=float)
+
+    def update(self, rounds:pd.DataFrame):
+        """
+        Add newly recorded rounds. Rounds already added should not be passed again
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | new rows of round data
+        """
+
+        edges = opponent_edges(rounds)
+        self._grow(np.concatenate([edges["name"].to_numpy(), edges["opponent"].to_numpy()]))
+
+        posted = rounds.dropna(subset="handicap_diff").groupby(["date", "name"])["handicap_diff"].agg(["sum", "count"])
+        posted = posted.set_axis(["diff_sum", "n"], axis=1).rename_axis(["date", "opponent"])
+        reposted = posted.index.intersection(self._posted.index)
+        self._posted = self._posted.add(posted, fill_value=0)
+
+        # Pairings already compared against a date's differentials are re-compared when more rounds arrive for that date
+        if len(reposted) and self._resolved is not None:
+            stale = pd.MultiIndex.from_frame(self._resolved[["date", "opponent"]]).isin(reposted)
+            redo = self._resolved.loc[stale]
+            self._add_results(redo, sign=-1.0)
+            redo = redo.assign(opp_diff=self._opp_diffs(redo))
+            self._add_results(redo)
+            self._resolved = pd.concat([self._resolved.loc[~stale], redo], ignore_index=True)
+
+        # Earlier pairings whose opponent has now posted their round
+        if self._pending is not None and len(self._pending):
+            waiting = pd.MultiIndex.from_frame(self._pending[["date", "opponent"]]).isin(posted.index)
+            resolved = self._pending.loc[waiting].assign(opp_diff=lambda e: self._opp_diffs(e))
+            self._add_results(resolved)
+            self._resolved = pd.concat([self._resolved, resolved], ignore_index=True)
+            self._pending = self._pending.loc[~waiting]
+
+        if edges.empty:
+            return
+
+        edges = edges.assign(opp_diff=self._opp_diffs(edges))
+        self._add(self.rounds, edges)
+        self._add(self.profit, edges, edges["pl_share"].to_numpy(dtype=float))
+
+        complete = edges["handicap_diff"].notna() & edges["opp_diff"].notna()
+        self._add_results(edges.loc[complete])
+        self._resolved = pd.concat([self._resolved, edges.loc[complete, ["name", "opponent", "date", "handicap_diff", "opp_diff"]]],
+                                   ignore_index=True)
+
+        waiting = edges.loc[edges["handicap_diff"].notna() & edges["opp_diff"].isna(), ["name", "opponent", "date", "handicap_diff"]]
+        self._pending = pd.concat([self._pending, waiting], ignore_index=True) if self._pending is not None else waiting
+
+    def matrices(self) -> dict:
+        """
+        Returns:
+        -------------
+        matrices:dict | {"rounds", "profit/loss", "diff_gap", "win_rate"} -> player x opponent DataFrame
+        """
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gap = self.gap_sum / self.matched
+            win_rate = self.wins / self.matched
+
+        frame = lambda values: pd.DataFrame(values, index=self.players.rename("name"), columns=self.players.rename("opponent"))
+        return {"rounds":frame(self.rounds), "profit/loss":frame(self.profit), "diff_gap":frame(gap), "win_rate":frame(win_rate)}
+
+    def pairs(self) -> pd.DataFrame:
+        """
+        Returns:
+        -------------
+        pairs:pd.DataFrame | long-form table with one row per pairing that has played together
+        """
+
+        name_idx, opp_idx = np.nonzero(self.rounds)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.DataFrame({
+                "name":self.players[name_idx],
+                "opponent":self.players[opp_idx],
+                "rounds":self.rounds[name_idx, opp_idx].astype(int),
+                "profit/loss":self.profit[name_idx, opp_idx],
+                "diff_gap":self.gap_sum[name_idx, opp_idx] / self.matched[name_idx, opp_idx],
+                "win_rate":self.wins[name_idx, opp_idx] / self.matched[name_idx, opp_idx]
+            })
@@ -0,0 +1,287 @@
+"""
+Local HTTP service for pushing rounds into a round data file from scripts or scorecard exports
+
+    python ingest_service.py serve --path real_data.csv --port 8765
+    python ingest_service.py loadgen --port 8765 --requests 2000 --concurrency 32 --bulk 1
+
+POST /rounds takes one round object, a list of them, or {"rounds": [...]}, with the fields of utils.add_round().
+Every round in a submission is validated before any are written, and the response is sent once they are on disk.
+GET /health reports the writer's totals
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from utils import round_from_dict
+from round_writer import RoundWriter
+
+
+MAX_BODY = 10 * 1024 * 1024
+
+_reasons = {200:"OK", 201:"Created", 400:"Bad Request", 404:"Not Found", 405:"Method Not Allowed", 413:"Payload Too Large",
+            422:"Unprocessable Entity", 500:"Internal Server Error"}
+
+
+class SubmissionError(ValueError):
+    """
+    Rounds in a submission that failed validation, errors maps each one's position in the submission to its message
+    """
+
+    def __init__(self, errors:dict):
+        self.errors = errors
+        super().__init__("; ".join(f"round {idx}: {message}" for idx, message in errors.items()))
+
+
+def parse_submission(body:bytes) -> list:
+    """
+    Validate a JSON submission of one or more rounds
+
+    Args:
+    -------------
+    body:bytes | request body
+
+    Returns:
+    -------------
+    rows:list | validated rows from utils.round_from_dict()
+
+    Errors
+    -----------
+    ValueError if the body isn't a JSON submission of rounds
+    SubmissionError with a message per invalid round, keyed by its position in the submission
+    """
+
+    try:
+        payload = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError(f"body is not valid JSON: {e}")
+
+    if isinstance(payload, dict) and "rounds" in payload:
+        payload = payload["rounds"]
+    records = payload if isinstance(payload, list) else [payload]
+    if not records:
+        raise ValueError("no rounds submitted")
+
+    rows, errors = [], {}
+    for idx, record in enumerate(records):
+        try:
+            rows.append(round_from_dict(record))
+        except ValueError as e:
+            errors[idx] = str(e)
+
+    if errors:
+        raise SubmissionError(errors)
+
+    return rows
+
+
+class IngestService:
+    """
+    asyncio HTTP/1.1 server in front of a RoundWriter. Requests are handled concurrently and their rounds are batched by the
+    writer, which updates handicaps for the affected players after each batch
+    """
+
+    def __init__(self, path:str, batch_window:float=0.05, max_batch:int=1000):
+        self.writer = RoundWriter(path, batch_window=batch_window, max_batch=max_batch)
+        self.requests = 0
+
+    async def _respond(self, stream:asyncio.StreamWriter, status:int, payload:dict, keep_alive:bool):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {_reasons[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        stream.write(head.encode() + body)
+        await stream.drain()
+
+    async def _route(self, method:str, target:str, body:bytes):
+        """
+        Returns:
+        -------------
+        status:int | HTTP status code
+        payload:dict | JSON response
+        """
+
+        if target == "/health":
+            return 200, {"requests":self.requests, "batches":self.writer.batches, "rounds_written":self.writer.rounds_written}
+        if target != "/rounds":
+            return 404, {"error":f"no route {target}"}
+        if method != "POST":
+            return 405, {"error":"use POST to submit rounds"}
+
+        try:
+            rows = parse_submission(body)
+        except SubmissionError as e:
+            return 422, {"errors":e.errors}
+        except ValueError as e:
+            return 422, {"error":str(e)}
+
+        try:
+            written = await asyncio.wrap_future(self.writer.submit(rows))
+        except Exception as e:
+            return 500, {"error":f"rounds were not saved: {e}"}
+
+        return 201, {"accepted":written}
+
+    async def handle(self, reader:asyncio.StreamReader, stream:asyncio.StreamWriter):
+        """
+        Serve requests on one connection until the client closes it
+        """
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(stream, 400, {"error":"malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                length = headers.get("content-length", "").strip() or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(stream, 400, {"error":f"invalid Content-Length {length!r}"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    await self._respond(stream, 413, {"error":f"body over {MAX_BODY} bytes"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                self.requests += 1
+                status, payload = await self._route(method, target.split("?")[0], body)
+                await self._respond(stream, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            stream.close()
+
+    async def serve(self, host:str="127.0.0.1", port:int=8765):
+        """
+        Run the server until cancelled, then write anything still queued
+        """
+
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Accepting rounds at http://{host}:{port}/rounds, writing to {self.writer.path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.writer.close()
+
+
+def _random_round(rng:np.random.Generator, players:list) -> dict:
+    """
+    Plausible round for load testing
+    """
+    name, opponent = rng.choice(players, 2, replace=False)
+    return {"name":str(name), "date":str(np.datetime64("2024-04-01") + rng.integers(0, 365)), "adj_gross_score":int(rng.integers(72, 105)),
+            "course_rating":72.9, "slope_rating":139, "putts":int(rng.integers(26, 40)), "profit/loss":float(rng.integers(-5, 6)),
+            "match_format":"Match Play", "golf_course":"Pembroke Lakes", "opponent/s":str(opponent), "notes":"load test"}
+
+
+async def load_generator(host:str="127.0.0.1", port:int=8765, requests:int=1000, concurrency:int=16, bulk:int=1,
+                         seed:int=0) -> dict:
+    """
+    Submit rounds over keep-alive connections and measure throughput and latency
+
+    Args:
+    -------------
+    host:str | service host
+    port:int | service port
+    requests:int | total number of POST requests
+    concurrency:int | number of connections submitting at once
+    bulk:int | rounds per request
+    seed:int | random seed for the generated rounds
+
+    Returns:
+    -------------
+    results:dict | requests, rounds, elapsed seconds, requests/s, rounds/s, p50/p99/max latency in ms and number of failed requests
+    """
+
+    rng = np.random.default_rng(seed)
+    players = ["Pete", "Dave", "Eric", "Fred", "Doc"]
+    latencies, failures = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal failures
+        reader, stream = await asyncio.open_connection(host, port)
+        try:
+            for _ in remaining:
+                body = json.dumps([_random_round(rng, players) for _ in range(bulk)]).encode()
+                start = time.perf_counter()
+                stream.write(f"POST /rounds HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await stream.drain()
+
+                status = int((await reader.readline()).split()[1])
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    key, _, value = line.decode("latin-1").partition(":")
+                    if key.strip().lower() == "content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+
+                latencies.append(time.perf_counter() - start)
+                failures += status != 201
+        finally:
+            stream.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {"requests":len(latencies), "rounds":len(latencies) * bulk, "elapsed_s":elapsed, "requests_per_s":len(latencies) / elapsed,
+            "rounds_per_s":len(latencies) * bulk / elapsed, "p50_ms":float(np.percentile(ms, 50)), "p99_ms":float(np.percentile(ms, 99)),
+            "max_ms":float(ms.max()), "failed":failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round ingestion service")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="accept rounds over HTTP")
+    serve.add_argument("--path", default="real_data.csv", help="round data file to append to")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--batch-window", type=float, default=0.05, help="seconds to gather submissions into one write")
+
+    loadgen = commands.add_parser("loadgen", help="measure throughput and latency of a running service")
+    loadgen.add_argument("--host", default="127.0.0.1")
+    loadgen.add_argument("--port", type=int, default=8765)
+    loadgen.add_argument("--requests", type=int, default=1000)
+    loadgen.add_argument("--concurrency", type=int, default=16)
+    loadgen.add_argument("--bulk", type=int, default=1, help="rounds per request")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        try:
+            asyncio.run(IngestService(args.path, batch_window=args.batch_window).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        results = asyncio.run(load_generator(args.host, args.port, args.requests, args.concurrency, args.bulk))
+        for key, value in results.items():
+            print(f"{key:>15}: {value:,.2f}" if isinstance(value, float) else f"{key:>15}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import threading
+import pandas as pd
+import numpy as np
+from collections import OrderedDict
+from figure_cache import data_fingerprint
+
+
+# Most recent KDE results, keyed by (column, bandwidth, grid_size, data version). Shared by every session's thread, so it is
+# only read or changed under the lock
+_kde_cache = OrderedDict()
+_kde_lock = threading.Lock()
+KDE_CACHE_SIZE = 32
+
+
+def bandwidths(data:pd.DataFrame, column:str, bandwidth="scott") -> pd.Series:
+    """
+    Kernel bandwidth for each player
+
+    Args:
+    -------------
+    data:pd.DataFrame | data with columns: "name" and continuous variable of interest
+    column:str | continuous variable of interest
+    bandwidth:str|float | "scott" (same rule as scipy's gaussian_kde), "silverman", or a fixed bandwidth in the column's units
+
+    Returns:
+    -------------
+    bw:pd.Series | bandwidth indexed by player name
+    """
+
+    grouped = data.dropna(subset=column).groupby("name", sort=False)[column]
+    n = grouped.size()
+
+    if isinstance(bandwidth, (int, float)):
+        return pd.Series(float(bandwidth), index=n.index)
+
+    std = grouped.std().fillna(0)
+
+    if bandwidth == "scott":
+        return std * n ** (-1 / 5)
+    elif bandwidth == "silverman":
+        iqr = grouped.quantile(.75) - grouped.quantile(.25)
+        spread = np.minimum(std, iqr / 1.34).where(iqr > 0, std)
+        return 0.9 * spread * n ** (-1 / 5)
+    else:
+        raise ValueError(f'bandwidth must be "scott", "silverman" or a number, got {bandwidth!r}')
+
+
+def kde_curves(data:pd.DataFrame, column:str, bandwidth="scott", grid_size:int=512, use_cache:bool=True) -> pd.DataFrame:
+    """
+    Gaussian KDE curves for every player at once. Values are linearly binned onto a shared grid and convolved with
+    each player's kernel via FFT, so the cost is O(n + players * grid log grid) instead of O(n * grid)
+
+    Args:
+    -------------
+    data:pd.DataFrame | data with columns: "name" and continuous variable of interest
+    column:str | continuous variable of interest
+    bandwidth:str|float | see bandwidths()
+    grid_size:int | number of points in the shared evaluation grid
+    use_cache:bool | reuse curves computed earlier for the same column, bandwidth and data
+
+    Returns:
+    -------------
+    curves:pd.DataFrame | density values indexed by the grid, one column per player
+
+    Errors
+    -----------
+    KeyError if data do not contain the correct columns
+    """
+
+    key = (column, bandwidth, grid_size, data_fingerprint(data[["name", column]]))
+    if use_cache:
+        with _kde_lock:
+            if key in _kde_cache:
+                _kde_cache.move_to_end(key)
+                return _kde_cache[key]
+
+    values = data.dropna(subset=column)
+    codes, players = pd.factorize(values["name"])
+    x = values[column].to_numpy(dtype=float)
+    n = np.bincount(codes, minlength=len(players))
+
+    bw = bandwidths(values, column, bandwidth).reindex(players).to_numpy()
+
+    # Shared grid wide enough for every player's tails
+    lo, hi = x.min(), x.max()
+    span = hi - lo if hi > lo else 1.0
+    dx = (span + 6 * max(bw.max(), span / grid_size)) / (grid_size - 1)
+    lo = lo - 3 * max(bw.max(), span / grid_size)
+    grid = lo + dx * np.arange(grid_size)
+
+    # Degenerate bandwidths (a single round, or identical values) fall back to one grid step
+    bw = np.where(bw > 0, bw, dx)
+
+    # Linear binning: each value splits its weight between the two nearest grid points
+    pos = (x - lo) / dx
+    left = np.clip(np.floor(pos).astype(int), 0, grid_size - 2)
+    frac = pos - left
+    flat = codes * grid_size + left
+    counts = np.bincount(flat, weights=1 - frac, minlength=len(players) * grid_size) \
+        + np.bincount(flat + 1, weights=frac, minlength=len(players) * grid_size)
+    counts = counts.reshape(len(players), grid_size)
+
+    # Kernels laid out circularly over a padded length so the convolution doesn't wrap around
+    size = 2 * grid_size
+    offsets = np.arange(size)
+    offsets = np.where(offsets < grid_size, offsets, offsets - size) * dx
+    kernels = np.exp(-0.5 * (offsets[None, :] / bw[:, None]) ** 2) / (bw[:, None] * np.sqrt(2 * np.pi))
+
+    density = np.fft.irfft(np.fft.rfft(counts, n=size, axis=1) * np.fft.rfft(kernels, axis=1), n=size, axis=1)
+    density = np.clip(density[:, :grid_size], 0, None) / n[:, None]
+
+    curves = pd.DataFrame(density.T, index=pd.Index(grid, name=column), columns=players)
+
+    # Computed outside the lock, a session computing the same curves at the same time just replaces them
+    if use_cache:
+        with _kde_lock:
+            _kde_cache[key] = curves
+            _kde_cache.move_to_end(key)
+            while len(_kde_cache) > KDE_CACHE_SIZE:
+                _kde_cache.popitem(last=False)
+
+    return curves
@@ -0,0 +1,228 @@
+import copy
+import itertools
+
+import pandas as pd
+import numpy as np
+from sortedcontainers import SortedList
+
+
+# Ranked metrics: label and whether lower values rank first
+leaderboard_metrics = {
+    "handicap":("Handicap Index", True),
+    "profit":("Total Profit/Loss", False),
+    "form":("Recent Form (Avg of Last 5 Differentials)", True)
+}
+
+FORM_ROUNDS = 5
+
+
+class Leaderboard:
+    """
+    Players kept in rank order for every metric in leaderboard_metrics, one SortedList of (sort key, player) per metric.
+    A new round repositions its player in O(log n) per metric, top-k reads the first k entries and a player's rank is a
+    bisection, so none of them scan the group. Players tied on a metric share a rank
+    """
+
+    def __init__(self):
+        self._ranked = {metric:SortedList() for metric in leaderboard_metrics}
+        self._values = {metric:{} for metric in leaderboard_metrics}
+
+        # Running state per player for the incremental metrics: total profit, date of the latest round, (date, handicap) of
+        # the latest round with a handicap and (date, differential) of the latest rounds. Entries are replaced, never changed
+        # in place, so forks can share them
+        self._profit = {}
+        self._last_date = {}
+        self._latest = {}
+        self._recent = {}
+
+    @classmethod
+    def from_rounds(cls, data:pd.DataFrame):
+        """
+        Rank every player from a full round history
+
+        Args:
+        -------------
+        data:pd.DataFrame | source of data with handicaps computed
+
+        Returns:
+        -------------
+        leaderboard:Leaderboard | populated leaderboard
+        """
+        leaderboard = cls()
+        leaderboard.update(data)
+        return leaderboard
+
+    def fork(self):
+        """
+        Leaderboard for the next version of the data. Its containers are copied, one entry per player, and the entries shared
+
+        Returns:
+        -------------
+        leaderboard:Leaderboard | leaderboard that update() can change without changing this one
+        """
+        fork = copy.copy(self)
+        fork._ranked = {metric:ranked.copy() for metric, ranked in self._ranked.items()}
+        fork._values = {metric:dict(values) for metric, values in self._values.items()}
+        for attr in ["_profit", "_last_date", "_latest", "_recent"]:
+            setattr(fork, attr, dict(getattr(self, attr)))
+        return fork
+
+    def __len__(self):
+        return len(self._profit)
+
+    def n_ranked(self, metric:str) -> int:
+        """
+        Number of players with a value for a metric
+        """
+        return len(self._ranked[metric])
+
+    def _key(self, metric:str, value:float):
+        return value if leaderboard_metrics[metric][1] else -value
+
+    def set(self, player:str, metric:str, value:float):
+        """
+        Move a player to the position for a new value of a metric, a missing value takes them off that metric's board
+        """
+
+        values = self._values[metric]
+        if player in values:
+            self._ranked[metric].remove((self._key(metric, values.pop(player)), player))
+        if value is not None and not np.isnan(value):
+            values[player] = float(value)
+            self._ranked[metric].add((self._key(metric, float(value)), player))
+
+    def _set_latest(self, rounds:pd.DataFrame) -> set:
+        """
+        Take each player's latest handicap from rounds sorted by date, unless a later round already gave one. Returns the
+        players whose handicap changed
+        """
+        changed = set()
+        rated = rounds.dropna(subset="handicap").groupby("name", sort=False).tail(1)
+        for name, date, handicap in zip(rated["name"], rated["date"], rated["handicap"]):
+            latest = self._latest.get(name)
+            if latest is None or date >= latest[0]:
+                self._latest[name] = (date, handicap)
+                changed.add(name)
+        return changed
+
+    def update(self, rounds:pd.DataFrame) -> list:
+        """
+        Fold new rounds into each player's profit total, latest handicap and recent form, and re-rank the players involved.
+        The rounds are summarized per player in a few grouped passes, so the work left in Python is per player rather than per round
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | new rows of round data with handicaps computed, rounds already added should not be passed again
+
+        Returns:
+        -------------
+        backdated:list | players with a new round older than their latest one, whose later handicaps may have been recomputed,
+                         see refresh_handicaps()
+        """
+
+        rounds = rounds.dropna(subset=["name", "date"])
+        if rounds.empty:
+            return []
+
+        rounds = rounds.reindex(columns=["name", "date", "profit/loss", "handicap", "handicap_diff"]).sort_values("date", kind="stable")
+        by_name = rounds.groupby("name", sort=False)
+        profit = by_name["profit/loss"].sum(min_count=1)
+        first, last = by_name["date"].min(), by_name["date"].max()
+
+        backdated = [name for name, date in first.items() if name in self._last_date and date < self._last_date[name]]
+        for name, total in profit.items():
+            before = self._profit.get(name, np.nan)
+            self._profit[name] = total if np.isnan(before) else before + np.nan_to_num(total)
+            self._last_date[name] = max(self._last_date.get(name, last[name]), last[name])
+        self._set_latest(rounds)
+
+        # Latest differentials kept in date order, a backdated round only enters if it is among the latest
+        diffs = rounds.dropna(subset="handicap_diff").groupby("name", sort=False).tail(FORM_ROUNDS).sort_values("name", kind="stable")
+        for name, items in itertools.groupby(zip(diffs["name"], diffs["date"], diffs["handicap_diff"]), key=lambda item: item[0]):
+            recent = self._recent.get(name, []) + [(date, diff) for _, date, diff in items]
+            self._recent[name] = sorted(recent, key=lambda item: item[0])[-FORM_ROUNDS:]
+
+        for name in profit.index:
+            self.set(name, "profit", self._profit[name])
+            self.set(name, "handicap", self._latest.get(name, (None, np.nan))[1])
+            recent = self._recent.get(name)
+            self.set(name, "form", np.mean([diff for _, diff in recent]) if recent else np.nan)
+
+        return backdated
+
+    def refresh(self, rounds:pd.DataFrame):
+        """
+        Re-read current handicaps from recomputed rounds, e.g. the rounds after a backdated one
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | rows of round data whose handicaps were recomputed, already added with update()
+        """
+        for name in self._set_latest(rounds.sort_values("date", kind="stable")):
+            self.set(name, "handicap", self._latest[name][1])
+
+    def rank(self, player:str, metric:str):
+        """
+        Args:
+        -------------
+        player:str | name of the player
+        metric:str | key of leaderboard_metrics
+
+        Returns:
+        -------------
+        rank:int|None | 1 for the leader, None if the player has no value for the metric
+        """
+        value = self._values[metric].get(player)
+        if value is None:
+            return None
+        # (key,) sorts before every (key, player), so this counts the players strictly ahead
+        return self._ranked[metric].bisect_left((self._key(metric, value),)) + 1
+
+    def ranks(self, player:str) -> dict:
+        """
+        Returns:
+        -------------
+        ranks:dict | the player's rank and value for every metric, {metric: (rank, value)}
+        """
+        return {metric:(self.rank(player, metric), self._values[metric].get(player)) for metric in leaderboard_metrics}
+
+    def top(self, metric:str, k:int=10) -> pd.DataFrame:
+        """
+        The leading players on a metric
+
+        Args:
+        -------------
+        metric:str | key of leaderboard_metrics
+        k:int | number of players, None for everyone ranked
+
+        Returns:
+        -------------
+        top:pd.DataFrame | columns: rank, name, value, best first
+        """
+
+        leaders = list(itertools.islice(self._ranked[metric], k))
+        keys = [key for key, _ in leaders]
+        names = [name for _, name in leaders]
+
+        # Players tied with the one before them share their rank
+        ranks = []
+        for idx, key in enumerate(keys):
+            ranks.append(ranks[-1] if idx and key == keys[idx - 1] else idx + 1)
+        return pd.DataFrame({"rank":ranks, "name":names, "value":[self._values[metric][name] for name in names]},
+                            columns=["rank", "name", "value"])
+
+
+def refresh_handicaps(leaderboard:Leaderboard, data:pd.DataFrame, players:list, since:pd.Timestamp):
+    """
+    Re-read the current handicaps of players whose handicaps were recomputed from a date on, only their rounds since then
+    are read
+
+    Args:
+    -------------
+    leaderboard:Leaderboard | leaderboard to update
+    data:pd.DataFrame | source of data with handicaps computed
+    players:list | names of the players whose handicaps may have changed, see Leaderboard.update()
+    since:pd.Timestamp | date of the earliest recomputed round
+    """
+    if players:
+        leaderboard.refresh(data.loc[data["name"].isin(players).to_numpy() & (data["date"] >= since).to_numpy()])
@@ -0,0 +1,372 @@
+"""
+Headless load test of the app: N concurrent sessions click through its widgets against generated datasets
+
+    python load_test.py --sessions 1 4 8 --rounds 100 500 --players 5 --steps 10
+    python load_test.py --app dashboard --sessions 4
+
+By default each session runs the real entry point, streamlit.py, from a working directory where the generated rounds stand in
+for the fake data, the default group and a second group, so sessions switch tabs, add rounds through the recompute worker and
+switch between groups in the registry. --app dashboard runs only dashboard() over the generated rounds.
+
+Latency: each session is a Streamlit AppTest in its own process, all started together so their reruns compete for the machine.
+AppTest drives the script runner through process-global state, so sessions can't run concurrently inside one process.
+
+Memory: measured separately inside one process, which plays the server: sessions are opened one after another and kept alive
+(session state, worker snapshots and the shared caches and group registry all stay in memory), recording resident memory as each
+one is added. first_session_mb includes the shared caches the first session fills, mb_per_added_session is the average growth
+for each session after it
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import multiprocessing
+import time
+import warnings
+
+import pandas as pd
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The app's entry point is named streamlit.py, import the real package before this directory can shadow it
+_path = sys.path[:]
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != APP_DIR]
+from streamlit.testing.v1 import AppTest
+sys.path[:] = _path
+
+from utils import get_handicaps
+from settlement import settlement_methods
+from groups import group_slug
+
+# Scripts each session runs. "dashboard": dashboard() over the generated rounds, "streamlit": the app's entry point, with the
+# tab menu (a custom component AppTest can't click) read from session state so sessions can switch tabs
+APP_SCRIPTS = {
+    "dashboard":"""
+import pandas as pd
+import streamlit as st
+from dashboard import dashboard
+
+if "df" not in st.session_state:
+    st.session_state.df = pd.read_csv("synthetic_data.csv", parse_dates=["date"])
+dashboard(st.session_state.df)
+""",
+    "streamlit":"""
+import runpy
+import streamlit as st
+import streamlit_option_menu
+
+streamlit_option_menu.option_menu = lambda *args, **kwargs: st.session_state.get("load_test_tab", "Fake Data")
+runpy.run_path({entry!r}, run_name="__main__")
+"""
+}
+
+# Tables the app reads from its working directory besides the round data
+APP_FILES = ["ESC.csv", "handicap_rds.csv"]
+
+# Group partition added next to the default group, so sessions can switch groups
+SECOND_GROUP = "Load Test Group"
+
+courses = ["Augusta National", "Pebble Beach", "Bethpage Black", "Kiawah Island", "Whistling Straits", "Pinehurst", "Hollybrook", "Harbortown"]
+notes = ["I played well", "I played badly", "I got lucky", "I got unlucky", "The golf Gods hate me"]
+
+
+def generate_rounds(n_players:int=5, rounds_per_player:int=100, start_date:str="2023-01-01", seed:int=0) -> pd.DataFrame:
+    """
+    Synthetic rounds with the same distributions as utils.generate_data(), drawn for every player and round at once
+
+    Args:
+    -------------
+    n_players:int | number of players
+    rounds_per_player:int | rounds recorded by each player
+    start_date:str | date of each player's first round
+    seed:int | random seed
+
+    Returns:
+    -------------
+    data:pd.DataFrame | rounds with differentials and handicaps computed
+    """
+
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Player {i + 1}" for i in range(n_players)])
+    shape = (n_players, rounds_per_player)
+
+    # Per-player averages, broadcast over their rounds
+    avg = lambda low, high: rng.integers(low, high, n_players)[:, None]
+    clip = lambda values, low, high: np.clip(values.astype(int), low, high)
+
+    score = np.maximum(rng.normal(avg(80, 90), 5, shape), 72).astype(int)
+    course_rating = rng.choice([71, 71.5, 72, 72.5, 73, 73.5], shape)
+    slope_rating = rng.integers(110, 130, shape)
+    opponents = (np.arange(n_players)[:, None] + rng.integers(1, max(n_players, 2), shape)) % n_players
+
+    data = pd.DataFrame({
+        "name":np.repeat(names, rounds_per_player),
+        "date":(pd.Timestamp(start_date) + pd.to_timedelta(np.cumsum(rng.choice([2, 3], shape), axis=1).ravel(), unit="D")),
+        "adj_gross_score":score.ravel(),
+        "course_rating":course_rating.ravel(),
+        "slope_rating":slope_rating.ravel(),
+        "putts":clip(rng.normal(avg(18, 54), 5, shape), 18, 54).ravel(),
+        "3_putts":clip(rng.normal(avg(0, 10), 1, shape), 0, 18).ravel(),
+        "fairways_hit":clip(rng.normal(avg(1, 14), 2, shape), 0, 18).ravel(),
+        "gir":clip(rng.normal(avg(0, 18), 2, shape), 0, 18).ravel(),
+        "penalty/ob":np.maximum(rng.normal(avg(0, 10), 2, shape), 0).astype(int).ravel(),
+        "birdies":np.maximum(rng.normal(avg(0, 2), 1, shape), 0).astype(int).ravel(),
+        "trpl_bogeys_plus":np.maximum(rng.normal(avg(0, 3), 1, shape), 0).astype(int).ravel(),
+        "profit/loss":(np.rint(rng.normal(rng.choice(np.arange(-1, 1.5, .5), n_players)[:, None], 2, shape) * 2) / 2).ravel(),
+        "match_format":rng.choice(["Skins", "Match Play", "Stroke Play", "Dots"], shape).ravel(),
+        "golf_course":rng.choice(courses, shape).ravel(),
+        "opponent/s":names[opponents].ravel(),
+        "notes":rng.choice(notes, shape).ravel()
+    })
+    data["handicap_diff"] = (data["adj_gross_score"] - data["course_rating"]) * 113 / data["slope_rating"]
+
+    return get_handicaps(data).reset_index(drop=True)
+
+
+def _pick(widget, rng:np.random.Generator):
+    """
+    Set a selectbox to one of its options at random, by position since options are shown through format functions
+    """
+    return widget.select_index(int(rng.integers(len(widget.options))))
+
+
+def _add_round(at, widget, rng:np.random.Generator):
+    """
+    Fill in the round entry form for one of the generated players and submit it to the recompute worker
+    """
+    _widget(at, "text_input", "Name:").input(f"Player {int(rng.integers(1, 4))}")
+    _widget(at, "number_input", "Adjusted Gross Score (Must know single hole limits)").set_value(int(rng.integers(75, 100)))
+    return widget.click()
+
+
+# Interactions a viewer makes: the kind and label of the widget each one sets, and how it sets it. Each triggers a rerun
+interactions = {
+    "trend metric":("selectbox", "Trend Metric:", lambda at, w, rng: _pick(w, rng)),
+    "aggregate metric":("selectbox", "Choose a metric to aggregate:", lambda at, w, rng: _pick(w, rng)),
+    "head-to-head metric":("selectbox", "Head-to-Head Metric:", lambda at, w, rng: _pick(w, rng)),
+    "distribution metric":("selectbox", "Distribution Metric:", lambda at, w, rng: _pick(w, rng)),
+    "proportion metric":("selectbox", "Proportion Metric:", lambda at, w, rng: _pick(w, rng)),
+    "scatter x-variable":("selectbox", "X-Variable:", lambda at, w, rng: _pick(w, rng)),
+    "rolling window":("slider", "Number of Rounds to Include in the Rolling Window:", lambda at, w, rng: w.set_value(int(rng.integers(5, 31)))),
+    "z-score threshold":("slider", "Z-Score Threshold:", lambda at, w, rng: w.set_value(float(rng.choice([2.0, 2.5, 3.0, 3.5])))),
+    "settlement method":("radio", "Settlement Method:", lambda at, w, rng: w.set_value(str(rng.choice(settlement_methods)))),
+    "notes search":("text_input", "Search Notes:", lambda at, w, rng: w.input(str(rng.choice(["lucky", '"played well"', "gods"])))),
+    "round search":("selectbox", "Choose a Date:", lambda at, w, rng: _pick(w, rng)),
+    "add round":("button", "Add Round?", _add_round),
+    "golf group":("selectbox", "Golf Group:", lambda at, w, rng: _pick(w, rng))
+}
+
+
+def _widget(at, kind:str, label:str):
+    """
+    The widget of a kind with the given label
+    """
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise KeyError(f"no {kind} labeled {label!r}")
+
+
+def _interact(at, rng:np.random.Generator, app:str) -> str:
+    """
+    Make one random interaction with a widget on the current page, or switch tabs when running the app's entry point
+
+    Returns:
+    -------------
+    name:str | the interaction made
+    """
+
+    available = [name for name, (kind, label, _) in interactions.items() if any(w.label == label for w in getattr(at, kind))]
+    if app == "streamlit":
+        available.append("switch tab")
+
+    name = available[rng.integers(len(available))]
+    if name == "switch tab":
+        tab = at.session_state["load_test_tab"] if "load_test_tab" in at.session_state else "Fake Data"
+        at.session_state["load_test_tab"] = "Real Data" if tab == "Fake Data" else "Fake Data"
+    else:
+        kind, label, action = interactions[name]
+        action(at, _widget(at, kind, label), rng)
+    return name
+
+
+def _rss_mb() -> float:
+    """
+    Resident memory of this process in MB, falling back to the peak where /proc isn't available
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _open_app(workdir:str):
+    """
+    Run sessions from the working directory holding the generated data, with the app's modules importable
+    """
+    warnings.filterwarnings("ignore")
+    os.chdir(workdir)
+    if APP_DIR not in sys.path:
+        sys.path.append(APP_DIR)
+
+
+def _session(workdir:str, app:str, steps:int, seed:int, timeout:float, start) -> tuple:
+    """
+    One viewer in its own process: load the page, then make random interactions, timing each rerun
+
+    Returns:
+    -------------
+    timings:list | (interaction, seconds) for every rerun
+    errors:list | exceptions raised by the app or the harness
+    """
+
+    _open_app(workdir)
+    rng = np.random.default_rng(seed)
+    timings, errors = [], []
+    at = AppTest.from_file(os.path.join(workdir, "app.py"), default_timeout=timeout)
+    start.wait()
+
+    try:
+        began = time.perf_counter()
+        at.run()
+        timings.append(("initial load", time.perf_counter() - began))
+
+        for _ in range(steps):
+            name = _interact(at, rng, app)
+            began = time.perf_counter()
+            at.run()
+            timings.append((name, time.perf_counter() - began))
+
+            if at.exception:
+                errors.append(f"{name}: {at.exception[0].value}")
+    except Exception as e:
+        errors.append(repr(e))
+
+    return timings, errors
+
+
+def _session_memory(workdir:str, app:str, n_sessions:int, steps:int, seed:int, timeout:float) -> tuple:
+    """
+    Memory the sessions add to one server process: open them one after another, each making its interactions, and keep them all
+    alive, reading resident memory before the first and after each one
+
+    Returns:
+    -------------
+    first_mb:float | growth from the first session, including the shared caches it fills
+    per_added_mb:float | average growth from each session after the first, nan with a single session
+    """
+
+    _open_app(workdir)
+    sessions, rss = [], [_rss_mb()]
+    for i in range(n_sessions):
+        rng = np.random.default_rng(seed + i)
+        at = AppTest.from_file(os.path.join(workdir, "app.py"), default_timeout=timeout)
+        at.run()
+        for _ in range(steps):
+            _interact(at, rng, app)
+            at.run()
+        sessions.append(at)
+        rss.append(_rss_mb())
+
+    return rss[1] - rss[0], (rss[-1] - rss[1]) / (n_sessions - 1) if n_sessions > 1 else np.nan
+
+
+def _prepare_workdir(workdir:str, app:str, n_players:int, size:int, seed:int):
+    """
+    Working directory the sessions run from: the generated rounds as the fake data, the default group and a second group,
+    the app's reference tables, and the script each session runs
+    """
+
+    generate_rounds(n_players, size, seed=seed).to_csv(os.path.join(workdir, "synthetic_data.csv"), index=False)
+    generate_rounds(n_players, size, seed=seed + 1).to_csv(os.path.join(workdir, "real_data.csv"), index=False)
+
+    second = os.path.join(workdir, "groups", group_slug(SECOND_GROUP))
+    os.makedirs(second)
+    generate_rounds(n_players, size, seed=seed + 2).to_csv(os.path.join(second, "rounds.csv"), index=False)
+
+    for name in APP_FILES:
+        shutil.copy(os.path.join(APP_DIR, name), workdir)
+    with open(os.path.join(workdir, "app.py"), "w") as f:
+        f.write(APP_SCRIPTS[app].format(entry=os.path.join(APP_DIR, "streamlit.py")))
+
+
+def run_load_test(session_counts:list=[1, 4], rounds_per_player:list=[100], n_players:int=5, steps:int=10, seed:int=0,
+                  timeout:float=300, app:str="streamlit") -> pd.DataFrame:
+    """
+    Run every combination of dataset size and number of concurrent sessions. Latency comes from sessions in their own processes,
+    started together behind a barrier so their reruns overlap, memory from the same number of sessions kept alive in one process
+
+    Args:
+    -------------
+    session_counts:list | numbers of concurrent sessions to simulate
+    rounds_per_player:list | dataset sizes to generate, in rounds per player
+    n_players:int | players in each generated dataset
+    steps:int | interactions per session after the initial load
+    seed:int | random seed for datasets and interactions
+    timeout:float | seconds a single rerun may take before it counts as failed
+    app:str | "streamlit" to run the app's entry point, "dashboard" to run dashboard() alone
+
+    Returns:
+    -------------
+    report:pd.DataFrame | one row per (rounds, sessions, interaction): count, p50/p90/p99/max rerun latency in ms, errors,
+                          and the memory of the first and each added session in one process in MB
+    """
+
+    if app not in APP_SCRIPTS:
+        raise ValueError(f"app must be one of {list(APP_SCRIPTS)}, got {app!r}")
+
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in rounds_per_player:
+            for n_sessions in session_counts:
+                # A fresh copy of the data per run, rounds added by one run's sessions don't carry into the next
+                workdir = os.path.join(tmp, f"rounds_{size}_sessions_{n_sessions}")
+                os.makedirs(workdir)
+                _prepare_workdir(workdir, app, n_players, size, seed)
+
+                with context.Manager() as manager, context.Pool(n_sessions) as pool:
+                    start = manager.Barrier(n_sessions)
+                    sessions = pool.starmap(_session, [(workdir, app, steps, seed + i, timeout, start) for i in range(n_sessions)])
+
+                with context.Pool(1) as pool:
+                    first_mb, per_added_mb = pool.apply(_session_memory, (workdir, app, n_sessions, steps, seed, timeout))
+
+                timings = pd.DataFrame([t for session in sessions for t in session[0]], columns=["interaction", "seconds"])
+                errors = [e for session in sessions for e in session[1]]
+
+                summary = timings.groupby("interaction")["seconds"].describe(percentiles=[.5, .9, .99])
+                for interaction, stats in summary.iterrows():
+                    rows.append({"rounds":size * n_players, "sessions":n_sessions, "interaction":interaction, "count":int(stats["count"]),
+                                 "p50_ms":stats["50%"] * 1000, "p90_ms":stats["90%"] * 1000, "p99_ms":stats["99%"] * 1000,
+                                 "max_ms":stats["max"] * 1000, "errors":len(errors), "first_session_mb":first_mb,
+                                 "mb_per_added_session":per_added_mb})
+                for error in errors[:5]:
+                    print(f"[{size * n_players} rounds, {n_sessions} sessions] {error}", file=sys.stderr)
+
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the dashboard")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4], help="numbers of concurrent sessions")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[100], help="dataset sizes in rounds per player")
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=10, help="interactions per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app", choices=list(APP_SCRIPTS), default="streamlit", help="run the app's entry point or dashboard() alone")
+    args = parser.parse_args()
+
+    report = run_load_test(args.sessions, args.rounds, args.players, args.steps, args.seed, app=args.app)
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.float_format", "{:,.1f}".format):
+        print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import copy
+import os
+import pickle
+import re
+import shlex
+import zlib
+from collections import defaultdict
+
+import pandas as pd
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text) -> list:
+    """
+    Lowercase word tokens of a note, "Three-putted #7, wind 15mph" -> ["three", "putted", "7", "wind", "15mph"]
+    """
+    return TOKEN_PATTERN.findall(str(text).lower()) if isinstance(text, str) else []
+
+
+def _note_bytes(note) -> bytes:
+    """
+    A note as bytes for the notes hash, missing notes as empty, each ended by a separator so moved text changes the hash
+    """
+    return (note if isinstance(note, str) else "").encode() + b"\x1f"
+
+
+def index_path(csv_path:str) -> str:
+    """
+    Location of the notes index stored next to a round data file, "real_data.csv" -> "real_data.notes.idx"
+    """
+    return os.path.splitext(csv_path)[0] + ".notes.idx"
+
+
+class NotesIndex:
+    """
+    Positional inverted index over the notes column: token -> {round id: positions of the token in the note}.
+    Keyword queries intersect posting lists and phrase queries also check consecutive positions, so a query only
+    touches the rounds containing its rarest term. Rounds are only ever appended, so a fork() for the next version of the data
+    shares every posting list with this index, which ignores round ids past its own length
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+
+        # Row label, player and date of each indexed round, by round id
+        self.labels = []
+        self.names = []
+        self.dates = []
+        self._ids = {}
+
+        # Rounds this index covers, the shared lists run longer once a fork has added rounds
+        self._n = 0
+
+        # CRC32 of the indexed notes in round id order, carried forward as rounds are added
+        self.notes_hash = 0
+
+    @classmethod
+    def from_rounds(cls, data:pd.DataFrame):
+        """
+        Build the index from a full round history
+
+        Args:
+        -------------
+        data:pd.DataFrame | source of data
+
+        Returns:
+        -------------
+        index:NotesIndex | populated index
+        """
+        index = cls()
+        index.update(data)
+        return index
+
+    def __len__(self):
+        return self._n
+
+    def fork(self):
+        """
+        Index for the next version of the data, sharing the postings and round lists with this one instead of copying them.
+        Rounds the fork adds get ids past this index's length, so searches here don't see them. Only the latest fork can add
+        rounds
+
+        Returns:
+        -------------
+        index:NotesIndex | index that update() can extend
+        """
+        return copy.copy(self)
+
+    def update(self, rounds:pd.DataFrame) -> int:
+        """
+        Add rounds that aren't indexed yet, matched on row label
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | rows of round data
+
+        Returns:
+        -------------
+        n_added:int | number of rounds added
+        """
+
+        if self._n != len(self.labels):
+            raise RuntimeError("a fork of this notes index has added rounds since, update the latest fork instead")
+
+        new = rounds.loc[~rounds.index.isin(list(self._ids))]
+        for label, name, date, note in zip(new.index, new["name"], new["date"], new["notes"]):
+            doc = len(self.labels)
+            self._ids[label] = doc
+            self.labels.append(label)
+            self.names.append(name)
+            self.dates.append(pd.Timestamp(date))
+            self.notes_hash = zlib.crc32(_note_bytes(note), self.notes_hash)
+
+            for pos, token in enumerate(tokenize(note)):
+                self.postings[token].setdefault(doc, []).append(pos)
+
+        self._n = len(self.labels)
+        return len(new)
+
+    def _phrase_docs(self, tokens:list, candidates:set=None) -> set:
+        """
+        Round ids whose notes contain the tokens consecutively
+        """
+
+        lists = [self.postings.get(token, {}) for token in tokens]
+        if not all(lists):
+            return set()
+
+        # Intersect starting from the rarest token
+        docs = set(min(lists, key=len)) if candidates is None else set(candidates)
+        for postings in sorted(lists, key=len):
+            docs.intersection_update(postings)
+            if not docs:
+                return docs
+
+        if len(tokens) == 1:
+            return docs
+
+        matches = set()
+        for doc in docs:
+            starts = set(lists[0][doc])
+            for offset, postings in enumerate(lists[1:], start=1):
+                starts.intersection_update(pos - offset for pos in postings[doc])
+                if not starts:
+                    break
+            if starts:
+                matches.add(doc)
+        return matches
+
+    def search(self, query:str, players:list=None, start=None, end=None) -> list:
+        """
+        Rounds whose notes match every term in the query, most recent first
+
+        Args:
+        -------------
+        query:str | keywords and "quoted phrases", e.g. 'wind "three putt"'
+        players:list | optional player names to keep
+        start:date-like | optional first date to keep
+        end:date-like | optional last date to keep
+
+        Returns:
+        -------------
+        labels:list | row labels of the matching rounds
+        """
+
+        try:
+            terms = shlex.split(query)
+        except ValueError:
+            terms = query.replace('"', " ").split()
+        terms = [tokens for tokens in map(tokenize, terms) if tokens]
+        if not terms:
+            return []
+
+        # Rarest terms first so the candidate set shrinks fastest
+        terms.sort(key=lambda tokens: min(len(self.postings.get(token, {})) for token in tokens))
+        docs = None
+        for tokens in terms:
+            docs = self._phrase_docs(tokens, docs)
+            if not docs:
+                return []
+
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        docs = [doc for doc in docs if doc < self._n and (players is None or self.names[doc] in players)
+                and (start is None or self.dates[doc] >= start) and (end is None or self.dates[doc] <= end)]
+
+        docs.sort(key=lambda doc: (self.dates[doc], doc), reverse=True)
+        return [self.labels[doc] for doc in docs]
+
+    def save(self, path:str):
+        """
+        Write the index to disk, via a temporary file so a reader never sees a partial index
+
+        Args:
+        -------------
+        path:str | location of the index file, see index_path()
+        """
+        n = self._n
+        postings = dict(self.postings)
+        if n < len(self.labels):
+            # Leave out rounds added by a later fork
+            postings = {token:{doc:pos for doc, pos in docs.items() if doc < n} for token, docs in postings.items()}
+            postings = {token:docs for token, docs in postings.items() if docs}
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"postings":postings, "labels":self.labels[:n], "names":self.names[:n], "dates":self.dates[:n],
+                         "notes_hash":self.notes_hash}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path:str):
+        """
+        Read an index written by save()
+
+        Args:
+        -------------
+        path:str | location of the index file
+
+        Returns:
+        -------------
+        index:NotesIndex | the stored index
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+
+        index = cls()
+        index.postings.update(state["postings"])
+        index.labels, index.names, index.dates = state["labels"], state["names"], state["dates"]
+        index.notes_hash = state["notes_hash"]
+        index._ids = {label:doc for doc, label in enumerate(index.labels)}
+        index._n = len(index.labels)
+        return index
+
+    def matches(self, data:pd.DataFrame) -> bool:
+        """
+        Whether the indexed rounds are still rows of data with the same player, date and notes, i.e. data only had rounds appended
+        """
+
+        labels = self.labels[:self._n]
+        if len(self) > len(data) or data.index.isin(labels).sum() != len(self):
+            return False
+        indexed = data.loc[labels]
+        if not (np.array_equal(indexed["name"].to_numpy(), np.asarray(self.names[:self._n], dtype=object))
+                and np.array_equal(indexed["date"].to_numpy(), np.asarray(self.dates[:self._n], dtype="datetime64[ns]"))):
+            return False
+        return zlib.crc32(b"".join(map(_note_bytes, indexed["notes"]))) == self.notes_hash
+
+
+def load_notes_index(data:pd.DataFrame, csv_path:str) -> NotesIndex:
+    """
+    Load the notes index stored next to a round data file, index any rounds appended since it was saved, and save it back if it
+    changed. The index is rebuilt from scratch if rounds were removed or their player, date or notes were edited
+
+    Args:
+    -------------
+    data:pd.DataFrame | round data read from csv_path
+    csv_path:str | location of the round data file
+
+    Returns:
+    -------------
+    index:NotesIndex | index covering every round in data
+    """
+
+    path = index_path(csv_path)
+    index = None
+    if os.path.exists(path):
+        try:
+            index = NotesIndex.load(path)
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+            index = None
+
+    if index is None or not index.matches(data):
+        index = NotesIndex()
+
+    if index.update(data) or not os.path.exists(path):
+        try:
+            index.save(path)
+        except OSError:
+            pass
+
+    return index
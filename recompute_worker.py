@@ -0,0 +1,199 @@
+import threading
+import time
+
+import pandas as pd
+import numpy as np
+
+from utils import update_handicaps
+from notes_index import NotesIndex
+from aggregates import TrendPyramid
+from skill_model import SkillModel
+from forecast import HandicapForecast
+from leaderboard import Leaderboard, refresh_handicaps
+
+
+class Snapshot:
+    """
+    One consistent version of a session's derived data: the rounds with handicaps, the notes index, the trend aggregates,
+    the player skill / course difficulty model, the handicap forecasting state and the player leaderboard. Never modified once
+    published, the worker builds the next one alongside it
+    """
+
+    def __init__(self, data:pd.DataFrame, notes_index:NotesIndex, trends:TrendPyramid, skills:SkillModel=None,
+                 forecast:HandicapForecast=None, leaderboard:Leaderboard=None, version:int=0):
+        self.data = data
+        self.notes_index = notes_index
+        self.trends = trends
+        self.skills = skills
+        self.forecast = forecast
+        self.leaderboard = leaderboard
+        self.version = version
+
+
+class RecomputeWorker:
+    """
+    Background thread that folds added rounds into a new snapshot so the page never waits on a handicap recompute.
+    Rounds added within coalesce_window seconds of each other are recomputed together, and the new snapshot replaces the
+    old one in a single assignment, so readers see either the old version or the new one. The snapshot's rounds should have
+    their handicaps computed (load_rounds() does), added rounds only recompute the handicaps of their players.
+    The thread exits after idle_seconds without work and is restarted by the next submission, so a worker left behind by an
+    ended session holds no thread and is freed with the session
+    """
+
+    def __init__(self, snapshot:Snapshot, coalesce_window:float=0.25, idle_seconds:float=60):
+        self.coalesce_window = coalesce_window
+        self.idle_seconds = idle_seconds
+        self.snapshot = snapshot
+        self.error = None
+
+        self._pending = []
+        self._closed = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._idle = threading.Event()
+        self._idle.set()
+
+    @property
+    def busy(self) -> bool:
+        """
+        Whether rounds have been added that the published snapshot doesn't include yet
+        """
+        return not self._idle.is_set()
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the worker thread is alive, it is only started once rounds are submitted
+        """
+        with self._lock:
+            return self._thread is not None
+
+    def submit(self, rounds):
+        """
+        Queue rounds to be added, returns immediately
+
+        Args:
+        -------------
+        rounds:dict|list|pd.DataFrame | one round from add_round(), a list of them, or a dataframe of rounds
+        """
+
+        if isinstance(rounds, dict):
+            rounds = pd.DataFrame([rounds])
+        elif not isinstance(rounds, pd.DataFrame):
+            rounds = pd.DataFrame(list(rounds))
+
+        with self._wake:
+            if self._closed:
+                raise RuntimeError("recompute worker is closed")
+            self._pending.append(rounds)
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="RecomputeWorker", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def wait(self, timeout:float=None) -> bool:
+        """
+        Block until every submitted round is in the published snapshot
+
+        Returns:
+        -------------
+        done:bool | False if the timeout passed first
+        """
+        return self._idle.wait(timeout)
+
+    def close(self, timeout:float=None):
+        """
+        Publish anything still queued and stop the worker thread
+        """
+        with self._wake:
+            self._closed = True
+            thread = self._thread
+            self._wake.notify()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        """
+        Worker thread: wait for rounds, let a burst finish arriving, then recompute once for all of them. Exits once idle for
+        idle_seconds or closed
+        """
+
+        while True:
+            with self._wake:
+                if not self._pending and not self._closed:
+                    self._wake.wait(self.idle_seconds)
+                if not self._pending:
+                    self._thread = None
+                    return
+
+            if not self._closed:
+                time.sleep(self.coalesce_window)
+            with self._wake:
+                batch, self._pending = self._pending, []
+
+            try:
+                self.snapshot = self._recompute(self.snapshot, pd.concat(batch, ignore_index=True))
+                self.error = None
+            except Exception as e:
+                # Keep serving the last good snapshot, the error is shown alongside it
+                self.error = e
+
+            with self._wake:
+                if not self._pending:
+                    self._idle.set()
+
+    def _recompute(self, snapshot:Snapshot, new:pd.DataFrame) -> Snapshot:
+        """
+        Next snapshot with the new rounds added. Sessions may still be reading the previous snapshot, so its structures are
+        forked rather than updated: a fork shares everything the new rounds don't change and copies only what they do
+        """
+
+        new["date"] = pd.to_datetime(new["date"])
+        previous = snapshot.data
+        # Rows keep their labels, which the notes index is keyed on, and new rounds are labelled after the last one
+        start = int(previous.index.max()) + 1 if len(previous) else 0
+        new.index = pd.RangeIndex(start, start + len(new))
+        data = pd.concat([previous, new.reindex(columns=previous.columns.union(new.columns, sort=False))])
+
+        players = new["name"].unique().tolist()
+        data, _ = update_handicaps(data, players, new["date"].min())
+        added = data.loc[new.index]
+
+        notes_index = snapshot.notes_index.fork()
+        notes_index.update(added)
+
+        # New rounds merge into the trend aggregates, unless they changed handicaps that were already aggregated. Only the
+        # new rounds' players can have changed
+        touched = previous["name"].isin(players).to_numpy()
+        before = previous["handicap"].to_numpy(dtype=float)[touched] if "handicap" in previous.columns else np.full(touched.sum(), np.nan)
+        after = data["handicap"].to_numpy(dtype=float)[:len(previous)][touched]
+        if np.allclose(after, before, equal_nan=True):
+            trends = snapshot.trends.fork()
+            trends.update(added)
+        else:
+            trends = TrendPyramid.from_rounds(data)
+
+        # The skill model doesn't depend on handicaps, so new rounds always refit warm from the previous solution
+        skills = None
+        if snapshot.skills is not None:
+            skills = snapshot.skills.fork()
+            skills.update(added)
+
+        # Smoothing state steps forward for rounds after each player's latest, a backdated round refits it
+        forecast = None
+        if snapshot.forecast is not None:
+            forecast = snapshot.forecast.fork()
+            if not forecast.update(added):
+                forecast = HandicapForecast.from_rounds(data)
+
+        # New rounds re-rank only their players, taking handicaps from their recomputed rows. A backdated round also moved the
+        # handicaps of its player's later rounds, which are re-read
+        leaderboard = None
+        if snapshot.leaderboard is not None:
+            leaderboard = snapshot.leaderboard.fork()
+            backdated = leaderboard.update(added)
+            refresh_handicaps(leaderboard, data, backdated, new["date"].min())
+
+        return Snapshot(data, notes_index, trends, skills, forecast, leaderboard, snapshot.version + 1)
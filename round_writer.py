@@ -0,0 +1,237 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils import get_handicaps, update_handicaps
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on Windows, writers in the same process are still serialized by the writer thread
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path:str):
+    """
+    Exclusive advisory lock on a data file, held through a sidecar "<path>.lock" file so readers of the data file are never blocked.
+    Every process writing the file (app, notebook, ingestion service) takes this lock first
+
+    Args:
+    -------------
+    path:str | location of the data file
+    """
+
+    with open(f"{path}.lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def atomic_write_csv(data:pd.DataFrame, path:str):
+    """
+    Write a CSV through a temporary file in the same directory and rename it into place, so readers see either the old file
+    or the new one and never a partial write
+
+    Args:
+    -------------
+    data:pd.DataFrame | data to write
+    path:str | destination
+    """
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            data.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _file_stamp(path:str) -> tuple:
+    """
+    (modification time, size) of a file, changes whenever it is rewritten
+    """
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class RoundWriter:
+    """
+    Single writer for a round data file. Submissions go on a queue, and a background thread writes everything that arrives
+    within batch_window seconds of the first one in one locked, atomic read-append-write. Each submission gets a future that
+    resolves once its rounds are on disk, or raises if the write failed
+    """
+
+    def __init__(self, path:str, batch_window:float=0.05, max_batch:int=1000, handicaps:bool=True):
+        self.path = path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.handicaps = handicaps
+
+        self.batches = 0
+        self.rounds_written = 0
+
+        # Last data written and the file's (mtime, size) right after, so the file is only re-read if another process wrote to it
+        self._data = None
+        self._stamp = None
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"RoundWriter({path})", daemon=True)
+        self._thread.start()
+
+    def submit(self, rounds) -> Future:
+        """
+        Queue rounds to be written
+
+        Args:
+        -------------
+        rounds:dict|list|pd.DataFrame | one round from add_round(), a list of them, or a dataframe of rounds
+
+        Returns:
+        -------------
+        ack:Future | resolves to the number of rounds written for this submission
+        """
+
+        if self._closed:
+            raise RuntimeError(f"writer for {self.path} is closed")
+
+        if isinstance(rounds, dict):
+            rounds = pd.DataFrame([rounds])
+        elif not isinstance(rounds, pd.DataFrame):
+            rounds = pd.DataFrame(list(rounds))
+
+        ack = Future()
+        self._queue.put((rounds, ack))
+        return ack
+
+    def _run(self):
+        """
+        Writer thread: block for a submission, gather whatever else arrives within the batch window, write once
+        """
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.batch_window
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch:list):
+        """
+        Append a batch of submissions to the file under the file lock, then acknowledge each submitter
+        """
+
+        batch = [(rounds, ack) for rounds, ack in batch if ack.set_running_or_notify_cancel()]
+        submitted = [rounds for rounds, _ in batch if len(rounds)]
+
+        try:
+            if submitted:
+                new = pd.concat(submitted, ignore_index=True)
+                new["date"] = pd.to_datetime(new["date"])
+
+                with file_lock(self.path):
+                    # Re-read under the lock if another process wrote since, so their rounds are kept
+                    if os.path.exists(self.path):
+                        current = self._data if self._stamp == _file_stamp(self.path) else pd.read_csv(self.path, parse_dates=["date"])
+                        data = pd.concat([current, new.reindex(columns=current.columns.union(new.columns, sort=False))],
+                                         ignore_index=True)
+                    else:
+                        data = new
+
+                    if self.handicaps and data["handicap_diff"].notna().any():
+                        if "handicap" not in data.columns or data["handicap"].isna().all():
+                            data = get_handicaps(data)
+                        else:
+                            data, _ = update_handicaps(data, new["name"].unique().tolist(), new["date"].min())
+
+                    atomic_write_csv(data, self.path)
+                    self._data, self._stamp = data, _file_stamp(self.path)
+
+                self.batches += 1
+                self.rounds_written += len(new)
+
+        except Exception as e:
+            for _, ack in batch:
+                ack.set_exception(e)
+            return
+
+        for rounds, ack in batch:
+            ack.set_result(len(rounds))
+
+    def flush(self, timeout:float=None):
+        """
+        Wait for everything submitted so far to be written
+        """
+        self.submit(pd.DataFrame()).result(timeout)
+
+    def close(self, timeout:float=None):
+        """
+        Write anything still queued and stop the writer thread
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path:str, **kwargs) -> RoundWriter:
+    """
+    The process-wide writer for a data file, so every session in the process funnels through the same queue
+
+    Args:
+    -------------
+    path:str | location of the round data file
+    **kwargs | passed to RoundWriter() when the writer is first created
+
+    Returns:
+    -------------
+    writer:RoundWriter | writer for the file
+    """
+
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or writer._closed:
+            writer = _writers[key] = RoundWriter(path, **kwargs)
+        return writer
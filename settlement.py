@@ -0,0 +1,207 @@
+import heapq
+
+import pandas as pd
+import numpy as np
+
+from head_to_head import opponent_edges
+
+
+settlement_methods = ["greedy", "optimal"]
+
+
+def _date_range(data:pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """
+    Rounds played between start and end, inclusive. None leaves that side open
+    """
+    keep = pd.Series(True, index=data.index)
+    if start is not None:
+        keep &= data["date"] >= pd.Timestamp(start)
+    if end is not None:
+        keep &= data["date"] <= pd.Timestamp(end)
+    return data.loc[keep]
+
+
+def pairwise_ledger(data:pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """
+    Net amount owed between every pair of players, built with grouped reductions over the opponent pairings.
+    A match recorded by both players on the same date is the average of the two sides' records, a match only one of them
+    recorded counts at that record's full value
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    start:date-like | first date to settle, None for the start of the history
+    end:date-like | last date to settle, None for the end of the history
+
+    Returns:
+    -------------
+    ledger:pd.DataFrame | player x opponent matrix, entry [a, b] is what b owes a (negative when a owes b)
+    """
+
+    edges = opponent_edges(_date_range(data, start, end))
+    players = pd.Index(pd.unique(np.concatenate([edges["name"].to_numpy(), edges["opponent"].to_numpy()])), dtype=object).sort_values()
+    n = len(players)
+
+    # Each side's record of a pairing on a date, signed as what the alphabetically later player owes the earlier one
+    a, b = players.get_indexer(edges["name"]), players.get_indexer(edges["opponent"])
+    low, high = np.minimum(a, b), np.maximum(a, b)
+    sides = pd.DataFrame({"date":edges["date"].to_numpy(), "pair":low * n + high, "side":a == low,
+                          "owed":np.where(a == low, 1.0, -1.0) * edges["pl_share"].to_numpy(dtype=float)})
+    sides = sides.groupby(["date", "pair", "side"], sort=False)["owed"].sum().reset_index()
+
+    # One or both sides per match, averaging only when both recorded it
+    matches = sides.groupby(["date", "pair"], sort=False)["owed"].agg(["sum", "size"])
+    owed = np.bincount(matches.index.get_level_values("pair"), weights=matches["sum"] / matches["size"], minlength=n * n).reshape(n, n)
+
+    return pd.DataFrame(owed - owed.T, index=players.rename("name"), columns=players.rename("opponent"))
+
+
+def balances(data:pd.DataFrame, start=None, end=None) -> pd.Series:
+    """
+    Net position of each player, positive if they are owed money. Balances sum to zero
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    start:date-like | first date to settle
+    end:date-like | last date to settle
+
+    Returns:
+    -------------
+    balances:pd.Series | net amount indexed by player name
+    """
+    return pairwise_ledger(data, start, end).sum(axis=1).rename("balance")
+
+
+def settle_greedy(balances:pd.Series, tol:float=0.005) -> pd.DataFrame:
+    """
+    Settle up by repeatedly having the largest debtor pay the largest creditor. Every transfer clears at least one player,
+    so there are at most n - 1 transfers, in O(n log n) with two heaps
+
+    Args:
+    -------------
+    balances:pd.Series | net amount indexed by player name, see balances()
+    tol:float | amounts smaller than this are treated as settled
+
+    Returns:
+    -------------
+    transfers:pd.DataFrame | columns: payer, payee, amount
+    """
+
+    creditors = [(-amount, name) for name, amount in balances.items() if amount > tol]
+    debtors = [(amount, name) for name, amount in balances.items() if amount < -tol]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, payee = heapq.heappop(creditors)
+        debt, payer = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append({"payer":payer, "payee":payee, "amount":amount})
+
+        if -credit - amount > tol:
+            heapq.heappush(creditors, (credit + amount, payee))
+        if -debt - amount > tol:
+            heapq.heappush(debtors, (debt + amount, payer))
+
+    return pd.DataFrame(transfers, columns=["payer", "payee", "amount"])
+
+
+def zero_sum_groups(balances:pd.Series, tol:float=0.005) -> list:
+    """
+    Split the players into as many groups as possible that each net to zero. Settling each group separately takes
+    n - (number of groups) transfers, which is the minimum possible.
+    Dynamic program over subsets, vectorized one subset size at a time, so it is limited to about 20 players with open balances
+
+    Args:
+    -------------
+    balances:pd.Series | net amount indexed by player name, players with a zero balance should be left out
+    tol:float | rounding tolerance, amounts are compared in units of tol
+
+    Returns:
+    -------------
+    groups:list | lists of player names, each netting to zero
+    """
+
+    n = len(balances)
+    if n == 0:
+        return []
+
+    # Integer units so subset sums are exactly zero; rounding leftovers go to the largest balance so the total stays zero
+    units = np.rint(balances.to_numpy(dtype=float) / tol).astype(np.int64)
+    units[np.argmax(np.abs(units))] -= units.sum()
+
+    masks = np.arange(1 << n)
+    bits = (masks[:, None] >> np.arange(n)[None, :]) & 1
+    totals = bits @ units
+    size = bits.sum(axis=1)
+
+    # best[mask]: most zero-sum groups the players in mask can be split into
+    best = np.zeros(1 << n, dtype=np.int64)
+    for k in range(1, n + 1):
+        layer = masks[size == k]
+        sub = np.where(bits[layer].astype(bool), best[layer[:, None] ^ (1 << np.arange(n))[None, :]], -1)
+        best[layer] = sub.max(axis=1) + (totals[layer] == 0)
+
+    # Walk back from the full set, every zero-sum subset on the path closes a group
+    names = balances.index.to_numpy()
+    groups, mask, closed = [], (1 << n) - 1, (1 << n) - 1
+    while mask:
+        for i in range(n):
+            if mask >> i & 1 and best[mask ^ (1 << i)] + (totals[mask] == 0) == best[mask]:
+                mask ^= 1 << i
+                break
+        if totals[mask] == 0:
+            groups.append(names[[i for i in range(n) if (closed ^ mask) >> i & 1]].tolist())
+            closed = mask
+
+    return groups
+
+
+def settle_optimal(balances:pd.Series, tol:float=0.005, max_players:int=18) -> pd.DataFrame:
+    """
+    Settle up with the fewest possible transfers: split the players into zero-sum groups (see zero_sum_groups()) and settle
+    each group greedily. Falls back to settle_greedy() when more than max_players have open balances
+
+    Args:
+    -------------
+    balances:pd.Series | net amount indexed by player name, see balances()
+    tol:float | amounts smaller than this are treated as settled
+    max_players:int | largest number of open balances to solve exactly, the subset search is O(2^n * n)
+
+    Returns:
+    -------------
+    transfers:pd.DataFrame | columns: payer, payee, amount
+    """
+
+    open_balances = balances.loc[balances.abs() > tol]
+    if len(open_balances) > max_players:
+        return settle_greedy(balances, tol)
+
+    parts = [settle_greedy(open_balances.loc[group], tol) for group in zero_sum_groups(open_balances, tol)]
+    return pd.concat(parts, ignore_index=True) if parts else settle_greedy(open_balances, tol)
+
+
+def settle(data:pd.DataFrame, start=None, end=None, method:str="greedy", tol:float=0.005) -> pd.DataFrame:
+    """
+    Transfers that settle everyone's profit/loss between two dates
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    start:date-like | first date to settle, None for the start of the history
+    end:date-like | last date to settle, None for the end of the history
+    method:str | "greedy" (at most n - 1 transfers) or "optimal" (fewest transfers)
+    tol:float | amounts smaller than this are treated as settled
+
+    Returns:
+    -------------
+    transfers:pd.DataFrame | columns: payer, payee, amount
+    """
+
+    if method not in settlement_methods:
+        raise ValueError(f"method must be one of {settlement_methods}, got {method!r}")
+
+    net = balances(data, start, end)
+    return settle_greedy(net, tol) if method == "greedy" else settle_optimal(net, tol)
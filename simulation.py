@@ -0,0 +1,312 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+from scipy.special import ndtr
+
+from utils import get_handicaps, current_handicaps
+
+
+match_formats = ["Stroke Play", "Match Play", "Skins", "Nassau"]
+
+
+def recent_differentials(data:pd.DataFrame, players:list, window:int=20):
+    """
+    Each player's most recent handicap differentials, packed into a padded array for vectorized sampling
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    players:list | names of the players in the match
+    window:int | number of most recent rounds to sample from
+
+    Returns:
+    -------------
+    samples:np.ndarray | players x window array of differentials, padded with nan
+    counts:np.ndarray | number of valid differentials for each player
+    """
+
+    recent = data.dropna(subset="handicap_diff").sort_values("date", kind="stable").groupby("name").tail(window)
+    samples = np.full((len(players), window), np.nan)
+    counts = np.zeros(len(players), dtype=int)
+
+    for idx, player in enumerate(players):
+        diffs = recent.loc[recent["name"] == player, "handicap_diff"].to_numpy()
+        if len(diffs) < 3:
+            raise ValueError(f"{player} needs at least 3 recorded rounds to be simulated, found {len(diffs)}")
+        samples[idx, :len(diffs)] = diffs
+        counts[idx] = len(diffs)
+
+    return samples, counts
+
+
+def _hole_distributions(samples:np.ndarray, offsets:np.ndarray, hole_sd:float):
+    """
+    Distribution of a hole score for every differential a player can be sampled with. A hole is the player's per-hole
+    average (their net differential / 18) plus normal hole-to-hole noise, rounded to whole strokes
+
+    Args:
+    -------------
+    samples:np.ndarray | players x window array of differentials, see recent_differentials()
+    offsets:np.ndarray | strokes received by each player
+    hole_sd:float | standard deviation of a hole score around the player's per-hole average
+
+    Returns:
+    -------------
+    pmf:np.ndarray | players x window x scores probability of each hole score, on a grid of whole strokes shared by all players
+    beaten:np.ndarray | same shape, probability of scoring higher than each score on the grid
+    """
+    means = (samples - offsets[:, None]) / 18
+    sd = max(hole_sd, 1e-9)
+    reach = int(np.ceil(5 * sd)) + 1
+    grid = np.arange(np.floor(np.nanmin(means)) - reach, np.ceil(np.nanmax(means)) + reach + 1)
+
+    # P(score <= k) is P(noise < k + 0.5 - mean), the grid reaches far enough into both tails to leave nothing out
+    at_most = ndtr((grid + 0.5 - means[..., None]) / sd)
+    return np.diff(at_most, axis=-1, prepend=0), 1 - at_most
+
+
+def _outright(pmf_rows:list, beaten_rows:list, axes:list, out:list) -> np.ndarray:
+    """
+    Each player's chance of a score times every other player's chance of scoring higher, summed over the scores, as one
+    einsum per player. axes labels each player's rows, the last label is the score grid
+    """
+    outright = []
+    for i in range(len(pmf_rows)):
+        operands = []
+        for j in range(len(pmf_rows)):
+            operands += [pmf_rows[j] if j == i else beaten_rows[j], axes[j]]
+        outright.append(np.einsum(*operands, out, optimize=True))
+    return np.stack(outright)
+
+
+def _outright_probs(pmf:np.ndarray, beaten:np.ndarray, picks:np.ndarray) -> np.ndarray:
+    """
+    Probability that each player wins a hole outright, given the differential picked for each of them in each simulation
+
+    Args:
+    -------------
+    pmf:np.ndarray | see _hole_distributions()
+    beaten:np.ndarray | see _hole_distributions()
+    picks:np.ndarray | players x sims index of each player's sampled differential
+
+    Returns:
+    -------------
+    outright:np.ndarray | players x sims probabilities, the rest of each column is the chance the hole is tied
+    """
+    n_players = len(picks)
+    return _outright([pmf[j][picks[j]] for j in range(n_players)], [beaten[j][picks[j]] for j in range(n_players)],
+                     [[0, 1]] * n_players, [0])
+
+
+def outright_table(samples:np.ndarray, counts:np.ndarray, offsets:np.ndarray, hole_sd:float) -> np.ndarray:
+    """
+    _outright_probs() for every combination of sampled differentials at once. The combinations are the outer product of
+    the players' differentials, so the einsum runs over it directly rather than over a row per combination
+
+    Args:
+    -------------
+    samples:np.ndarray | players x window array of differentials, see recent_differentials()
+    counts:np.ndarray | number of valid differentials for each player
+    offsets:np.ndarray | strokes received by each player
+    hole_sd:float | standard deviation of a hole score around the player's per-hole average
+
+    Returns:
+    -------------
+    table:np.ndarray | players x combinations, indexed by np.ravel_multi_index(picks, counts)
+    """
+    pmf, beaten = _hole_distributions(samples, offsets, hole_sd)
+    n_players = len(counts)
+    table = _outright([pmf[j][:counts[j]] for j in range(n_players)], [beaten[j][:counts[j]] for j in range(n_players)],
+                      [[j, n_players] for j in range(n_players)], list(range(n_players)))
+    return table.reshape(n_players, -1)
+
+
+def _hole_winners(outright:np.ndarray, rng:np.random.Generator) -> np.ndarray:
+    """
+    Draw who wins each of the 18 holes from the per-simulation outright probabilities. The draws are 16-bit uniform integers
+    compared against the cumulative probabilities, which is plenty of resolution for odds quoted to a few decimals
+
+    Args:
+    -------------
+    outright:np.ndarray | players x sims, see _outright_probs()
+    rng:np.random.Generator | random generator
+
+    Returns:
+    -------------
+    winners:np.ndarray | 18 x sims index of each hole's winner, n_players where the hole is tied
+    """
+    thresholds = np.minimum(np.rint(np.cumsum(outright, axis=0) * 65536), 65535).astype(np.uint16)
+    u = rng.integers(0, 65536, size=(18, outright.shape[1]), dtype=np.uint16)
+    winners = np.zeros(u.shape, dtype=np.int8)
+    for threshold in thresholds:
+        winners += (u >= threshold).view(np.int8)
+    return winners
+
+
+def _simulate_chunk(samples:np.ndarray, counts:np.ndarray, offsets:np.ndarray, match_format:str, n_sims:int, stake:float,
+                    hole_sd:float, seed, outright:np.ndarray=None) -> tuple:
+    """
+    Simulate one chunk of matches. Hole-by-hole formats draw each hole's winner from the outright probabilities of the
+    differentials the simulation picked, looked up in outright (see outright_table()) when given
+
+    Returns:
+    -------------
+    wins:np.ndarray | number of simulations each player won
+    ties:np.ndarray | number of simulations each player tied or halved
+    profit:np.ndarray | total profit/loss for each player across the simulations
+    """
+
+    rng = np.random.default_rng(seed)
+    n_players = len(counts)
+
+    # Bootstrap one differential per player per simulation from their recent rounds, players x sims
+    picks = (rng.random((n_players, n_sims)) * counts[:, None]).astype(np.intp)
+    rounds = samples[np.arange(n_players)[:, None], picks] - offsets[:, None]
+
+    wins = np.zeros(n_players)
+    ties = np.zeros(n_players)
+    profit = np.zeros(n_players)
+
+    if match_format in ["Match Play", "Nassau", "Skins"]:
+        if match_format != "Skins" and n_players != 2:
+            raise ValueError(f"{match_format} is simulated between exactly 2 players, got {n_players}")
+        if outright is not None:
+            winners = _hole_winners(outright[:, np.ravel_multi_index(picks, counts)], rng)
+        else:
+            winners = _hole_winners(_outright_probs(*_hole_distributions(samples, offsets, hole_sd), picks), rng)
+
+    if match_format == "Stroke Play":
+        # Totals are compared in whole strokes, players tied for the low total split what the others pay
+        strokes = np.rint(rounds)
+        low = strokes == strokes.min(axis=0)
+        n_low = low.sum(axis=0)
+        wins += (low & (n_low == 1)).sum(axis=1)
+        ties += (low & (n_low > 1)).sum(axis=1)
+        profit += stake * (np.where(low, (n_players - n_low) / n_low, 0.0).sum(axis=1) - (~low).sum(axis=1))
+
+    elif match_format in ["Match Play", "Nassau"]:
+        # +1 for each hole player 0 wins, -1 for each hole player 1 wins
+        holes = (winners == 0).view(np.int8) - (winners == 1).view(np.int8)
+        overall = np.sign(holes.sum(axis=0, dtype=np.int8))
+        wins += [(overall > 0).sum(), (overall < 0).sum()]
+        ties += (overall == 0).sum()
+
+        net = overall.sum()
+        if match_format == "Nassau":
+            net += np.sign(holes[:9].sum(axis=0, dtype=np.int8)).sum() + np.sign(holes[9:].sum(axis=0, dtype=np.int8)).sum()
+        profit += stake * np.array([net, -net])
+
+    elif match_format == "Skins":
+        # A hole won outright is worth itself plus every tied hole since the last outright win
+        holes = np.arange(18, dtype=np.int8)[:, None]
+        won = winners < n_players
+        last_win = np.maximum.accumulate(np.where(won, holes, np.int8(-1)), axis=0)
+        carried = np.where(won, holes - np.vstack([np.full((1, n_sims), -1, dtype=np.int8), last_win[:-1]]), np.int8(0))
+        skins = np.stack([(carried * (winners == i)).sum(axis=0, dtype=np.int16) for i in range(n_players)])
+
+        # Each skin is paid by every other player
+        results = stake * (skins * n_players - skins.sum(axis=0))
+        wins += (results > 0).sum(axis=1)
+        ties += (results == 0).sum(axis=1)
+        profit += results.sum(axis=1)
+
+    else:
+        raise ValueError(f"match_format must be one of {match_formats}, got {match_format!r}")
+
+    return wins, ties, profit
+
+
+def simulate_match(data:pd.DataFrame, players:list, match_format:str="Stroke Play", n_sims:int=1_000_000, stake:float=1.0,
+                   window:int=20, use_handicaps:bool=True, hole_sd:float=0.9, seed:int=None, n_jobs:int=1,
+                   chunk_size:int=200_000) -> pd.DataFrame:
+    """
+    Monte Carlo simulation of a match, sampling each player's round from their recent differential distribution
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    players:list | names of the players in the match
+    match_format:str | one of ["Stroke Play", "Match Play", "Skins", "Nassau"], Match Play and Nassau are 2-player matches
+    n_sims:int | number of simulated matches
+    stake:float | betting units per bet (per skin for Skins, per bet of the three for Nassau)
+    window:int | number of most recent rounds each player's results are sampled from
+    use_handicaps:bool | whether players receive strokes, i.e. results are differentials net of each player's handicap index
+    hole_sd:float | hole-to-hole variability in strokes, used by the hole-by-hole formats
+    seed:int | random seed for reproducible lines
+    n_jobs:int | number of worker processes, 1 runs in-process
+    chunk_size:int | simulations per chunk, bounds memory use
+
+    Returns:
+    -------------
+    lines:pd.DataFrame | per player: win probability, tie probability, expected profit/loss per match and fair decimal odds.
+                         Stroke Play totals are compared in whole strokes and a tie means sharing the low total.
+                         For Skins a "win" means finishing the match up money
+    """
+
+    if match_format not in match_formats:
+        raise ValueError(f"match_format must be one of {match_formats}, got {match_format!r}")
+
+    samples, counts = recent_differentials(data, players, window)
+
+    if use_handicaps:
+        if "handicap" not in data.columns or data["handicap"].isna().all():
+            data = get_handicaps(data)
+        offsets = current_handicaps(data).reindex(players).fillna(0).to_numpy()
+    else:
+        offsets = np.zeros(len(players))
+
+    sizes = [chunk_size] * (n_sims // chunk_size) + ([n_sims % chunk_size] if n_sims % chunk_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    # With fewer combinations of sampled differentials than simulations, every combination's hole odds are worked out once
+    outright = None
+    if match_format != "Stroke Play" and np.prod(counts, dtype=float) <= n_sims:
+        outright = outright_table(samples, counts, offsets, hole_sd)
+
+    jobs = [(samples, counts, offsets, match_format, size, stake, hole_sd, s, outright) for size, s in zip(sizes, seeds)]
+
+    if n_jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*jobs)))
+    else:
+        results = [_simulate_chunk(*job) for job in jobs]
+
+    wins, ties, profit = (np.sum(parts, axis=0) for parts in zip(*results))
+
+    lines = pd.DataFrame({"win_prob":wins / n_sims, "tie_prob":ties / n_sims, "expected_profit":profit / n_sims},
+                         index=pd.Index(players, name="name"))
+    lines["fair_odds"] = 1 / lines["win_prob"].where(lines["win_prob"] > 0)
+
+    return lines
+
+
+def pairing_lines(data:pd.DataFrame, players:list=None, match_format:str="Match Play", **kwargs) -> pd.DataFrame:
+    """
+    Simulate every 2-player pairing and return the fair line for each
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    players:list | names of the players to pair up, defaults to everyone with at least 3 differentials
+    match_format:str | one of ["Stroke Play", "Match Play", "Skins", "Nassau"]
+    **kwargs | passed to simulate_match()
+
+    Returns:
+    -------------
+    lines:pd.DataFrame | one row per pairing with the first player's win/tie probability and expected profit/loss
+    """
+
+    if players is None:
+        n_rounds = data.dropna(subset="handicap_diff").groupby("name").size()
+        players = n_rounds.index[n_rounds >= 3].tolist()
+
+    if kwargs.get("use_handicaps", True) and ("handicap" not in data.columns or data["handicap"].isna().all()):
+        data = get_handicaps(data)
+
+    rows = []
+    for player, opponent in itertools.combinations(players, 2):
+        result = simulate_match(data, [player, opponent], match_format, **kwargs)
+        rows.append({"name":player, "opponent":opponent, **result.loc[player].to_dict()})
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,183 @@
+import copy
+
+import pandas as pd
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import lsmr
+
+
+class SkillModel:
+    """
+    Joint fit of each player's skill and each course's difficulty from handicap differentials:
+
+        handicap_diff = skill[player] + offset[course] + noise
+
+    Differentials already adjust for the published course and slope ratings, so a course's offset is how many strokes harder
+    (positive) or easier than its ratings it has played for this group, after accounting for who played it. The design matrix
+    has one row per round with a 1 in the player's column and a 1 in the course's column, and is solved with LSMR.
+    The damping keeps players or courses seen only a few times near the average rather than fitting their noise.
+    Refits after new rounds start from the previous solution, so they converge in a few iterations
+    """
+
+    def __init__(self, damp:float=0.5, course_column:str="golf_course"):
+        self.damp = damp
+        self.course_column = course_column
+
+        self.players = pd.Index([])
+        self.courses = pd.Index([])
+        self._player_codes = np.empty(0, dtype=np.int64)
+        self._course_codes = np.empty(0, dtype=np.int64)
+        self._y = np.empty(0)
+        self._x = None
+        self._center = 0.0
+
+        self.iterations = 0
+        self.residual_sd = np.nan
+
+    def fork(self):
+        """
+        Model for the next version of the data. update() replaces the design arrays and solution rather than changing them in
+        place, so the fork shares them with this model until it refits
+
+        Returns:
+        -------------
+        model:SkillModel | model that update() can extend without changing this one
+        """
+        return copy.copy(self)
+
+    @classmethod
+    def from_rounds(cls, data:pd.DataFrame, **kwargs):
+        """
+        Fit the model to a full round history
+
+        Args:
+        -------------
+        data:pd.DataFrame | source of data with handicap_diff
+        **kwargs | passed to SkillModel()
+
+        Returns:
+        -------------
+        model:SkillModel | fitted model
+        """
+        model = cls(**kwargs)
+        model.update(data)
+        return model
+
+    def update(self, rounds:pd.DataFrame) -> int:
+        """
+        Add rounds to the design and refit, warm-started from the current solution
+
+        Args:
+        -------------
+        rounds:pd.DataFrame | new rows of round data, rounds already added should not be passed again
+
+        Returns:
+        -------------
+        iterations:int | LSMR iterations the refit took
+        """
+
+        rounds = rounds.dropna(subset=["handicap_diff", self.course_column])
+        if rounds.empty:
+            return 0
+
+        # Codes for players and courses seen before stay put, new ones are appended
+        self.players = self.players.append(pd.Index(rounds["name"].unique()).difference(self.players, sort=False))
+        self.courses = self.courses.append(pd.Index(rounds[self.course_column].unique()).difference(self.courses, sort=False))
+
+        self._player_codes = np.concatenate([self._player_codes, self.players.get_indexer(rounds["name"])])
+        self._course_codes = np.concatenate([self._course_codes, self.courses.get_indexer(rounds[self.course_column])])
+        self._y = np.concatenate([self._y, rounds["handicap_diff"].to_numpy(dtype=float)])
+
+        return self._fit()
+
+    def _design(self) -> sparse.csr_matrix:
+        """
+        Rounds x (players + courses) indicator matrix
+        """
+        n, n_players = len(self._y), len(self.players)
+        rows = np.repeat(np.arange(n), 2)
+        cols = np.column_stack([self._player_codes, n_players + self._course_codes]).ravel()
+        return sparse.csr_matrix((np.ones(2 * n), (rows, cols)), shape=(n, n_players + len(self.courses)))
+
+    def _fit(self) -> int:
+        """
+        Solve the damped least squares problem, starting from the previous solution padded with zeros for new columns.
+        The result is the same as a cold fit, only the iterations differ
+        """
+
+        design = self._design()
+        x0 = np.zeros(design.shape[1])
+        if self._x is not None:
+            n_players_before = len(self._x[0])
+            x0[:n_players_before] = self._x[0]
+            x0[len(self.players):len(self.players) + len(self._x[1])] = self._x[1]
+
+        # The damping acts on the solution, so solve for departures from the overall mean rather than the raw differentials
+        center = self._y.mean()
+        if self._x is not None:
+            x0[:len(self.players)] -= center - self._center
+
+        # lsmr's own x0 damps the step from x0 rather than the solution, which would leave refits depending on the order rounds
+        # were added in. Stacking the damping under the design as rows of the system keeps the warm start exact
+        augmented = sparse.vstack([design, self.damp * sparse.identity(design.shape[1], format="csr")], format="csr")
+        residual = np.concatenate([self._y - center - design @ x0, -self.damp * x0])
+        step, _, self.iterations, *_ = lsmr(augmented, residual, atol=1e-8, btol=1e-8)
+        solution = x0 + step
+
+        self._center = center
+        self._x = (solution[:len(self.players)], solution[len(self.players):])
+        self.residual_sd = float(np.std(self._y - center - design @ solution))
+
+        return self.iterations
+
+    def player_skills(self) -> pd.DataFrame:
+        """
+        Returns:
+        -------------
+        skills:pd.DataFrame | indexed by player: skill (expected differential on an average course for the group) and rounds,
+                              best player first
+        """
+        if self._x is None:
+            return pd.DataFrame({"skill":pd.Series(dtype=float), "rounds":pd.Series(dtype=int)}, index=self.players.rename("name"))
+        skill, offset = self._x
+        course_rounds = np.bincount(self._course_codes, minlength=len(self.courses))
+
+        # Offsets are reported relative to the average round's course, so skills read as differentials on a typical course
+        shift = (offset * course_rounds).sum() / max(course_rounds.sum(), 1)
+        skills = pd.DataFrame({"skill":self._center + skill + shift,
+                               "rounds":np.bincount(self._player_codes, minlength=len(self.players))}, index=self.players)
+        return skills.rename_axis("name").sort_values("skill")
+
+    def course_offsets(self) -> pd.DataFrame:
+        """
+        Returns:
+        -------------
+        offsets:pd.DataFrame | indexed by course: offset (strokes harder than its ratings, relative to the average round's course)
+                               and rounds, hardest course first
+        """
+        offset = self._x[1] if self._x is not None else np.empty(0)
+        course_rounds = np.bincount(self._course_codes, minlength=len(self.courses))
+        shift = (offset * course_rounds).sum() / max(course_rounds.sum(), 1)
+        offsets = pd.DataFrame({"offset":offset - shift, "rounds":course_rounds}, index=self.courses)
+        return offsets.rename_axis(self.course_column).sort_values("offset", ascending=False)
+
+    def predict(self, player:str, course:str) -> float:
+        """
+        Expected differential for a player at a course, courses the model hasn't seen get no offset
+
+        Args:
+        -------------
+        player:str | name of the player
+        course:str | name of the course
+
+        Returns:
+        -------------
+        differential:float | predicted handicap differential
+        """
+
+        if player not in self.players:
+            raise KeyError(f"no rounds recorded for {player!r}")
+        estimate = self._center + self._x[0][self.players.get_loc(player)]
+        if course in self.courses:
+            estimate += self._x[1][self.courses.get_loc(course)]
+        return float(estimate)
@@ -4,14 +4,41 @@ import plotly.express as px
 import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import streamlit as st
-from utils import add_round, get_handicaps, fill_handicaps, plot_statistics, histplot, pie_chart, dist_plot, rolling_avg, scatter, mean_med_stats, find_round, handicap_differentials, total_profit, explanation_of_plots, agg_features_by_cat, add_border
+from utils import add_round, get_handicaps, fill_handicaps, plot_statistics, histplot, pie_chart, dist_plot, rolling_avg, scatter, mean_med_stats, find_round, handicap_differentials, total_profit, explanation_of_plots, agg_features_by_cat, add_border, round_limits
 
 from dashboard import dashboard
 
+from notes_index import load_notes_index
+from column_snapshot import load_rounds
+from recompute_worker import RecomputeWorker, Snapshot
+from skill_model import SkillModel
+from forecast import HandicapForecast
+from leaderboard import Leaderboard
+
+from groups import GroupRegistry
+
 from background import background_info
 
 from streamlit_option_menu import option_menu
 
+@st.cache_resource
+def group_registry(columns:tuple):
+    """
+    One registry of group datasets per server process
+    """
+    return GroupRegistry(columns=list(columns))
+
+
+@st.experimental_fragment(run_every=0.5)
+def recompute_status(worker:RecomputeWorker):
+    """
+    Recomputing indicator that polls the worker while it is busy, and reruns the page once the new snapshot is published
+    """
+    if not worker.busy:
+        st.rerun()
+    st.info("Recomputing handicaps... the dashboard below shows the data from before your latest round")
+
+
 def main():
 
     # Config page layout
@@ -64,17 +91,23 @@ def main():
         styles={"background-color":"blue"}
     )
 
-    column_order = ["name", "date", "golf_course", "match_format", "opponent/s", "profit/loss", "course_rating", "slope_rating",
+    column_order = ["name", "date", "golf_course", "course_id", "match_format", "opponent/s", "profit/loss", "course_rating", "slope_rating",
                     "adj_gross_score", "handicap_diff", "putts", "3_putts", "fairways_hit", "gir", "penalty/ob", "birdies", "trpl_bogeys_plus",
-                   "handicap", "notes", "jittered_col"]
+                   "handicap", "esr_reduction", "counting_diff", "counting_rank", "notes"]
 # -------------------------------------------------------------- Fake Data ------------------------------------------------------------
     
     # Change data source depending on tab selection
     if selected == "Fake Data":
         # Data load
-        if "df" not in st.session_state:
-            st.session_state.df = pd.read_csv("synthetic_data.csv", parse_dates=["date"])
-            st.session_state.df = st.session_state.df.reindex(columns=column_order)
+        if "recompute" not in st.session_state:
+            df, trends = load_rounds("synthetic_data.csv", column_order)
+            st.session_state.recompute = RecomputeWorker(Snapshot(df, load_notes_index(df, "synthetic_data.csv"), trends,
+                                                                  SkillModel.from_rounds(df), HandicapForecast.from_rounds(df),
+                                                                  Leaderboard.from_rounds(df)))
+
+        # Everything below renders the latest published snapshot, added rounds show up once the worker has recomputed
+        snapshot = st.session_state.recompute.snapshot
+        st.session_state.df = snapshot.data
     
         st.subheader(":blue[While my friends and I collect some data...]")
         st.markdown("""I have generated some synthetic data to demonstrate the visualizations we will use to track and analyze our scores. This data is purely for purposes of demonstration, and some of the statistics and relationships shown will likely not reflect reality for most golfers. """)
@@ -91,9 +124,9 @@ def main():
         with col1:
             rd_name = st.text_input("Name:", value="[name]")
             rd_date = st.date_input("Date Played:", min_value = pd.to_datetime("2024-04-13"))
-            rd_adj_score = st.number_input("Adjusted Gross Score (Must know single hole limits)", min_value=60, value=72, step=1)
-            rd_cr_rating = st.number_input("Course Rating:", min_value=60.0, max_value=90.0, value=72.0)
-            rd_slope_rating = st.number_input("Slope Rating:", min_value=55.0, max_value=155.0, value=113.0)
+            rd_adj_score = st.number_input("Adjusted Gross Score (Must know single hole limits)", min_value=round_limits["adj_gross_score"][0], value=72, step=1)
+            rd_cr_rating = st.number_input("Course Rating:", min_value=round_limits["course_rating"][0], max_value=round_limits["course_rating"][1], value=72.0)
+            rd_slope_rating = st.number_input("Slope Rating:", min_value=round_limits["slope_rating"][0], max_value=round_limits["slope_rating"][1], value=113.0)
             rd_putts = st.number_input("Number of Putts:", step=1, value=36)
             rd_three_putts = st.number_input("Number of 3-Putts:", step=1)
             rd_opponent = st.text_input("Opponent/s:", value="[opponent name]")
@@ -109,13 +142,6 @@ def main():
             rd_golf_course = st.selectbox("Golf Course:", ["Augusta National", "Pebble Beach", "Bethpage Black", "Kiawah Island", 
                                                             "Whistling Straits", "Pinehurst", "Hollybrook", "Harbortown"])
     
-        # Button click logic
-        if "button_clicked" not in st.session_state:
-            st.session_state.button_clicked = False
-        
-        def button_click():
-            st.session_state.button_clicked = True
-    
         if st.button("Add Round?"):
             
             # Add the round to the df
@@ -124,37 +150,41 @@ def main():
                                 penalties=rd_penalty, birdies=rd_birdies, trpl_bogeys_plus=rd_db_bogeys_plus, profit_loss=profit_loss, 
                                 match_format=match_format, golf_course=rd_golf_course, calc_diff=True)
 
+            # Handicaps, notes and trends are recomputed in the background, the page keeps showing the last snapshot meanwhile
+            st.session_state.recompute.submit(new_row)
+            st.session_state.added_round = (rd_name, snapshot.version)
 
-            new_row_df = pd.DataFrame([new_row])
-    
-            # Add row to the df
-            st.session_state.df = pd.concat([st.session_state.df, new_row_df], ignore_index=True)
-            
-            # Update handicaps where applicable
-            st.session_state.df = get_handicaps(st.session_state.df)
-    
-            
-            st.write("Check out your new entry at the bottom of the dataframe")
-    
-            # Change the boolean status to display a df
-            button_click()
+        worker = st.session_state.recompute
+        if worker.busy or worker.snapshot.version != snapshot.version:
+            recompute_status(worker)
+        elif worker.error is not None:
+            st.error(f"Your latest round couldn't be added: {worker.error}")
 
-            if st.session_state.button_clicked:
-                st.dataframe(st.session_state.df.loc[st.session_state.df["name"] == rd_name].drop(columns="jittered_col"), hide_index=True,
-                             use_container_width=True)
+        if "added_round" in st.session_state and snapshot.version > st.session_state.added_round[1]:
+            added_player, _ = st.session_state.pop("added_round")
+            st.write("Check out your new entry at the bottom of the dataframe")
+            st.dataframe(snapshot.data.loc[snapshot.data["name"] == added_player], hide_index=True, use_container_width=True)
     
 
         add_border()
         # Run the rest of the dashboard
-        dashboard(st.session_state.df)
+        dashboard(snapshot.data, snapshot.notes_index, snapshot.trends, snapshot.skills, snapshot.forecast, snapshot.leaderboard)
     
 
 
 # -------------------------------------------------------------- Real Data ------------------------------------------------------------    
     elif selected == "Real Data":
-        df = pd.read_csv("real_data.csv", parse_dates=["date"])
-
-        df = df.reindex(columns=column_order)
+        # Each golf group's rounds are loaded on first access and shared across sessions
+        registry = group_registry(tuple(column_order))
+        group = st.selectbox("Golf Group:", registry.groups(), index=0, format_func=lambda name: name.replace("_", " ").title())
+        group_state = registry.get(group)
+
+        df = group_state.data
+        notes_index = group_state.notes_index
+        trends = group_state.trends
+        skills = group_state.skills
+        forecast = group_state.forecast
+        leaderboard = group_state.leaderboard
         
         # Temporarily stopping until sufficient data has been collected
         # st.stop()  
@@ -166,7 +196,7 @@ def main():
 
         add_border()
         st.subheader(":blue[Handicaps are still pending until a sufficient number of rounds have been played...]")
-        dashboard(df)
+        dashboard(df, notes_index, trends, skills, forecast, leaderboard)
 
     
 
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app's entry point streamlit.py shadows the streamlit package, so import the package before the repo goes on the path
+_path = sys.path[:]
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != ROOT]
+import streamlit  # noqa: E402,F401
+sys.path[:] = [p for p in _path if os.path.abspath(p or os.curdir) != ROOT] + [ROOT]
+
+
+@pytest.fixture(scope="session")
+def synthetic_data():
+    """
+    The bundled synthetic rounds, as the app reads them
+    """
+    return pd.read_csv(os.path.join(ROOT, "synthetic_data.csv"), parse_dates=["date"])
+
+
+@pytest.fixture
+def data(synthetic_data):
+    return synthetic_data.copy()
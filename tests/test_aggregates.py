@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import TrendPyramid, trend_levels
+
+
+def test_incremental_updates_match_a_full_build(data):
+    full = TrendPyramid.from_rounds(data)
+
+    incremental = TrendPyramid(full.metrics)
+    for start in range(0, len(data), 70):
+        incremental.update(data.iloc[start:start + 70])
+
+    for level in trend_levels:
+        pd.testing.assert_frame_equal(full.tables[level], incremental.tables[level].loc[full.tables[level].index])
+    assert (full.first_date, full.last_date) == (incremental.first_date, incremental.last_date)
+
+
+def test_query_matches_grouping_the_rounds(data):
+    trends = TrendPyramid.from_rounds(data)
+    monthly = trends.query("putts", "month").set_index(["name", "date"])
+
+    rounds = data.dropna(subset="putts").assign(date=data["date"].dt.to_period("M").dt.start_time)
+    expected = rounds.groupby(["name", "date"])["putts"].agg(["mean", "min", "max", "count"])
+    pd.testing.assert_frame_equal(monthly[["mean", "min", "max", "count"]].sort_index(), expected, check_dtype=False)
+
+
+def test_rounds_in_range_counts_from_the_weekly_buckets(data):
+    trends = TrendPyramid.from_rounds(data)
+
+    assert trends.rounds_in_range().equals(data.groupby("name").size().astype(float))
+    assert trends.rounds_in_range(metric="handicap").sum() == data["handicap"].notna().sum()
+
+    # Partial weeks at either end count in full, never fewer than the rounds actually in range
+    start, end = pd.Timestamp("2025-01-08"), pd.Timestamp("2025-06-18")
+    exact = data.loc[data["date"].between(start, end)].groupby("name").size()
+    approx = trends.rounds_in_range(start, end)
+    assert (approx.reindex(exact.index) >= exact).all()
+    assert (approx.reindex(exact.index) - exact).max() <= 2 * data.groupby(["name", data["date"].dt.to_period("W")]).size().max()
+
+
+def test_choose_level_keeps_players_under_max_points(data):
+    trends = TrendPyramid.from_rounds(data)
+
+    assert trends.choose_level(max_points=200) == "round"
+    assert trends.choose_level(max_points=60) != "round"
+    assert trends.choose_level(max_points=60, metric="not a metric") == "round"
+
+    last = trends.last_date
+    assert trends.choose_level(last - pd.Timedelta(days=20), last, max_points=60) == "round"
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from anomaly import rolling_robust_z, detect_anomalies, flagged_rounds, MAD_SCALE
+
+
+def _player(diffs, profit=0.0) -> pd.DataFrame:
+    return pd.DataFrame({"name":"Pete", "date":pd.date_range("2024-01-01", periods=len(diffs)),
+                         "handicap_diff":np.asarray(diffs, dtype=float), "profit/loss":profit})
+
+
+def test_robust_z_matches_a_per_round_median_and_mad(data):
+    data = data.drop_duplicates(["name", "date"])
+    z = rolling_robust_z(data)
+
+    for _, rounds in data.sort_values("date").groupby("name"):
+        diffs = rounds["handicap_diff"].to_numpy()
+        for i in range(5, len(diffs)):
+            prior = diffs[max(0, i - 20):i]
+            median = np.median(prior)
+            mad = np.median(np.abs(prior - median))
+            assert np.isclose(z[rounds.index[i]], (diffs[i] - median) / (MAD_SCALE * mad))
+        assert z[rounds.index[:5]].isna().all()
+
+
+def test_inflated_round_and_money_spike_are_flagged():
+    form = [10.0, 11.0, 9.0, 10.5, 9.5, 10.0, 11.0, 9.0]
+    data = _player(form + [25.0, 10.0, -5.0])
+    data.loc[10, "profit/loss"] = 5.0
+    flags = detect_anomalies(data)
+
+    assert flags.loc[8, "inflated_round"] and flags.loc[8, "suspicious_round"]
+    assert flags.loc[10, "money_spike"] and not flags.loc[10, "inflated_round"]
+    assert not flags.loc[:7, "suspicious_round"].any()
+
+    # A low round without money won is suspicious but isn't a money spike
+    data.loc[10, "profit/loss"] = -5.0
+    assert not detect_anomalies(data).loc[10, "money_spike"]
+
+
+def test_sustained_inflation_is_a_suspicious_trend():
+    form = [10.0, 11.0, 9.0, 10.5, 9.5, 10.0, 11.0, 9.0, 10.0, 10.5]
+    flags = detect_anomalies(_player(form + [11.5, 12.0, 12.0, 11.5, 12.0]))
+
+    assert flags["suspicious_trend"].iloc[-1]
+    assert not flags["suspicious_trend"].iloc[:len(form)].any()
+    assert not flags["suspicious_round"].any()
+
+
+def test_flagged_rounds_lists_only_flagged_rounds_newest_first():
+    data = _player([10.0, 11.0, 9.0, 10.5, 9.5, 10.0, 25.0, 10.0])
+    flagged = flagged_rounds(data)
+
+    assert flagged.index.tolist() == [6]
+    assert {"name", "date", "handicap_diff", "robust_z"} <= set(flagged.columns)
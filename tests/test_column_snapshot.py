@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import trend_levels
+from column_snapshot import load_rounds, read_snapshot, snapshot_dir, META_FILE
+from notes_index import NotesIndex
+from conftest import ROOT
+
+
+def _mapped(array:np.ndarray) -> bool:
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "rounds.csv")
+    shutil.copy(os.path.join(ROOT, "synthetic_data.csv"), path)
+    return path
+
+
+def test_snapshot_reads_back_what_was_computed(csv_path):
+    data, trends = load_rounds(csv_path)
+    snapshot = read_snapshot(csv_path)
+    assert snapshot is not None
+
+    cached, cached_trends = snapshot
+    pd.testing.assert_frame_equal(cached, data, check_dtype=False)
+    for level in trend_levels:
+        pd.testing.assert_frame_equal(cached_trends.tables[level], trends.tables[level])
+    assert (cached_trends.first_date, cached_trends.last_date) == (trends.first_date, trends.last_date)
+
+    # Numeric columns come straight from the mapped files
+    assert _mapped(cached["handicap"].to_numpy()) and _mapped(cached_trends.tables["week"].to_numpy())
+
+
+def test_row_labels_are_the_same_cold_and_warm(csv_path):
+    # Rounds out of date order, as a backdated round leaves the file
+    pd.read_csv(csv_path).sample(frac=1, random_state=3).to_csv(csv_path, index=False)
+
+    cold, _ = load_rounds(csv_path)
+    assert not cold.index.is_monotonic_increasing
+    index = NotesIndex.from_rounds(cold)
+
+    warm, _ = load_rounds(csv_path)
+    pd.testing.assert_frame_equal(warm, cold, check_dtype=False)
+    assert index.matches(warm)
+
+
+def test_changes_to_the_frame_never_reach_the_file(csv_path):
+    load_rounds(csv_path)
+    data, trends = read_snapshot(csv_path)
+    before = data["putts"].copy()
+
+    data["putts"].to_numpy()[:] = -1
+    trends.update(data.iloc[:20])
+    assert read_snapshot(csv_path)[0]["putts"].equals(before)
+
+
+def test_snapshot_is_dropped_when_the_data_file_changes(csv_path):
+    load_rounds(csv_path)
+    with open(csv_path, "a") as f:
+        f.write("\n")
+    assert read_snapshot(csv_path) is None
+
+    # load_rounds() recomputes and snapshots the new version
+    load_rounds(csv_path)
+    assert read_snapshot(csv_path) is not None
+
+
+def test_snapshot_without_handicaps_is_kept_apart(csv_path):
+    load_rounds(csv_path, handicaps=False)
+    assert read_snapshot(csv_path, handicaps=True) is None
+    assert read_snapshot(csv_path, handicaps=False) is not None
+
+
+def test_rewriting_removes_the_previous_arrays(csv_path):
+    load_rounds(csv_path)
+    directory = snapshot_dir(csv_path)
+    with open(os.path.join(directory, META_FILE)) as f:
+        first = json.load(f)["token"]
+
+    load_rounds(csv_path, handicaps=False)
+    files = os.listdir(directory)
+    assert files and not any(name.startswith(first) for name in files)
+
+
+def test_unreadable_snapshot_is_recomputed(csv_path):
+    load_rounds(csv_path)
+    directory = snapshot_dir(csv_path)
+    for name in os.listdir(directory):
+        if name.endswith(".npy"):
+            os.remove(os.path.join(directory, name))
+            break
+    assert read_snapshot(csv_path) is None
+
+    data, _ = load_rounds(csv_path)
+    assert len(data) == len(pd.read_csv(csv_path))
+
+
+def test_columns_are_put_in_order(csv_path):
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)[::-1] + ["not_in_file"]
+    load_rounds(csv_path)
+    data, _ = load_rounds(csv_path, columns)
+    assert list(data.columns) == columns and data["not_in_file"].isna().all()
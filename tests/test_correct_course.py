@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from courses import correct_course
+from utils import get_handicaps, handicap_differentials
+
+
+@pytest.fixture
+def rated(data):
+    """
+    Rounds with handicaps, and a registry holding the tees most of them were played from
+    """
+    data = get_handicaps(data)
+    keys = ["golf_course", "course_rating", "slope_rating"]
+    tees = data.groupby(keys).size().idxmax()
+    courses = pd.DataFrame([dict(zip(keys, tees), tee="Standard", par=np.nan)], index=pd.Index([7], name="course_id"))
+    return data, courses
+
+
+def test_correction_matches_a_full_recompute(rated):
+    data, courses = rated
+    corrected, new_courses, report = correct_course(data, courses, 7, course_rating=69.0, slope_rating=121)
+
+    affected = corrected["course_id"] == 7
+    assert new_courses.loc[7, ["course_rating", "slope_rating"]].tolist() == [69.0, 121]
+    assert report["rounds"] == affected.sum() > 0
+
+    expected = data.copy()
+    expected.loc[affected, ["course_rating", "slope_rating"]] = [69.0, 121]
+    expected["handicap_diff"] = handicap_differentials(expected)
+    expected = get_handicaps(expected).loc[corrected.index]
+
+    for column in ["handicap_diff", "handicap", "esr_reduction"]:
+        assert np.allclose(corrected[column], expected[column], equal_nan=True), column
+
+
+def test_only_affected_players_from_their_first_affected_round_change(rated):
+    data, courses = rated
+    corrected, _, report = correct_course(data, courses, 7, course_rating=69.0)
+
+    affected = corrected["course_id"] == 7
+    players = corrected["name"].isin(report["players"])
+    untouched = ~players | (corrected["date"] < corrected.loc[affected, "date"].min())
+    assert np.allclose(corrected.loc[untouched, "handicap"], data.loc[untouched, "handicap"], equal_nan=True)
+
+    # The engine recomputes every round of the affected players from the earliest corrected round onward
+    assert report["handicaps"] == (players & ~untouched).sum()
+
+
+def test_unknown_course_id_raises(rated):
+    data, courses = rated
+    with pytest.raises(KeyError):
+        correct_course(data, courses, 99, course_rating=70.0)
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from utils import counting_differentials, get_handicaps, diffs_used
+
+
+def test_flags_mark_the_lowest_differentials_of_the_current_window(data):
+    data = data.drop_duplicates(["name", "date"])
+    flags = data[["name", "date", "handicap_diff"]].join(counting_differentials(get_handicaps(data, whs_rules=False)))
+
+    for _, rounds in flags.sort_values("date").groupby("name"):
+        window = rounds.iloc[-20:]
+        expected_ranks = window["handicap_diff"].rank(method="first").to_numpy()
+        assert np.array_equal(window["counting_rank"].to_numpy(), expected_ranks)
+        assert rounds.iloc[:-20]["counting_rank"].isna().all()
+
+        counted = window.nsmallest(diffs_used[min(len(rounds), 20)], "handicap_diff").index
+        assert set(rounds.index[rounds["counting_diff"]]) == set(counted)
+
+
+def test_few_rounds_count_per_the_lowest_differentials_table():
+    data = pd.DataFrame({"name":"Pete", "date":pd.date_range("2024-05-01", periods=7), "handicap_diff":[9.0, 4.0, 12.0, 6.0, 15.0, 3.0, 8.0]})
+    flags = counting_differentials(data)
+
+    # 7 rounds use the lowest 2
+    assert flags.index[flags["counting_diff"]].tolist() == [1, 5]
+    assert flags["counting_rank"].tolist() == [5, 2, 6, 3, 7, 1, 4]
+
+
+def test_flags_match_the_columns_written_by_get_handicaps(data):
+    rated = get_handicaps(data)
+    flags = counting_differentials(rated)
+
+    assert flags["counting_diff"].equals(rated["counting_diff"])
+    assert np.array_equal(flags["counting_rank"], rated["counting_rank"], equal_nan=True)
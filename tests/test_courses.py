@@ -0,0 +1,51 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from courses import register_course, course_handicaps, playing_handicaps
+
+
+@pytest.fixture
+def courses():
+    return pd.DataFrame({"golf_course":["Oak Hills"], "tee":["White"], "course_rating":[70.1],
+                         "slope_rating":[125.0], "par":[72.0]}, index=pd.Index([1], name="course_id"))
+
+
+def test_registering_the_same_tees_finds_them(courses):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        same, course_id = register_course(courses, "Oak Hills", 70.1, 125, tee="White", par=72)
+
+    assert course_id == 1 and same.equals(courses)
+
+
+@pytest.mark.parametrize("course_rating, slope_rating, par", [(71.3, 125, 72), (70.1, 131, 72), (70.1, 125, 71)])
+def test_conflicting_values_raise(courses, course_rating, slope_rating, par):
+    with pytest.raises(ValueError, match="correct_course"):
+        register_course(courses, "Oak Hills", course_rating, slope_rating, tee="White", par=par)
+
+
+def test_missing_par_warns_and_is_filled_in_later(courses):
+    with pytest.warns(UserWarning, match="without a par"):
+        courses, course_id = register_course(courses, "Pine Valley", 72.4, 138, tee="Blue")
+    assert course_id == 2 and np.isnan(courses.loc[2, "par"])
+
+    courses, again = register_course(courses, "Pine Valley", 72.4, 138, tee="Blue", par=71)
+    assert again == 2 and courses.loc[2, "par"] == 71
+
+
+def test_course_handicaps_include_rating_minus_par(courses):
+    indexes = pd.Series([10.0, 20.0], index=["Pete", "Dave"])
+    handicaps = course_handicaps(indexes, courses)
+
+    assert np.allclose(handicaps[1], indexes * 125 / 113 + (70.1 - 72))
+    assert playing_handicaps(indexes, courses, allowance=1.0)[1].tolist() == [9, 20]
+
+
+def test_course_handicaps_warn_when_par_is_missing(courses):
+    courses.loc[1, "par"] = np.nan
+    with pytest.warns(UserWarning, match="Oak Hills White"):
+        handicaps = course_handicaps(pd.Series([10.0], index=["Pete"]), courses)
+    assert np.isclose(handicaps.loc["Pete", 1], 10 * 125 / 113)
@@ -0,0 +1,97 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import export_report
+from export_report import export_report as export, report_sections, MANIFEST_FILE
+from utils import get_handicaps
+
+
+# Cheap sections for the re-export tests, the full report is rendered once
+quick_sections = ["handicaps", "profit", "settlement", "integrity"]
+
+
+@pytest.fixture(scope="module")
+def rounds(synthetic_data):
+    return get_handicaps(synthetic_data.copy())
+
+
+@pytest.fixture
+def quick(monkeypatch):
+    sections = report_sections
+    monkeypatch.setattr(export_report, "report_sections",
+                        lambda data, trends=None: {k:v for k, v in sections(data, trends).items() if k in quick_sections})
+
+
+def _section(out_dir, key) -> list:
+    with open(os.path.join(out_dir, "sections", f"{key}.js")) as f:
+        text = f.read()
+    return json.loads(re.fullmatch(rf'REPORT\["{key}"\] = (.*);\n', text, re.S).group(1))
+
+
+def test_bundle_has_every_option_of_every_section(rounds, tmp_path):
+    results = export(rounds, str(tmp_path))
+    sections = report_sections(rounds)
+    assert results == {"rendered":list(sections), "unchanged":[]}
+
+    with open(tmp_path / "index.html") as f:
+        index = f.read()
+    for key, section in sections.items():
+        rendered = _section(tmp_path, key)
+        assert len(rendered) == len(section["options"])
+        assert all(part.keys() & {"figure", "html"} for parts in rendered for part in parts)
+        assert f"sections/{key}.js" in index
+    assert (tmp_path / "plotly.min.js").exists()
+
+
+def test_unchanged_data_renders_nothing(rounds, tmp_path, quick):
+    export(rounds, str(tmp_path))
+    assert export(rounds, str(tmp_path)) == {"rendered":[], "unchanged":quick_sections}
+
+
+def test_only_sections_reading_a_changed_column_are_rendered(rounds, tmp_path, quick):
+    export(rounds, str(tmp_path))
+
+    changed = rounds.copy()
+    changed.loc[changed.index[0], "profit/loss"] += 5
+    results = export(changed, str(tmp_path))
+    assert results == {"rendered":["profit", "settlement", "integrity"], "unchanged":["handicaps"]}
+
+    # Columns no section reads change nothing
+    changed["notes"] = "windy"
+    assert export(changed, str(tmp_path))["rendered"] == []
+
+
+def test_text_edits_in_any_row_are_rendered(rounds, tmp_path, quick):
+    # Long enough that row 5 was left out of the sampled text hash this replaced
+    large = pd.concat([rounds] * 2, ignore_index=True)
+    export(large, str(tmp_path))
+
+    large.loc[large.index[5], "opponent/s"] = "Someone Else"
+    results = export(large, str(tmp_path))
+    assert "settlement" in results["rendered"] and "handicaps" in results["unchanged"]
+
+
+def test_force_and_missing_files_render_again(rounds, tmp_path, quick):
+    export(rounds, str(tmp_path))
+    os.remove(tmp_path / "sections" / "profit.js")
+    assert export(rounds, str(tmp_path))["rendered"] == ["profit"]
+    assert export(rounds, str(tmp_path), force=True)["rendered"] == quick_sections
+
+
+def test_manifest_tracks_sections_and_dropped_sections_are_removed(rounds, tmp_path, quick):
+    (tmp_path / "sections").mkdir()
+    (tmp_path / "sections" / "retired.js").write_text("")
+    export(rounds, str(tmp_path))
+
+    with open(tmp_path / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    assert list(manifest) == quick_sections
+    assert sorted(os.listdir(tmp_path / "sections")) == sorted(f"{key}.js" for key in quick_sections)
+
+    # A corrupt manifest re-renders everything
+    (tmp_path / MANIFEST_FILE).write_text("{")
+    assert export(rounds, str(tmp_path))["rendered"] == quick_sections
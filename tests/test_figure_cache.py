@@ -0,0 +1,82 @@
+import subprocess
+import sys
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from figure_cache import FigureCache, cached_figure, data_fingerprint, figure_cache
+from conftest import ROOT
+
+
+def test_fingerprint_is_stable_for_equal_frames(data):
+    assert data_fingerprint(data) == data_fingerprint(data.copy())
+
+
+def test_fingerprint_changes_with_values_rows_and_order(data):
+    base = data_fingerprint(data)
+
+    edited = data.copy()
+    edited.loc[edited.index[200], "putts"] += 1
+    assert data_fingerprint(edited) != base
+
+    assert data_fingerprint(pd.concat([data, data.iloc[-1:]], ignore_index=True)) != base
+
+    swapped = data.copy()
+    swapped.iloc[[1, 2]] = swapped.iloc[[2, 1]].to_numpy()
+    assert data_fingerprint(swapped) != base
+
+    missing_date = data.copy()
+    missing_date.loc[missing_date.index[5], "date"] = pd.NaT
+    assert data_fingerprint(missing_date) != base
+
+    renamed = data.copy()
+    renamed.loc[renamed.index[-1], "name"] = "Someone Else"
+    assert data_fingerprint(renamed) != base
+
+
+def test_fingerprint_covers_every_text_row(data):
+    large = pd.concat([data] * 4, ignore_index=True)
+    assert len(large) > 256
+    base = data_fingerprint(large)
+
+    for column, value in [("golf_course", "Somewhere New"), ("name", "Someone Else"), ("opponent/s", "Nobody")]:
+        edited = large.copy()
+        edited.loc[5, column] = value
+        assert data_fingerprint(edited) != base
+
+
+def test_fingerprint_is_the_same_across_processes(data):
+    script = ("import pandas as pd; from figure_cache import data_fingerprint; "
+              "print(repr(data_fingerprint(pd.read_csv('synthetic_data.csv', parse_dates=['date']))))")
+    runs = {subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+            for _ in range(2)}
+    assert len(runs) == 1
+
+
+def test_lru_evicts_oldest_and_counts_hits():
+    cache = FigureCache(maxsize=2)
+    cache.put("a", "{}")
+    cache.put("b", "{}")
+    assert cache.get("a") == "{}"
+    cache.put("c", "{}")
+
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1 and cache.stats()["size"] == 2
+
+
+def test_decorated_function_runs_once_per_data_version(data):
+    calls = []
+
+    @cached_figure
+    def count_plot(data, column):
+        calls.append(column)
+        return go.Figure(go.Bar(y=data[column].tolist()))
+
+    figure_cache.clear()
+    first = count_plot(data, "putts")
+    again = count_plot(data.copy(), "putts")
+    assert len(calls) == 1 and first.to_json() == again.to_json()
+
+    data.loc[data.index[0], "putts"] += 1
+    count_plot(data, "putts")
+    assert len(calls) == 2
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from utils import fill_handicaps, get_handicaps, diffs_used, diff_adjustment
+
+
+def _window_handicap(diffs:list, size:int) -> float:
+    """
+    Lowest-differentials index over the player's last `size` rounds, the slow way
+    """
+    recent = sorted(diffs[-size:])
+    n = min(len(diffs), size)
+    if diffs_used[n] == 0:
+        return np.nan
+    return np.mean(recent[:diffs_used[n]]) * 0.96 + diff_adjustment[n]
+
+
+def test_windows_match_a_per_round_loop(data):
+    filled = fill_handicaps(data)
+
+    for _, rounds in filled.groupby("name"):
+        diffs = []
+        for _, row in rounds.iterrows():
+            diffs.append(row["handicap_diff"])
+            for size, column in [(5, "fiveRd_handicap"), (10, "tenRd_handicap"), (20, "twentyRd_handicap")]:
+                assert np.isclose(row[column], _window_handicap(diffs, size), equal_nan=True), column
+            form = np.mean(diffs[-5:]) * 0.96 if len(diffs) >= 5 else np.nan
+            assert np.isclose(row["form_index"], form, equal_nan=True)
+
+
+def test_twenty_round_window_is_the_raw_handicap(data):
+    filled = fill_handicaps(data)
+    raw = get_handicaps(data, whs_rules=False).loc[filled.index]
+
+    assert np.allclose(filled["twentyRd_handicap"], raw["handicap"], equal_nan=True)
+
+
+def test_rows_keep_their_values_whatever_the_input_order(data):
+    # A player's rounds on the same day have no order of their own, keep one per day
+    data = data.drop_duplicates(["name", "date"])
+    forward = fill_handicaps(data)
+    shuffled = fill_handicaps(data.sample(frac=1, random_state=0)).loc[forward.index]
+
+    columns = ["fiveRd_handicap", "tenRd_handicap", "twentyRd_handicap", "form_index"]
+    pd.testing.assert_frame_equal(forward[columns], shuffled[columns])
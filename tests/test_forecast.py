@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast import HandicapForecast, smooth_levels, smoothing_grid, HISTORY
+
+
+def _series(data:pd.DataFrame) -> dict:
+    rounds = data.dropna(subset=["handicap_diff", "date"]).sort_values("date", kind="stable")
+    return {name:group["handicap_diff"].to_numpy(dtype=float) for name, group in rounds.groupby("name", sort=False)}
+
+
+def _smooth(diffs:np.ndarray, alpha:float) -> tuple:
+    """
+    Level after the last round and the sum of squared one-step errors, the long way
+    """
+    level, sse = diffs[0], 0.0
+    for y in diffs[1:]:
+        sse += (y - level) ** 2
+        level += alpha * (y - level)
+    return level, sse
+
+
+def test_smooth_levels_matches_the_recursion():
+    diffs = np.array([[10.0, 12.0, 9.0, 14.0], [20.0, 18.0, np.nan, np.nan]])
+    levels = smooth_levels(diffs, np.array([0.3, 0.6]))
+
+    assert levels[0, -1] == pytest.approx(_smooth(diffs[0], 0.3)[0])
+    assert levels[1, 1] == pytest.approx(_smooth(diffs[1, :2], 0.6)[0])
+    assert np.isnan(levels[1, 2:]).all()
+
+
+def test_each_player_gets_the_weight_with_the_smallest_error(data):
+    model = HandicapForecast.from_rounds(data)
+
+    for name, diffs in _series(data).items():
+        i = model.players.get_loc(name)
+        errors = [_smooth(diffs, a)[1] for a in smoothing_grid]
+        assert model.alpha[i] == smoothing_grid[np.argmin(errors)]
+        assert (model.level[i], model.sse[i]) == pytest.approx(_smooth(diffs, model.alpha[i]))
+        assert model.n_rounds[i] == len(diffs)
+        np.testing.assert_array_equal(model.recent[i][-min(len(diffs), HISTORY):], diffs[-HISTORY:])
+
+
+def test_updates_continue_the_smoothing(data):
+    data = data.sort_values("date", kind="stable")
+    model = HandicapForecast.from_rounds(data.iloc[:400])
+    alpha = dict(zip(model.players, model.alpha))
+    for start in range(400, len(data), 7):
+        assert model.update(data.iloc[start:start + 7])
+
+    for name, diffs in _series(data).items():
+        i = model.players.get_loc(name)
+        assert (model.level[i], model.sse[i]) == pytest.approx(_smooth(diffs, alpha[name]))
+        assert model.n_rounds[i] == len(diffs)
+        np.testing.assert_array_equal(model.recent[i], diffs[-HISTORY:])
+    assert model.last_date.max() == data["date"].max()
+
+
+def test_backdated_rounds_ask_for_a_refit(data):
+    model = HandicapForecast.from_rounds(data)
+    level = model.level.copy()
+
+    earlier = data.iloc[[0]].assign(date=data["date"].min() - pd.Timedelta(days=1))
+    assert not model.update(earlier)
+    np.testing.assert_array_equal(model.level, level)
+
+
+def test_new_players_start_at_their_first_differential(data):
+    model = HandicapForecast.from_rounds(data)
+    model.update(pd.DataFrame({"name":["Newbie"], "date":[pd.Timestamp("2025-06-01")], "handicap_diff":[30.0]}))
+
+    i = model.players.get_loc("Newbie")
+    assert model.level[i] == 30 and model.sse[i] == 0 and model.alpha[i] == np.median(model.alpha[:-1])
+
+
+def test_forecast_of_steady_players(data):
+    dates = pd.date_range("2025-01-01", periods=25, freq="7D")
+    steady = pd.DataFrame({"name":"Steady", "date":dates, "handicap_diff":10.0})
+    model = HandicapForecast.from_rounds(pd.concat([steady, steady.iloc[:2].assign(name="Short")]))
+
+    forecast = model.forecast(horizon=4)
+    assert set(forecast["name"]) == {"Steady"}
+    assert forecast["step"].tolist() == [1, 2, 3, 4]
+    assert forecast["date"].tolist() == list(pd.date_range("2025-06-25", periods=4, freq="7D"))
+    assert np.allclose(forecast[["diff_mean", "diff_low", "diff_high"]], 10)
+    assert np.allclose(forecast[["index_mean", "index_low", "index_high"]], 9.6)
+
+
+def test_intervals_widen_with_the_horizon(data):
+    forecast = HandicapForecast.from_rounds(data).forecast(horizon=10, interval=0.8)
+
+    assert (forecast["diff_low"] <= forecast["diff_mean"]).all() and (forecast["diff_mean"] <= forecast["diff_high"]).all()
+    assert (forecast["index_low"] <= forecast["index_high"]).all()
+    width = (forecast["diff_high"] - forecast["diff_low"]).groupby(forecast["name"]).agg(["first", "last"])
+    assert (width["last"] >= width["first"]).all()
+
+
+def test_fork_leaves_the_original_unchanged(data):
+    data = data.sort_values("date", kind="stable")
+    model = HandicapForecast.from_rounds(data.iloc[:400])
+    level, recent = model.level.copy(), model.recent.copy()
+
+    fork = model.fork()
+    fork.update(data.iloc[400:])
+    np.testing.assert_array_equal(model.level, level)
+    np.testing.assert_array_equal(model.recent, recent)
+    assert fork.n_rounds.sum() == len(data.dropna(subset=["handicap_diff", "date"]))
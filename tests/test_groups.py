@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+
+import pytest
+
+import groups
+from groups import GroupRegistry, create_group, partition_path, group_slug
+
+
+COLUMNS = ["name", "date", "golf_course", "match_format", "opponent/s", "profit/loss", "course_rating", "slope_rating",
+           "adj_gross_score", "handicap_diff", "putts", "handicap", "notes"]
+
+
+@pytest.fixture
+def root(tmp_path, data):
+    """
+    Two group partitions holding a slice of the synthetic rounds each
+    """
+    root = str(tmp_path)
+    for group, rounds in [("Saturday Skins", data.iloc[:120]), ("Weekday Nassau", data.iloc[120:200])]:
+        os.makedirs(os.path.dirname(partition_path(group, root)))
+        rounds.reindex(columns=COLUMNS).to_csv(partition_path(group, root), index=False)
+    return root
+
+
+def test_groups_load_once_and_reload_when_their_file_changes(root):
+    registry = GroupRegistry(root, COLUMNS)
+    assert {"saturday_skins", "weekday_nassau"} <= set(registry.groups())
+
+    first = registry.get("Saturday Skins")
+    assert len(first.data) == 120 and registry.get("Saturday Skins") is first
+
+    path = partition_path("Saturday Skins", root)
+    os.utime(path, ns=(first.version + 10**9, first.version + 10**9))
+    assert registry.get("Saturday Skins") is not first
+
+    with pytest.raises(KeyError):
+        registry.get("Nobody")
+
+
+def test_create_group_refuses_an_existing_partition(root):
+    path = create_group("Sunday Scramble", COLUMNS, root)
+    assert path == os.path.join(root, group_slug("Sunday Scramble"), "rounds.csv")
+
+    with pytest.raises(FileExistsError):
+        create_group("Sunday Scramble", COLUMNS, root)
+
+
+def test_least_recently_used_group_is_dropped_past_max_groups(root):
+    registry = GroupRegistry(root, COLUMNS, max_groups=1)
+    registry.get("Saturday Skins")
+    registry.get("Weekday Nassau")
+
+    assert registry.loaded() == ["Weekday Nassau"]
+
+
+def test_idle_groups_are_dropped_by_the_timer(root):
+    registry = GroupRegistry(root, COLUMNS, idle_seconds=0.1)
+    registry.get("Saturday Skins")
+
+    # Nothing touches the registry, the timer alone drops the group
+    deadline = time.monotonic() + 5
+    while registry._groups and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not registry._groups and registry._timer is None
+
+
+def test_idle_groups_are_dropped_on_any_access(root):
+    registry = GroupRegistry(root, COLUMNS, idle_seconds=1800)
+    registry.get("Saturday Skins")
+    registry.idle_seconds = 0
+
+    assert registry.loaded() == []
+
+
+def test_a_slow_load_does_not_hold_up_other_groups(root, monkeypatch):
+    release, loads = threading.Event(), []
+
+    class SlowState(groups.GroupState):
+        def __init__(self, group, path, columns=None):
+            loads.append(group)
+            if group == "Saturday Skins":
+                release.wait(5)
+            super().__init__(group, path, columns)
+
+    monkeypatch.setattr(groups, "GroupState", SlowState)
+    registry = GroupRegistry(root, COLUMNS)
+
+    waiting = [threading.Thread(target=registry.get, args=("Saturday Skins",)) for _ in range(3)]
+    for thread in waiting:
+        thread.start()
+    time.sleep(0.1)
+
+    # Another group loads while the first is still loading, and the sessions waiting on the first share one load
+    assert registry.get("Weekday Nassau").group == "Weekday Nassau"
+    release.set()
+    for thread in waiting:
+        thread.join(5)
+    assert loads.count("Saturday Skins") == 1
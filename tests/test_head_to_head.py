@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from head_to_head import HeadToHead, opponent_edges
+
+
+def _rounds(rows):
+    return pd.DataFrame(rows, columns=["name", "date", "handicap_diff", "profit/loss", "opponent/s"]).assign(
+        date=lambda d: pd.to_datetime(d["date"]))
+
+
+def _assert_same(a:HeadToHead, b:HeadToHead):
+    for metric, matrix in a.matrices().items():
+        other = b.matrices()[metric].reindex(index=matrix.index, columns=matrix.columns)
+        pd.testing.assert_frame_equal(matrix, other, check_names=False, rtol=1e-9)
+
+
+def test_opponent_strings_split_and_profit_shared():
+    edges = opponent_edges(_rounds([["Pete", "2024-05-01", 10.0, 6.0, "Dave, Eric"],
+                                    ["Dave", "2024-05-01", 12.0, -3.0, "Pete and Pete"]]))
+
+    pete = edges.loc[edges["name"] == "Pete"].set_index("opponent")["pl_share"]
+    assert pete.to_dict() == {"Dave":3.0, "Eric":3.0}
+    assert (edges.loc[edges["name"] == "Dave", "pl_share"] == -1.5).all()
+
+
+def test_gap_and_wins_from_both_posted_differentials():
+    h2h = HeadToHead.from_rounds(_rounds([["Pete", "2024-05-01", 10.0, 2.0, "Dave"],
+                                          ["Dave", "2024-05-01", 14.0, -2.0, "Pete"]]))
+    m = h2h.matrices()
+
+    assert m["diff_gap"].loc["Pete", "Dave"] == -4.0
+    assert m["win_rate"].loc["Pete", "Dave"] == 1.0 and m["win_rate"].loc["Dave", "Pete"] == 0.0
+    assert m["profit/loss"].loc["Pete", "Dave"] == 2.0
+
+
+def test_incremental_matches_full_build(data):
+    full = HeadToHead.from_rounds(data)
+
+    incremental = HeadToHead.from_rounds(data.iloc[:200])
+    for start in range(200, len(data), 60):
+        incremental.update(data.iloc[start:start + 60])
+
+    _assert_same(full, incremental)
+
+
+def test_two_rounds_on_one_date_do_not_depend_on_row_order():
+    rows = [["Pete", "2024-05-01", 10.0, 1.0, "Dave"],
+            ["Dave", "2024-05-01", 14.0, -1.0, "Pete"],
+            ["Dave", "2024-05-01", 8.0, 0.0, "Pete"]]
+
+    forward = HeadToHead.from_rounds(_rounds(rows))
+    backward = HeadToHead.from_rounds(_rounds(rows[::-1]))
+    _assert_same(forward, backward)
+
+    # Pete is compared with Dave's average differential that day
+    assert forward.matrices()["diff_gap"].loc["Pete", "Dave"] == -1.0
+
+    # Dave's second round arriving later re-compares the pairing already resolved against his first
+    split = HeadToHead.from_rounds(_rounds(rows[:2]))
+    split.update(_rounds(rows[2:]))
+    _assert_same(forward, split)
+
+
+def test_pairing_resolves_when_opponent_posts_later():
+    h2h = HeadToHead.from_rounds(_rounds([["Pete", "2024-05-01", 10.0, 1.0, "Dave"]]))
+    assert np.isnan(h2h.matrices()["diff_gap"].loc["Pete", "Dave"])
+
+    h2h.update(_rounds([["Dave", "2024-05-01", 13.0, -1.0, "Pete"]]))
+    assert h2h.matrices()["diff_gap"].loc["Pete", "Dave"] == -3.0
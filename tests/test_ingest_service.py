@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+from ingest_service import IngestService, SubmissionError, parse_submission, load_generator
+
+
+ROUND = {"name":"Pete", "date":"2025-01-05", "adj_gross_score":85, "course_rating":72.0, "slope_rating":125, "profit/loss":2}
+
+
+def test_submission_shapes_are_accepted():
+    for payload in [ROUND, [ROUND, ROUND], {"rounds":[ROUND]}]:
+        rows = parse_submission(json.dumps(payload).encode())
+        assert rows[0]["name"] == "Pete" and rows[0]["profit/loss"] == 2.0
+
+
+def test_every_invalid_round_is_reported_by_position():
+    bad = dict(ROUND, adj_gross_score=20, colour="red")
+    with pytest.raises(SubmissionError) as e:
+        parse_submission(json.dumps([ROUND, bad, {"name":"Dave"}]).encode())
+
+    errors = e.value.errors
+    assert set(errors) == {1, 2} and "unknown field 'colour'" in errors[1] and "adj_gross_score" in errors[1]
+
+    for body in [b"{not json", b"[]"]:
+        with pytest.raises(ValueError):
+            parse_submission(body)
+
+
+def test_routes_and_status_codes(tmp_path):
+    service = IngestService(str(tmp_path / "rounds.csv"))
+
+    async def requests():
+        return [await service._route("POST", "/rounds", json.dumps([ROUND, ROUND]).encode()),
+                await service._route("POST", "/rounds", json.dumps(dict(ROUND, date="someday")).encode()),
+                await service._route("GET", "/rounds", b""),
+                await service._route("GET", "/elsewhere", b""),
+                await service._route("GET", "/health", b"")]
+
+    try:
+        (created, invalid, wrong_method, missing, health) = asyncio.run(requests())
+    finally:
+        service.writer.close(10)
+
+    assert created == (201, {"accepted":2})
+    assert invalid[0] == 422 and 0 in invalid[1]["errors"]
+    assert wrong_method[0] == 405 and missing[0] == 404
+    assert health[1]["rounds_written"] == 2
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_invalid_content_length_is_rejected(tmp_path, length):
+    service = IngestService(str(tmp_path / "rounds.csv"))
+
+    async def run():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"POST /rounds HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    try:
+        response = asyncio.run(run())
+    finally:
+        service.writer.close(10)
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400") and "Content-Length" in json.loads(body)["error"]
+
+
+def test_concurrent_clients_over_http(tmp_path):
+    path = str(tmp_path / "rounds.csv")
+    service = IngestService(path)
+
+    async def run():
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await load_generator(port=port, requests=60, concurrency=6, bulk=2)
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        service.writer.close(10)
+
+    assert results["failed"] == 0 and results["rounds"] == 120
+    written = pd.read_csv(path)
+    assert len(written) == 120 and written["handicap"].notna().any()
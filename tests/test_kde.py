@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from scipy.stats import gaussian_kde
+
+import kde
+from kde import bandwidths, kde_curves
+
+
+def test_curves_match_scipy_gaussian_kde(data):
+    curves = kde_curves(data, "adj_gross_score", use_cache=False)
+    grid = curves.index.to_numpy()
+
+    for name, rounds in data.groupby("name"):
+        expected = gaussian_kde(rounds["adj_gross_score"].to_numpy(dtype=float))(grid)
+        assert np.abs(curves[name].to_numpy() - expected).max() < 0.02 * expected.max()
+
+
+def test_each_curve_integrates_to_one(data):
+    curves = kde_curves(data, "putts", use_cache=False)
+    dx = np.diff(curves.index.to_numpy())[0]
+    assert np.allclose(curves.sum().to_numpy() * dx, 1, atol=1e-3)
+
+
+def test_fixed_and_rule_bandwidths(data):
+    assert (bandwidths(data, "putts", 1.5) == 1.5).all()
+    scott, silverman = bandwidths(data, "putts", "scott"), bandwidths(data, "putts", "silverman")
+    assert (scott > 0).all() and (silverman > 0).all()
+    with pytest.raises(ValueError):
+        bandwidths(data, "putts", "widest")
+
+
+def test_cache_reused_until_data_changes(data):
+    first = kde_curves(data, "putts")
+    assert kde_curves(data, "putts") is first
+
+    data.loc[data.index[0], "putts"] += 5
+    assert kde_curves(data, "putts") is not first
+
+
+def test_cache_is_shared_safely_between_threads(data):
+    # More keys than the cache holds, so lookups and evictions interleave
+    keys = [(column, grid) for column in ["putts", "gir", "fairways_hit", "birdies"] for grid in range(64, 64 + 12)]
+
+    def lookup(idx):
+        column, grid = keys[idx % len(keys)]
+        return kde_curves(data, column, grid_size=grid).shape
+
+    with ThreadPoolExecutor(8) as pool:
+        shapes = list(pool.map(lookup, range(400)))
+
+    assert shapes[:len(keys)] == [(grid, data["name"].nunique()) for _, grid in keys]
+    assert len(kde._kde_cache) == kde.KDE_CACHE_SIZE
+
+
+def test_single_round_player_gets_a_finite_curve(data):
+    single = data.iloc[:1].assign(name="Solo")
+    curves = kde_curves(single, "putts", use_cache=False)
+    assert np.isfinite(curves["Solo"]).all() and curves["Solo"].max() > 0
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from leaderboard import Leaderboard, refresh_handicaps, leaderboard_metrics, FORM_ROUNDS
+from utils import get_handicaps, update_handicaps, current_handicaps
+
+
+@pytest.fixture
+def rounds(data):
+    return get_handicaps(data.sort_values("date", kind="stable").reset_index(drop=True))
+
+
+def _expected(data:pd.DataFrame) -> dict:
+    ordered = data.sort_values("date", kind="stable")
+    form = ordered.dropna(subset="handicap_diff").groupby("name")["handicap_diff"].apply(lambda d: d.iloc[-FORM_ROUNDS:].mean())
+    return {"handicap":current_handicaps(data), "profit":data.groupby("name")["profit/loss"].sum(min_count=1).dropna(), "form":form}
+
+
+def _values(board:Leaderboard, metric:str) -> pd.Series:
+    return board.top(metric, k=None).set_index("name")["value"]
+
+
+def _assert_board(board:Leaderboard, data:pd.DataFrame):
+    for metric, expected in _expected(data).items():
+        values = _values(board, metric)
+        pd.testing.assert_series_equal(values.sort_index(), expected.sort_index().astype(float), check_names=False)
+        assert values.is_monotonic_increasing if leaderboard_metrics[metric][1] else values.is_monotonic_decreasing
+
+
+def test_full_build_matches_grouping_the_rounds(rounds):
+    board = Leaderboard.from_rounds(rounds)
+    _assert_board(board, rounds)
+    assert len(board) == rounds["name"].nunique()
+
+
+def test_updates_in_batches_match_a_full_build(rounds):
+    board = Leaderboard()
+    for start in range(0, len(rounds), 37):
+        assert board.update(rounds.iloc[start:start + 37]) == []
+    _assert_board(board, rounds)
+
+
+def test_latest_round_without_a_handicap_keeps_the_player_ranked(rounds):
+    board = Leaderboard.from_rounds(rounds)
+    name = rounds["name"].iloc[0]
+    board.update(pd.DataFrame({"name":[name], "date":[rounds["date"].max() + pd.Timedelta(days=1)], "profit/loss":[np.nan],
+                               "handicap":[np.nan], "handicap_diff":[np.nan]}))
+    assert board.rank(name, "handicap") is not None
+    assert board.ranks(name)["handicap"][1] == current_handicaps(rounds)[name]
+
+
+def test_backdated_rounds_refresh_later_handicaps(rounds):
+    board = Leaderboard.from_rounds(rounds)
+    name = rounds["name"].iloc[0]
+    since = rounds.loc[rounds["name"] == name, "date"].iloc[-5]
+    new = rounds.loc[rounds["name"] == name].iloc[[0]].assign(date=since, handicap_diff=-5.0)
+
+    data, _ = update_handicaps(pd.concat([rounds, new], ignore_index=True), [name], since)
+    added = data.iloc[[-1]]
+    assert current_handicaps(data)[name] != current_handicaps(rounds)[name]
+    assert board.update(added) == [name]
+    refresh_handicaps(board, data, [name], since)
+    _assert_board(board, data)
+
+
+def test_ties_share_a_rank():
+    board = Leaderboard()
+    for name, value in [("Pete", 10.0), ("Dave", 8.0), ("Eric", 10.0), ("Ryan", 12.0)]:
+        board.set(name, "handicap", value)
+
+    top = board.top("handicap", k=3)
+    assert top["name"].tolist() == ["Dave", "Eric", "Pete"] and top["rank"].tolist() == [1, 2, 2]
+    assert board.rank("Ryan", "handicap") == 4 and board.rank("Ryan", "profit") is None
+
+    board.set("Ryan", "handicap", np.nan)
+    assert board.n_ranked("handicap") == 3 and board.rank("Ryan", "handicap") is None
+
+
+def test_fork_leaves_the_original_unchanged(rounds):
+    cut = len(rounds) - 40
+    board = Leaderboard.from_rounds(rounds.iloc[:cut])
+    before = {metric:_values(board, metric) for metric in leaderboard_metrics}
+
+    fork = board.fork()
+    fork.update(rounds.iloc[cut:])
+    for metric, values in before.items():
+        pd.testing.assert_series_equal(_values(board, metric), values)
+    _assert_board(fork, rounds)
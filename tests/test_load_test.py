@@ -0,0 +1,22 @@
+import os
+
+from load_test import generate_rounds, _prepare_workdir, SECOND_GROUP
+from groups import GroupRegistry, DEFAULT_GROUP
+
+
+def test_generated_rounds_have_handicaps_and_stable_seeds():
+    data = generate_rounds(n_players=3, rounds_per_player=25, seed=1)
+
+    assert len(data) == 75 and data["name"].nunique() == 3
+    assert data["handicap"].notna().sum() == 3 * 23
+    assert data.equals(generate_rounds(n_players=3, rounds_per_player=25, seed=1))
+
+
+def test_workdir_serves_both_groups_to_the_registry(tmp_path, monkeypatch):
+    _prepare_workdir(str(tmp_path), "streamlit", n_players=3, size=10, seed=0)
+    monkeypatch.chdir(tmp_path)
+
+    registry = GroupRegistry()
+    assert registry.groups()[0] == DEFAULT_GROUP and len(registry.groups()) == 2
+    assert len(registry.get(SECOND_GROUP).data) == 30
+    assert os.path.exists(tmp_path / "app.py") and os.path.exists(tmp_path / "synthetic_data.csv")
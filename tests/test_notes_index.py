@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+
+from notes_index import NotesIndex, load_notes_index, index_path, tokenize
+
+
+def _rounds(notes, start=0):
+    return pd.DataFrame({"name":["Pete", "Dave"] * (len(notes) // 2) + ["Pete"] * (len(notes) % 2),
+                         "date":pd.date_range("2024-05-01", periods=len(notes)), "notes":notes},
+                        index=range(start, start + len(notes)))
+
+
+def test_tokenize_lowercases_and_splits():
+    assert tokenize("Three-putted #7, wind 15mph") == ["three", "putted", "7", "wind", "15mph"]
+    assert tokenize(float("nan")) == []
+
+
+def test_keywords_and_phrases(data):
+    index = NotesIndex.from_rounds(data)
+    notes = data["notes"].fillna("").str.lower()
+
+    assert set(index.search("played well")) == set(data.index[notes.str.contains("played") & notes.str.contains("well")])
+    assert set(index.search('"played badly"')) == set(data.index[notes.str.contains("played badly")])
+    assert index.search("played well", players=["Pete"]) == [label for label in index.search("played well")
+                                                              if data.loc[label, "name"] == "Pete"]
+
+
+def test_results_are_most_recent_first_and_date_filtered():
+    index = NotesIndex.from_rounds(_rounds(["windy day", "no wind", "wind again"]))
+
+    assert index.search("wind") == [2, 1]
+    assert index.search("wind", end="2024-05-02") == [1]
+
+
+def test_update_adds_only_new_rounds():
+    index = NotesIndex.from_rounds(_rounds(["windy day", "no wind"]))
+
+    assert index.update(_rounds(["windy day", "no wind", "wind again"])) == 1
+    assert len(index) == 3 and index.search("again") == [2]
+
+
+def test_matches_detects_edited_notes_names_and_dates():
+    data = _rounds(["windy day", "no wind", "wind again"])
+    index = NotesIndex.from_rounds(data.iloc[:2])
+    assert index.matches(data)
+
+    for column, value in [("notes", "calm day"), ("name", "Eric"), ("date", pd.Timestamp("2023-01-01"))]:
+        edited = data.copy()
+        edited.loc[1, column] = value
+        assert not index.matches(edited), column
+
+    assert not index.matches(data.iloc[1:])
+
+
+def test_stored_index_is_rebuilt_when_notes_change(tmp_path):
+    csv_path = os.path.join(tmp_path, "rounds.csv")
+    data = _rounds(["windy day", "no wind"])
+    load_notes_index(data, csv_path)
+    assert os.path.exists(index_path(csv_path))
+
+    edited = data.copy()
+    edited.loc[0, "notes"] = "calm day"
+    index = load_notes_index(edited, csv_path)
+
+    assert index.search("calm") == [0] and index.search("windy") == []
+    assert NotesIndex.load(index_path(csv_path)).matches(edited)
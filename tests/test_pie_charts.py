@@ -0,0 +1,28 @@
+import plotly.graph_objects as go
+
+from utils import pie_chart_counts, pie_charts
+
+
+def test_counts_match_per_player_value_counts(data):
+    counts = pie_chart_counts(data, "birdies")
+
+    for name, rounds in data.groupby("name"):
+        assert counts.loc[name].to_dict() == rounds["birdies"].value_counts().to_dict()
+
+
+def test_figures_are_capped_and_reuse_counts(data):
+    counts = pie_chart_counts(data, "birdies")
+    players = list(data["name"].unique())
+
+    figs = pie_charts(data, "birdies", max_players=2, counts=counts)
+    assert list(figs) == players[:2]
+    assert sum(figs[players[0]].data[0].values) == (data["name"] == players[0]).sum()
+
+    rest = pie_charts(data, "birdies", players=players[2:], max_players=None, counts=counts)
+    assert list(rest) == players[2:]
+
+
+def test_subplot_grid_has_one_pie_per_player(data):
+    fig = pie_charts(data, "match_format", max_players=None, subplots=True)
+    assert isinstance(fig, go.Figure)
+    assert len(fig.data) == data.dropna(subset="match_format")["name"].nunique()
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import get_handicaps
+from aggregates import TrendPyramid, trend_levels
+from notes_index import NotesIndex
+from skill_model import SkillModel
+from forecast import HandicapForecast
+from leaderboard import Leaderboard
+from recompute_worker import RecomputeWorker, Snapshot
+
+
+def _snapshot(data:pd.DataFrame) -> Snapshot:
+    return Snapshot(data, NotesIndex.from_rounds(data), TrendPyramid.from_rounds(data), SkillModel.from_rounds(data),
+                    HandicapForecast.from_rounds(data), Leaderboard.from_rounds(data))
+
+
+@pytest.fixture
+def split(data):
+    data = get_handicaps(data.sort_values("date", kind="stable").reset_index(drop=True))
+    cut = len(data) - 12
+    return data.iloc[:cut].copy(), data.iloc[cut:].drop(columns=["handicap", "esr_reduction"]).reset_index(drop=True)
+
+
+def test_added_rounds_match_a_full_recompute(split):
+    history, added = split
+    worker = RecomputeWorker(_snapshot(history), coalesce_window=0)
+
+    for start in range(0, len(added), 5):
+        worker.submit(added.iloc[start:start + 5].to_dict("records"))
+        assert worker.wait(30)
+    snapshot = worker.snapshot
+    assert worker.error is None
+
+    full = get_handicaps(pd.concat([history, added], ignore_index=True))
+    assert np.allclose(snapshot.data["handicap"], full["handicap"], equal_nan=True)
+
+    expected = TrendPyramid.from_rounds(full, snapshot.trends.metrics)
+    for level in trend_levels:
+        table = snapshot.trends.tables[level]
+        pd.testing.assert_frame_equal(table.loc[expected.tables[level].index], expected.tables[level], check_exact=False)
+
+    for metric in ["handicap", "profit", "form"]:
+        pd.testing.assert_frame_equal(snapshot.leaderboard.top(metric, k=None), Leaderboard.from_rounds(full).top(metric, k=None))
+
+    assert len(snapshot.notes_index) == len(full)
+    assert sorted(snapshot.notes_index.search("lucky")) == sorted(NotesIndex.from_rounds(full).search("lucky"))
+
+
+def test_backdated_rounds_match_a_full_recompute(split):
+    history, added = split
+    worker = RecomputeWorker(_snapshot(history), coalesce_window=0)
+    backdated = added.iloc[:3].assign(date=history["date"].min() + pd.Timedelta(days=20))
+    worker.submit(backdated)
+    assert worker.wait(30) and worker.error is None
+
+    full = get_handicaps(pd.concat([history, backdated], ignore_index=True))
+    snapshot = worker.snapshot
+    assert np.allclose(snapshot.data["handicap"], full["handicap"].loc[snapshot.data.index], equal_nan=True)
+    pd.testing.assert_frame_equal(snapshot.leaderboard.top("handicap", k=None), Leaderboard.from_rounds(full).top("handicap", k=None))
+    pd.testing.assert_frame_equal(snapshot.forecast.forecast(), HandicapForecast.from_rounds(full).forecast())
+
+
+def test_notes_search_returns_the_right_rows_after_adding_rounds(data):
+    # Date-sorted with the file's row labels, as load_rounds() returns it
+    history = get_handicaps(data.sample(frac=1, random_state=5))
+    worker = RecomputeWorker(_snapshot(history), coalesce_window=0)
+    worker.submit({"name":"Pete", "date":"2025-06-01", "handicap_diff":9.0, "golf_course":"Muni", "notes":"zebra crossing"})
+    assert worker.wait(30) and worker.error is None
+
+    snapshot = worker.snapshot
+    assert snapshot.data.index.is_unique and (snapshot.data.loc[history.index, "notes"].equals(history["notes"]))
+    for query in ["lucky", "zebra"]:
+        labels = snapshot.notes_index.search(query)
+        assert labels and snapshot.data.loc[labels, "notes"].str.lower().str.contains(query).all()
+
+
+def test_published_snapshots_are_left_unchanged(split):
+    history, added = split
+    first = _snapshot(history)
+    weekly = first.trends.tables["week"].copy()
+    skills = first.skills.player_skills()
+    hits = first.notes_index.search("lucky")
+
+    worker = RecomputeWorker(first, coalesce_window=0)
+    worker.submit(added)
+    assert worker.wait(30) and worker.snapshot.version == 1
+
+    pd.testing.assert_frame_equal(first.trends.tables["week"], weekly)
+    pd.testing.assert_frame_equal(first.skills.player_skills(), skills)
+    assert len(first.notes_index) == len(history) and first.notes_index.search("lucky") == hits
+    assert len(first.data) == len(history)
+
+
+def test_only_the_latest_notes_fork_can_add_rounds(split):
+    history, added = split
+    index = NotesIndex.from_rounds(history)
+    fork = index.fork()
+    fork.update(added.set_axis(range(len(history), len(history) + len(added))))
+
+    assert len(index) == len(history) and len(fork) == len(history) + len(added)
+    with pytest.raises(RuntimeError):
+        index.update(added)
+
+
+def test_thread_exits_when_idle_and_restarts(split):
+    history, added = split
+    worker = RecomputeWorker(_snapshot(history), coalesce_window=0, idle_seconds=0.05)
+    assert not worker.running
+
+    worker.submit(added.iloc[:1])
+    assert worker.wait(30)
+    deadline = time.monotonic() + 5
+    while worker.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not worker.running
+
+    worker.submit(added.iloc[1:2])
+    assert worker.wait(30) and worker.snapshot.version == 2
+
+    worker.close(5)
+    assert not worker.running
+    with pytest.raises(RuntimeError):
+        worker.submit(added.iloc[2:3])
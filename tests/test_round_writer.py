@@ -0,0 +1,77 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from round_writer import RoundWriter, get_writer, atomic_write_csv
+from utils import add_round, get_handicaps
+
+
+def _round(name, day, score=85):
+    return add_round(name, f"2025-01-{day:02d}", score, 72.0, 125.0, golf_course="Hollybrook", opponent_s="Dave")
+
+
+@pytest.fixture
+def path(tmp_path, data):
+    path = str(tmp_path / "rounds.csv")
+    get_handicaps(data.iloc[:150]).to_csv(path, index=False)
+    return path
+
+
+def test_concurrent_submissions_are_batched_and_all_written(path):
+    with RoundWriter(path, batch_window=0.2) as writer:
+        acks = []
+        threads = [threading.Thread(target=lambda d=day: acks.append(writer.submit(_round("Pete", d)))) for day in range(1, 21)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(ack.result(10) for ack in acks) == 20
+        assert writer.rounds_written == 20 and writer.batches < 20
+
+    written = pd.read_csv(path, parse_dates=["date"])
+    assert len(written) == 170 and (written["date"] >= "2025-01-01").sum() == 20
+
+
+def test_handicaps_of_written_rounds_match_a_full_recompute(path):
+    with RoundWriter(path) as writer:
+        writer.submit([_round("Pete", 3, 78), _round("Dave", 4, 95)]).result(10)
+
+    written = pd.read_csv(path, parse_dates=["date"])
+    full = get_handicaps(written.drop(columns=["handicap", "esr_reduction", "counting_diff", "counting_rank"])).loc[written.index]
+    assert np.allclose(written["handicap"], full["handicap"], equal_nan=True)
+
+
+def test_rounds_written_by_another_process_are_kept(path):
+    with RoundWriter(path, handicaps=False) as writer:
+        writer.submit(_round("Pete", 1)).result(10)
+
+        # Someone else appends between this writer's batches
+        current = pd.read_csv(path)
+        atomic_write_csv(pd.concat([current, pd.DataFrame([_round("Eric", 2)])], ignore_index=True), path)
+        writer.submit(_round("Dave", 3)).result(10)
+
+    assert pd.read_csv(path)["name"].tail(3).tolist() == ["Pete", "Eric", "Dave"]
+
+
+def test_failed_write_is_reported_to_every_submitter(tmp_path):
+    path = str(tmp_path / "missing" / "rounds.csv")
+    with RoundWriter(path) as writer:
+        acks = [writer.submit(_round("Pete", day)) for day in (1, 2)]
+        for ack in acks:
+            with pytest.raises(OSError):
+                ack.result(10)
+
+
+def test_closed_writer_rejects_rounds_and_get_writer_replaces_it(path):
+    writer = get_writer(path)
+    assert get_writer(path) is writer
+
+    writer.close(10)
+    with pytest.raises(RuntimeError):
+        writer.submit(_round("Pete", 1))
+    assert get_writer(path) is not writer
+    get_writer(path).close(10)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from utils import hash_jitter, scatter
+
+
+def test_jitter_is_deterministic_and_bounded():
+    index = pd.RangeIndex(1000)
+    jitter = hash_jitter(index, strength=0.25, seed=3)
+
+    assert np.array_equal(jitter, hash_jitter(index, strength=0.25, seed=3))
+    assert not np.array_equal(jitter, hash_jitter(index, strength=0.25, seed=4))
+    assert np.abs(jitter).max() <= 0.25
+
+
+def test_jitter_follows_row_labels_not_positions():
+    index = pd.Index([10, 20, 30])
+    assert np.array_equal(hash_jitter(index)[::-1], hash_jitter(index[::-1]))
+
+
+def test_scatter_leaves_data_untouched(data):
+    before = data.copy()
+    scatter(data, "putts", seed=7)
+    pd.testing.assert_frame_equal(data, before)
+
+
+def test_scatter_switches_to_density_above_threshold(data):
+    points = scatter(data, "putts", density_threshold=None)
+    density = scatter(data, "putts", density_threshold=10)
+
+    assert points.data[0].type == "scatter"
+    assert density.data[0].type == "heatmap"
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from settlement import pairwise_ledger, balances, settle, settle_greedy, settle_optimal, zero_sum_groups
+
+
+def _rounds(rows):
+    return pd.DataFrame(rows, columns=["name", "date", "handicap_diff", "profit/loss", "opponent/s"]).assign(
+        date=lambda d: pd.to_datetime(d["date"]))
+
+
+def test_match_recorded_by_one_player_counts_in_full():
+    ledger = pairwise_ledger(_rounds([["Pete", "2024-05-01", 10.0, 4.0, "Dave"]]))
+
+    assert ledger.loc["Pete", "Dave"] == 4.0 and ledger.loc["Dave", "Pete"] == -4.0
+
+
+def test_match_recorded_by_both_players_is_averaged():
+    ledger = pairwise_ledger(_rounds([["Pete", "2024-05-01", 10.0, 4.0, "Dave"],
+                                      ["Dave", "2024-05-01", 12.0, -2.0, "Pete"],
+                                      ["Dave", "2024-05-08", 12.0, 3.0, "Pete"]]))
+
+    # (4 + 2) / 2 from the match both recorded, less the 3 only Dave recorded a week later
+    assert ledger.loc["Pete", "Dave"] == 0.0
+    assert np.allclose(ledger, -ledger.T)
+
+
+def test_group_match_splits_profit_between_opponents():
+    ledger = pairwise_ledger(_rounds([["Pete", "2024-05-01", 10.0, 6.0, "Dave, Eric"],
+                                      ["Eric", "2024-05-01", 15.0, -3.0, "Pete, Dave"]]))
+
+    assert ledger.loc["Pete", "Dave"] == 3.0 and ledger.loc["Pete", "Eric"] == 2.25
+    assert ledger.loc["Dave", "Eric"] == 1.5
+
+
+def test_balances_and_date_range(data):
+    net = balances(data)
+    assert abs(net.sum()) < 1e-9
+
+    first = data["date"].min()
+    assert balances(data, end=first - pd.Timedelta(days=1)).empty
+    assert np.allclose(balances(data, start=first).reindex(net.index), net)
+
+
+@pytest.mark.parametrize("method", ["greedy", "optimal"])
+def test_transfers_settle_every_balance(data, method):
+    net = balances(data)
+    transfers = settle(data, method=method)
+
+    paid = transfers.groupby("payee")["amount"].sum().sub(transfers.groupby("payer")["amount"].sum(), fill_value=0)
+    assert np.allclose(paid.reindex(net.index, fill_value=0), net, atol=0.01)
+    assert len(transfers) <= (net.abs() > 0.005).sum() - 1
+
+
+def test_optimal_uses_zero_sum_groups():
+    net = pd.Series({"A":5.0, "B":-5.0, "C":3.0, "D":-1.0, "E":-2.0})
+
+    assert sorted(map(sorted, zero_sum_groups(net))) == [["A", "B"], ["C", "D", "E"]]
+    assert len(settle_optimal(net)) == 3
+    assert len(settle_greedy(net)) >= 3
+
+
+def test_unknown_method_raises(data):
+    with pytest.raises(ValueError):
+        settle(data, method="fastest")
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulation import simulate_match, recent_differentials, outright_table, _hole_distributions, _outright_probs
+
+
+def _rounds(diffs:dict) -> pd.DataFrame:
+    rows = [{"name":name, "date":pd.Timestamp("2024-01-01") + pd.Timedelta(days=i), "handicap_diff":d}
+            for name, values in diffs.items() for i, d in enumerate(values)]
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def twins():
+    diffs = [8.2, 11.5, 14.1, 9.7, 12.8, 10.3, 15.6, 7.9, 13.2, 10.8]
+    return _rounds({"Pete":diffs, "Pete Again":diffs, "Dave":[d + 6 for d in diffs]})
+
+
+@pytest.mark.parametrize("match_format", ["Stroke Play", "Match Play", "Nassau"])
+def test_identical_players_are_even_and_can_tie(twins, match_format):
+    lines = simulate_match(twins, ["Pete", "Pete Again"], match_format, n_sims=200_000, use_handicaps=False, seed=3)
+
+    assert abs(lines.loc["Pete", "win_prob"] - lines.loc["Pete Again", "win_prob"]) < 0.01
+    assert lines["tie_prob"].gt(0.02).all()
+    assert np.isclose(lines["win_prob"].sum() + lines["tie_prob"].iloc[0], 1)
+
+
+def test_stroke_play_identical_rounds_always_tie():
+    data = _rounds({"Pete":[10.0] * 5, "Dave":[10.0] * 5})
+    lines = simulate_match(data, ["Pete", "Dave"], "Stroke Play", n_sims=10_000, use_handicaps=False, seed=0)
+
+    assert (lines["tie_prob"] == 1).all() and (lines["win_prob"] == 0).all()
+    assert (lines["expected_profit"] == 0).all()
+
+
+def test_stroke_play_tied_leaders_split_the_pot():
+    data = _rounds({"Pete":[10.0] * 5, "Dave":[10.0] * 5, "Eric":[20.0] * 5})
+    lines = simulate_match(data, ["Pete", "Dave", "Eric"], "Stroke Play", n_sims=1_000, stake=2.0, use_handicaps=False)
+
+    assert lines["expected_profit"].to_dict() == {"Pete":1.0, "Dave":1.0, "Eric":-2.0}
+
+
+@pytest.mark.parametrize("match_format, players", [("Stroke Play", ["Pete", "Pete Again", "Dave"]),
+                                                   ("Match Play", ["Pete", "Dave"]),
+                                                   ("Nassau", ["Pete", "Dave"]),
+                                                   ("Skins", ["Pete", "Pete Again", "Dave"])])
+def test_betting_is_zero_sum_and_the_better_player_is_favoured(twins, match_format, players):
+    lines = simulate_match(twins, players, match_format, n_sims=100_000, use_handicaps=False, seed=1)
+
+    assert abs(lines["expected_profit"].sum()) < 1e-9
+    assert lines.loc["Pete", "win_prob"] > lines.loc["Dave", "win_prob"]
+    assert lines.loc["Pete", "expected_profit"] > 0 > lines.loc["Dave", "expected_profit"]
+
+
+def test_seed_reproduces_lines(twins):
+    first = simulate_match(twins, ["Pete", "Dave"], "Skins", n_sims=50_000, use_handicaps=False, seed=9)
+    pd.testing.assert_frame_equal(first, simulate_match(twins, ["Pete", "Dave"], "Skins", n_sims=50_000, use_handicaps=False, seed=9))
+
+
+def test_two_player_formats_reject_more_players(twins):
+    with pytest.raises(ValueError):
+        simulate_match(twins, ["Pete", "Pete Again", "Dave"], "Match Play", n_sims=1_000, use_handicaps=False)
+
+
+def test_outright_odds_match_drawn_hole_scores(twins):
+    players = ["Pete", "Pete Again", "Dave"]
+    samples, counts = recent_differentials(twins, players)
+    offsets = np.zeros(len(players))
+    picks = np.array([[0], [3], [6]])
+    outright = _outright_probs(*_hole_distributions(samples, offsets, 0.9), picks)[:, 0]
+
+    # Hole scores drawn the long way: per-hole average plus normal noise, rounded to strokes
+    rng = np.random.default_rng(0)
+    means = samples[np.arange(3), picks[:, 0]] / 18
+    scores = np.rint(means[:, None] + rng.normal(0, 0.9, (3, 400_000)))
+    low = scores == scores.min(axis=0)
+    drawn = (low & (low.sum(axis=0) == 1)).mean(axis=1)
+
+    assert np.allclose(outright, drawn, atol=0.005)
+
+    table = outright_table(samples, counts, offsets, 0.9)
+    assert np.allclose(table[:, np.ravel_multi_index(picks, counts)][:, 0], outright)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from skill_model import SkillModel
+
+
+@pytest.fixture
+def rounds():
+    rng = np.random.default_rng(4)
+    skills = {"Pete":8.0, "Dave":14.0, "Eric":11.0, "Ryan":18.0}
+    offsets = {"Pine Valley":3.0, "Muni":-2.0, "Links":0.5, "Lakeside":-1.5}
+    names = rng.choice(list(skills), 4000)
+    courses = rng.choice(list(offsets), 4000)
+    diffs = [skills[n] + offsets[c] + rng.normal(0, 2) for n, c in zip(names, courses)]
+    return pd.DataFrame({"name":names, "golf_course":courses, "handicap_diff":diffs}), skills, offsets
+
+
+def test_recovers_skills_and_course_offsets(rounds):
+    data, skills, offsets = rounds
+    model = SkillModel.from_rounds(data)
+
+    fitted = model.course_offsets()["offset"]
+    expected = pd.Series(offsets) - np.mean(list(offsets.values()))
+    assert np.allclose(fitted.loc[expected.index] - fitted.mean(), expected - expected.mean(), atol=0.2)
+    assert list(model.player_skills().index) == sorted(skills, key=skills.get)
+    assert model.residual_sd == pytest.approx(2, abs=0.1)
+
+
+def test_warm_refits_match_a_cold_fit(rounds):
+    data, *_ = rounds
+    cold = SkillModel.from_rounds(data)
+
+    warm = SkillModel.from_rounds(data.iloc[:1000])
+    for start in range(1000, len(data), 20):
+        warm.update(data.iloc[start:start + 20])
+
+    pd.testing.assert_frame_equal(warm.player_skills(), cold.player_skills(), atol=1e-5)
+    pd.testing.assert_frame_equal(warm.course_offsets(), cold.course_offsets(), atol=1e-5)
+
+
+def test_new_players_and_courses_keep_existing_codes(rounds):
+    data, *_ = rounds
+    model = SkillModel.from_rounds(data)
+    players = list(model.players)
+
+    model.update(pd.DataFrame({"name":["Newbie", "Pete"], "golf_course":["Muni", "Dunes"], "handicap_diff":[25.0, 9.0]}))
+    assert list(model.players) == players + ["Newbie"] and model.courses[-1] == "Dunes"
+    assert model.predict("Newbie", "Muni") > model.predict("Pete", "Muni")
+
+
+def test_rounds_without_a_differential_or_course_are_skipped(rounds):
+    data, *_ = rounds
+    model = SkillModel.from_rounds(data)
+    assert model.update(pd.DataFrame({"name":["Pete", "Dave"], "golf_course":["Muni", None], "handicap_diff":[np.nan, 12.0]})) == 0
+    assert model.player_skills()["rounds"].sum() == len(data)
+
+
+def test_predict(rounds):
+    data, *_ = rounds
+    model = SkillModel.from_rounds(data)
+
+    # Unseen courses get no offset
+    assert model.predict("Pete", "Muni") - model.predict("Pete", "Pine Valley") == pytest.approx(-5, abs=0.3)
+    assert model.predict("Pete", "Nowhere") == pytest.approx(model._center + model._x[0][model.players.get_loc("Pete")])
+    with pytest.raises(KeyError):
+        model.predict("Nobody", "Muni")
+
+
+def test_fork_leaves_the_original_unchanged(rounds):
+    data, *_ = rounds
+    model = SkillModel.from_rounds(data.iloc[:2000])
+    skills = model.player_skills()
+
+    fork = model.fork()
+    fork.update(data.iloc[2000:])
+    pd.testing.assert_frame_equal(model.player_skills(), skills)
+    assert fork.player_skills()["rounds"].sum() == len(data)
+
+
+@pytest.mark.parametrize("column", [None, "golf_course", "handicap_diff"])
+def test_model_without_usable_rounds_is_empty(rounds, column):
+    data, *_ = rounds
+    data = data.iloc[:0] if column is None else data.assign(**{column:np.nan})
+    model = SkillModel.from_rounds(data)
+
+    assert model.player_skills().empty and list(model.player_skills().columns) == ["skill", "rounds"]
+    assert model.course_offsets().empty
+    with pytest.raises(KeyError):
+        model.predict("Pete", "Muni")
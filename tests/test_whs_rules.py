@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from utils import get_handicaps, update_handicaps
+
+
+def _player(diffs, dates=None) -> pd.DataFrame:
+    dates = pd.date_range("2023-01-01", periods=len(diffs), freq="7D") if dates is None else pd.to_datetime(dates)
+    return pd.DataFrame({"name":"Pete", "date":dates, "handicap_diff":np.asarray(diffs, dtype=float)})
+
+
+def test_exceptional_score_reduces_it_and_the_19_before():
+    data = get_handicaps(_player([15.0] * 20 + [3.0]))
+
+    # 3.0 is more than 10 strokes below the 14.4 index in effect, so it and the 19 rounds before it lose 2 strokes
+    assert data["esr_reduction"].tolist() == [0.0] * 20 + [2.0]
+    assert np.isclose(data["handicap"].iloc[-1], (1.0 + 7 * 13.0) / 8 * 0.96)
+
+    one_stroke = get_handicaps(_player([15.0] * 20 + [7.0]))
+    assert one_stroke["esr_reduction"].iloc[-1] == 1.0
+
+
+def test_soft_and_hard_caps_follow_the_low_index_of_the_past_year():
+    diffs = [2.0] * 20 + list(np.linspace(4, 40, 20))
+    data = _player(diffs)
+    capped = get_handicaps(data)["handicap"].to_numpy()
+    raw = get_handicaps(data, whs_rules=False)["handicap"].to_numpy()
+    days = data["date"].to_numpy()
+
+    assert (capped <= raw + 1e-9)[2:].all() and capped[-1] < raw[-1]
+    for i in range(20, len(diffs)):
+        recent = (days[:i] >= days[i] - np.timedelta64(365, "D")) & ~np.isnan(capped[:i])
+        low = capped[:i][recent].min()
+        expected = raw[i] if raw[i] - low <= 3 else low + 3 + (raw[i] - low - 3) / 2
+        assert np.isclose(capped[i], min(expected, low + 5))
+
+
+def test_low_index_expires_after_365_days():
+    dates = list(pd.date_range("2022-01-01", periods=20, freq="7D")) + list(pd.date_range("2024-01-01", periods=5, freq="7D"))
+    data = _player([2.0] * 20 + [40.0] * 5, dates)
+
+    # The first round back has nothing in the past year to cap against
+    assert np.isclose(get_handicaps(data)["handicap"].iloc[20], get_handicaps(data, whs_rules=False)["handicap"].iloc[20])
+
+
+def test_partial_recompute_matches_a_full_one(data):
+    data = get_handicaps(data)
+    since = data["date"].quantile(0.7)
+    players = ["Pete", "Dave"]
+
+    edited = data.copy()
+    later = edited["name"].isin(players) & (edited["date"] >= since)
+    edited.loc[later, "handicap_diff"] -= 4
+    partial, n_updated = update_handicaps(edited, players, since)
+    full = get_handicaps(edited).loc[partial.index]
+
+    assert n_updated == later.sum()
+    for column in ["handicap", "esr_reduction"]:
+        assert np.allclose(partial[column], full[column], equal_nan=True), column
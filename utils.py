@@ -1,3 +1,4 @@
+import inspect
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -5,6 +6,11 @@ import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.figure_factory as ff
+from collections import deque
+from plotly.subplots import make_subplots
+from kde import kde_curves
+from figure_cache import cached_figure
+from head_to_head import HeadToHead, h2h_labels
 
 
 label_dict = {
@@ -25,11 +31,15 @@ label_dict = {
         "notes":"Notes"
     }
 
+# Numerical and categorical features offered in the dashboard's dropdowns
+num_names = ["putts", "3_putts", "fairways_hit", "gir", "penalty/ob", "birdies", "trpl_bogeys_plus", "adj_gross_score", "profit/loss"]
+cat_names = ["golf_course", "match_format", "opponent/s"]
+
 
 def add_round(name:str, date:str, adj_gross_score:int, course_rating:float, slope_rating:float,
               putts:int=np.nan, three_putts:int=np.nan, fairways:int=np.nan, gir:int=np.nan, penalties:int=np.nan, birdies:int=np.nan,
               trpl_bogeys_plus:int=np.nan, profit_loss:float=np.nan, match_format:str=np.nan,
-              golf_course:str=np.nan, opponent_s:str=np.nan, notes:str="", calc_diff:bool=True) -> pd.Series:
+              golf_course:str=np.nan, opponent_s:str=np.nan, notes:str="", calc_diff:bool=True, course_id:int=np.nan) -> pd.Series:
 
     
     
@@ -56,6 +66,7 @@ def add_round(name:str, date:str, adj_gross_score:int, course_rating:float, slop
     notes:str | notes from the round
     calc_diff:bool | whether or not to calculate the handicap differential on the spot, could be deferred to perform vectorization if MANY rows
                         are being entered simultaneously
+    course_id:int | optional id of the course/tee in the course registry (see courses.py)
 
     Returns:
     ------------------
@@ -78,6 +89,7 @@ def add_round(name:str, date:str, adj_gross_score:int, course_rating:float, slop
         "profit/loss":profit_loss,
         "match_format":match_format,
         "golf_course":golf_course,
+        "course_id":course_id,
         "opponent/s":opponent_s,
         "notes":notes
         }
@@ -88,6 +100,91 @@ def add_round(name:str, date:str, adj_gross_score:int, course_rating:float, slop
     return row
 
 
+# Input limits shared by the entry surfaces (Streamlit form, ingestion service)
+round_limits = {
+    "adj_gross_score":(60, 200),
+    "course_rating":(60.0, 90.0),
+    "slope_rating":(55.0, 155.0)
+}
+
+# Column names accepted in place of add_round()'s argument names
+round_aliases = {
+    "3_putts":"three_putts",
+    "fairways_hit":"fairways",
+    "penalty/ob":"penalties",
+    "profit/loss":"profit_loss",
+    "opponent/s":"opponent_s"
+}
+
+
+def round_from_dict(record:dict, calc_diff:bool=True) -> dict:
+    """
+    Validate a round submitted as a dictionary (e.g. parsed JSON) and build its row with add_round()
+
+    Args:
+    ------------------
+    record:dict | add_round() arguments, or the matching column names ("3_putts", "profit/loss", ...)
+    calc_diff:bool | passed to add_round()
+
+    Returns:
+    ------------------
+    row:dict | row of data for a new round
+
+    Errors
+    -----------
+    ValueError listing every problem found with the record
+    """
+
+    if not isinstance(record, dict):
+        raise ValueError(f"a round must be an object of fields, got {type(record).__name__}")
+
+    params = inspect.signature(add_round).parameters
+    kwargs, errors = {}, []
+
+    for key, value in record.items():
+        arg = round_aliases.get(key, key)
+        if arg not in params or arg == "calc_diff":
+            errors.append(f"unknown field {key!r}")
+        elif value is not None:
+            kwargs[arg] = value
+
+    for arg, param in params.items():
+        if param.default is inspect.Parameter.empty and arg not in kwargs:
+            errors.append(f"missing required field {arg!r}")
+
+    # Coerce to the annotated types
+    for arg, value in list(kwargs.items()):
+        annotation = params[arg].annotation
+        try:
+            if arg == "date":
+                kwargs[arg] = pd.to_datetime(value)
+                if pd.isna(kwargs[arg]):
+                    raise ValueError
+            elif annotation in (int, float):
+                if isinstance(value, bool):
+                    raise ValueError
+                number = float(value)
+                if annotation is int and not (np.isnan(number) or number.is_integer()):
+                    raise ValueError
+                kwargs[arg] = number if annotation is float or np.isnan(number) else int(number)
+            elif annotation is str and not isinstance(value, str):
+                raise ValueError
+        except (ValueError, TypeError):
+            errors.append(f"{arg} must be {'a date' if arg == 'date' else annotation.__name__}, got {value!r}")
+
+    if isinstance(kwargs.get("name"), str) and not kwargs["name"].strip():
+        errors.append("name must not be blank")
+
+    for arg, (low, high) in round_limits.items():
+        if isinstance(kwargs.get(arg), (int, float)) and not low <= kwargs[arg] <= high:
+            errors.append(f"{arg} must be between {low} and {high}, got {kwargs[arg]}")
+
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    return add_round(**kwargs, calc_diff=calc_diff)
+
+
 # Perform handicap diff calculation on whole dataframe
 def handicap_differentials(data:pd.DataFrame) -> pd.Series:
     """
@@ -183,64 +280,382 @@ def generate_data(data:pd.DataFrame, player_list:list=["Pete", "Dave", "Eric", "
 
 
 
-def get_handicaps(data:pd.DataFrame):
+# Number of lowest differentials used and the adjustment applied, indexed by number of recorded rounds (see handicap_rds.csv)
+diffs_used = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4, 5, 5, 6, 6, 7, 8])
+diff_adjustment = np.array([np.nan, np.nan, np.nan, -2, -1, 0, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+
+
+def player_order(data:pd.DataFrame):
+    """
+    Sort each player's rounds by date, the shared partition/sort step of the handicap calculations
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source of data
+
+    Returns:
+    -----------------
+    order:np.ndarray | positions of data's rows grouped by player and sorted by date (ties keep their row order)
+    codes:np.ndarray | player code of each row in that order
+    n_rounds:np.ndarray | number of rounds the player has recorded up to and including each row, in that order
+    """
+
+    codes, _ = pd.factorize(data["name"])
+    order = np.lexsort((data["date"].to_numpy(), codes))
+    codes = codes[order]
+
+    starts = np.r_[0, np.flatnonzero(np.diff(codes)) + 1]
+    n_rounds = np.arange(len(codes)) - np.repeat(starts, np.diff(np.r_[starts, len(codes)])) + 1
+
+    return order, codes, n_rounds
+
+
+def differential_windows(diffs:np.ndarray, codes:np.ndarray, window:int=20, rows:np.ndarray=None) -> np.ndarray:
+    """
+    For each round, the differentials of the player's most recent rounds up to and including it, in one vectorized pass
+
+    Args:
+    -----------------
+    diffs:np.ndarray | handicap differentials grouped by player and sorted by date
+    codes:np.ndarray | player code of each differential
+    window:int | number of most recent rounds in each window
+    rows:np.ndarray | optional positions to build windows for, defaults to every round
+
+    Returns:
+    -----------------
+    windows:np.ndarray | rounds x window array, oldest first, padded with nan before a player's first round
+    """
+
+    # Pad the front of each player's rounds so no window reaches back into the previous player
+    group_idx = np.r_[0, np.cumsum(np.diff(codes) != 0)]
+    padded_pos = np.arange(len(diffs)) + (window - 1) * (group_idx + 1)
+
+    padded = np.full(len(diffs) + (window - 1) * (group_idx[-1] + 1 if len(diffs) else 0), np.nan)
+    padded[padded_pos] = diffs
+
+    starts = padded_pos - (window - 1)
+    if rows is not None:
+        starts = starts[rows]
+
+    return np.lib.stride_tricks.sliding_window_view(padded, window)[starts]
+
+
+def handicap_from_windows(windows:np.ndarray, n_rounds:np.ndarray) -> np.ndarray:
+    """
+    Average of the lowest differentials in each window, times 0.96, plus the adjustment for the number of rounds recorded
+
+    Args:
+    -----------------
+    windows:np.ndarray | rounds x 20 array from differential_windows()
+    n_rounds:np.ndarray | number of rounds recorded as of each window
+
+    Returns:
+    -----------------
+    handicaps:np.ndarray | handicap index as of each round, nan before the 3rd round
+    """
+
+    n_rounds = np.minimum(n_rounds, len(diffs_used) - 1)
+    k = diffs_used[n_rounds]
+
+    # Sorting 20 values per row is as cheap as partitioning, and gives every k at once
+    lowest = np.nancumsum(np.sort(windows, axis=1), axis=1)
+    total = lowest[np.arange(len(windows)), np.maximum(k - 1, 0)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(k > 0, total / k * 0.96 + diff_adjustment[n_rounds], np.nan)
+
+
+def _counting_ranks(diffs:np.ndarray, codes:np.ndarray, n_rounds:np.ndarray):
+    """
+    Rank of each round within its player's current 20-round window, and whether it is one of the lowest differentials counted
+    toward the current handicap index
+
+    Args:
+    -----------------
+    diffs:np.ndarray | handicap differentials grouped by player and sorted by date
+    codes:np.ndarray | player code of each differential
+    n_rounds:np.ndarray | number of rounds recorded as of each differential
+
+    Returns:
+    -----------------
+    counting:np.ndarray | True for rounds counting toward the player's current index
+    ranks:np.ndarray | 1 for the lowest differential in the current window, nan for rounds outside of it
+    """
+
+    counting = np.zeros(len(diffs), dtype=bool)
+    ranks = np.full(len(diffs), np.nan)
+    if len(diffs) == 0:
+        return counting, ranks
+
+    # Only each player's latest window matters for the current index
+    last = np.r_[np.flatnonzero(np.diff(codes)), len(codes) - 1]
+    windows = differential_windows(diffs, codes, rows=last)
+    window = windows.shape[1]
+
+    window_ranks = np.empty(windows.shape, dtype=int)
+    np.put_along_axis(window_ranks, np.argsort(windows, axis=1, kind="stable"), np.arange(1, window + 1)[None, :], axis=1)
+
+    # Column j of a window holds the round (window - 1 - j) rounds before the player's latest one
+    positions = last[:, None] - np.arange(window - 1, -1, -1)[None, :]
+    in_window = np.arange(window)[None, :] >= window - np.minimum(n_rounds[last], window)[:, None]
+    k = diffs_used[np.minimum(n_rounds[last], len(diffs_used) - 1)]
+
+    ranks[positions[in_window]] = window_ranks[in_window]
+    counting[positions[in_window]] = (window_ranks <= k[:, None])[in_window]
+
+    return counting, ranks
+
+
+def apply_whs_rules(handicaps:np.ndarray, diffs:np.ndarray, dates:np.ndarray, codes:np.ndarray, n_rounds:np.ndarray,
+                    recompute:np.ndarray=None, stored_esr:np.ndarray=None):
+    """
+    Apply the World Handicap System rules that depend on a player's history, in one linear pass over the rounds:
+
+    - Exceptional score reduction: a differential 7.0+ (10.0+) strokes below the index in effect when it was played reduces
+      that differential and the 19 before it by 1 (2)
+    - Soft cap: once 20 rounds are recorded, any increase of more than 3.0 above the low handicap index is halved
+    - Hard cap: the index can't exceed the low handicap index by more than 5.0
+
+    The low handicap index is the lowest index from rounds played in the 365 days before each round, tracked with a time-based
+    monotonic deque so every round is pushed and popped at most once
+
+    Args:
+    -----------------
+    handicaps:np.ndarray | indexes from handicap_from_windows(), grouped by player and sorted by date
+    diffs:np.ndarray | handicap differentials in the same order
+    dates:np.ndarray | round dates in the same order
+    codes:np.ndarray | player code of each round
+    n_rounds:np.ndarray | number of rounds recorded as of each round
+    recompute:np.ndarray | optional boolean mask of rounds to recompute, the rest keep the values in handicaps/stored_esr and
+                           only seed the running state
+    stored_esr:np.ndarray | previously computed reductions, required with recompute
+
+    Returns:
+    -----------------
+    handicaps:np.ndarray | indexes with the rules applied
+    esr:np.ndarray | exceptional score reduction triggered by each round
+    """
+
+    esr = np.zeros(len(diffs)) if stored_esr is None else np.nan_to_num(np.asarray(stored_esr, dtype=float))
+    window = len(diffs_used) - 1
+
+    # Plain Python values, the loop is per round and numpy scalar access would dominate it
+    index_list, esr_list = handicaps.tolist(), esr.tolist()
+    diff_list, code_list, n_list = diffs.tolist(), codes.tolist(), n_rounds.tolist()
+    days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64).tolist()
+    recompute = [True] * len(diffs) if recompute is None else recompute.tolist()
+    nan = float("nan")
+
+    # Cumulative reductions before each of the player's rounds, so a window's adjustment is a difference of two totals
+    esr_before = [0.0] * len(diffs)
+
+    for i in range(len(diffs)):
+        if i == 0 or code_list[i] != code_list[i - 1]:
+            first, total, prev_index, low = i, 0.0, nan, deque()
+
+        esr_before[i] = total
+
+        if recompute[i]:
+            reduction = 0.0
+            if diff_list[i] <= prev_index - 10:
+                reduction = 2.0
+            elif diff_list[i] <= prev_index - 7:
+                reduction = 1.0
+            esr_list[i] = reduction
+
+            index = index_list[i]
+            start = max(first, i - window + 1)
+            if total + reduction - esr_before[start] > 0 and index == index:
+                # Rare path: reductions inside this window, redo the lowest-k average on the adjusted differentials
+                n_used = min(n_list[i], window)
+                adjusted = np.sort(diffs[start:i + 1] - (total + reduction - np.array(esr_before[start:i + 1])))
+                index = float(adjusted[:diffs_used[n_used]].mean() * 0.96 + diff_adjustment[n_used])
+
+            while low and low[0][0] < days[i] - 365:
+                low.popleft()
+
+            if n_list[i] > window and low and index == index:
+                low_index = low[0][1]
+                if index - low_index > 3:
+                    index = low_index + 3 + (index - low_index - 3) / 2
+                index = min(index, low_index + 5)
+
+            index_list[i] = index
+
+        total += esr_list[i]
+
+        if index_list[i] == index_list[i]:
+            prev_index = index_list[i]
+            while low and low[-1][1] >= prev_index:
+                low.pop()
+            low.append((days[i], prev_index))
+
+    handicaps, esr = np.array(index_list, dtype=float), np.array(esr_list, dtype=float)
+
+    return handicaps, esr
+
+
+def _handicap_engine(data:pd.DataFrame, whs_rules:bool=True, recompute_since:pd.Timestamp=None):
+    """
+    Shared handicap calculation: partition/sort, windowed lowest-k averages, WHS rules and counting flags
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source of data
+    whs_rules:bool | whether to apply apply_whs_rules()
+    recompute_since:pd.Timestamp | optional date, earlier rounds keep their stored handicap and esr_reduction values
+
+    Returns:
+    -----------------
+    order:np.ndarray | positions of data's rows in player/date order
+    columns:dict | handicap, esr_reduction, counting_diff, counting_rank arrays in that order
+    recompute:np.ndarray | mask of the rounds whose handicap was recomputed, in that order
+    """
+
+    order, codes, n_rounds = player_order(data)
+    diffs = data["handicap_diff"].to_numpy(dtype=float)[order]
+    dates = data["date"].to_numpy()[order]
+
+    recompute = np.ones(len(order), dtype=bool)
+    if recompute_since is not None:
+        recompute = dates >= np.datetime64(pd.Timestamp(recompute_since))
+
+    # Every player's windows of their 20 most recent differentials in one pass
+    rows = np.flatnonzero(recompute)
+    handicaps = data["handicap"].to_numpy(dtype=float)[order] if recompute_since is not None else np.empty(len(order))
+    handicaps[rows] = handicap_from_windows(differential_windows(diffs, codes, rows=rows), n_rounds[rows])
+
+    stored_esr = data["esr_reduction"].to_numpy(dtype=float)[order] \
+        if recompute_since is not None and "esr_reduction" in data.columns else None
+
+    if whs_rules:
+        handicaps, esr = apply_whs_rules(handicaps, diffs, dates, codes, n_rounds, recompute, stored_esr)
+    else:
+        esr = np.zeros(len(order))
+
+    # The current index uses each differential less every reduction from it up to the player's latest round
+    grouped = pd.Series(esr).groupby(codes)
+    esr_remaining = (grouped.transform("sum") - grouped.cumsum() + esr).to_numpy()
+    counting, ranks = _counting_ranks(diffs - esr_remaining, codes, n_rounds)
+
+    columns = {"handicap":handicaps, "esr_reduction":esr, "counting_diff":counting, "counting_rank":ranks}
+
+    return order, columns, recompute
+
+
+def _assign_columns(data:pd.DataFrame, index:pd.Index, order:np.ndarray, columns:dict):
+    """
+    Write arrays computed in player/date order back to the rows of data they belong to
+    """
+    for column, values in columns.items():
+        if column not in data.columns:
+            data[column] = np.nan
+        if values.dtype == bool:
+            data[column] = data[column].eq(True)
+        data.loc[index[order], column] = values
+
+
+def counting_differentials(data:pd.DataFrame) -> pd.DataFrame:
+    """
+    Flag the rounds whose differentials count toward each player's current handicap index
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source of data
+
+    Returns:
+    -----------------
+    flags:pd.DataFrame | counting_diff (bool) and counting_rank (1 = lowest differential in the current window) aligned with data
+    """
+
+    order, columns, _ = _handicap_engine(data)
+
+    flags = pd.DataFrame(index=data.index)
+    for column in ["counting_diff", "counting_rank"]:
+        values = np.empty(len(data), dtype=columns[column].dtype)
+        values[order] = columns[column]
+        flags[column] = values
+
+    return flags
+
+
+def get_handicaps(data:pd.DataFrame, whs_rules:bool=True):
     """
     Get handicap values for each player in the data based on the required logic/calculations
 
     Args:
     -----------------
     data:pd.DataFrame | source of data
+    whs_rules:bool | whether to apply the soft/hard caps and exceptional score reductions (see apply_whs_rules())
 
     Returns:
     -----------------
-    data:pd.DataFrame | updated data with new handicap column
+    data:pd.DataFrame | updated data with new handicap column, the esr_reduction triggered by each round, and
+                        counting_diff/counting_rank columns marking the rounds that count toward each player's current index
     """
 
     # Sort the DataFrame by date
-    data = data.sort_values(by="date")
-    
-    # Initialize the handicap column
-    data['handicap'] = np.nan
-    
-    # Process each player individually
-    for player in data["name"].unique():
-        player_df = data.loc[data["name"] == player].reset_index(drop=True)
-        
-        for i, row in player_df.iterrows():
-            if i < 2:
-                player_df.loc[i, "handicap"] = np.nan
-            elif i == 2:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].min() * 0.96 - 2
-            elif i == 3:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].min() * 0.96 - 1
-            elif i == 4:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].min() * 0.96
-            elif i == 5:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(2).mean() * 0.96 - 1
-            elif 6 <= i <= 7:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(2).mean() * 0.96
-            elif 8 <= i <= 10:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(3).mean() * 0.96
-            elif 11 <= i <= 13:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(4).mean() * 0.96
-            elif 14 <= i <= 15:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(5).mean() * 0.96
-            elif 16 <= i <= 17:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(6).mean() * 0.96
-            elif i == 18:
-                player_df.loc[i, "handicap"] = player_df.loc[:i, "handicap_diff"].nsmallest(7).mean() * 0.96
-            elif i >= 19:
-                player_df.loc[i, "handicap"] = player_df.loc[i-20:i, "handicap_diff"].nsmallest(8).mean() * 0.96
-        
-        # Update the main DataFrame with the calculated handicaps
-        data.loc[data["name"] == player, "handicap"] = player_df["handicap"].values
+    data = data.sort_values(by="date", kind="stable")
+
+    order, columns, _ = _handicap_engine(data, whs_rules)
+
+    for column, values in columns.items():
+        unsorted = np.empty(len(data), dtype=values.dtype)
+        unsorted[order] = values
+        data[column] = unsorted
 
     return data
 
 
-# Dead function
+def update_handicaps(data:pd.DataFrame, players:list, since:pd.Timestamp, whs_rules:bool=True):
+    """
+    Recompute handicaps only for the given players' rounds on or after a date, e.g. after some of their differentials changed
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source of data with handicap_diff, handicap and esr_reduction columns
+    players:list | names of the players whose differentials changed
+    since:pd.Timestamp | date of the earliest round whose differential changed
+    whs_rules:bool | whether to apply the soft/hard caps and exceptional score reductions
+
+    Returns:
+    -----------------
+    data:pd.DataFrame | copy of the data with the affected handicaps recomputed
+    n_updated:int | number of handicap values recomputed
+    """
+
+    data = data.copy()
+    if "handicap" not in data.columns:
+        data["handicap"] = np.nan
+
+    # Earlier rounds only provide context for the windows and the WHS rules, their handicaps are left alone
+    player_rows = data.loc[data["name"].isin(players)]
+    order, columns, recompute = _handicap_engine(player_rows, whs_rules, recompute_since=since)
+    _assign_columns(data, player_rows.index, order, columns)
+
+    return data, int(recompute.sum())
+
+
+def current_handicaps(data:pd.DataFrame) -> pd.Series:
+    """
+    Most recent handicap index for each player with a valid handicap
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source of data with a handicap column
+
+    Returns:
+    -----------------
+    handicaps:pd.Series | latest handicap indexed by player name
+    """
+    return data.dropna(subset="handicap").sort_values(by="date", kind="stable").groupby("name")["handicap"].last()
+
+
 def fill_handicaps(data:pd.DataFrame) -> pd.DataFrame:
-    """ Apply the get_handicap() function for each player in the data for 5, 10, and 20 round windows
+    """ Handicaps over the most recent 5, 10, and 20 round windows plus a current-form index, for every player in one pass.
+    Each window size uses the same lowest-differentials table as get_handicaps(), with the number of rounds capped at the window size.
+    The form index is the average of the player's last 5 differentials times 0.96. These are raw windows, without the WHS caps or
+    exceptional score reductions applied by get_handicaps()
 
     Args:
     -----------------
@@ -251,20 +666,64 @@ def fill_handicaps(data:pd.DataFrame) -> pd.DataFrame:
     df: pd.DataFrame | the supplied dataframe with added columns for each window of handicap
     """
 
-    data = data.sort_values(by="date")
-    
-    for name in data["name"].unique():
-        values = get_handicap(data.loc[data["name"] == name], window=5)
-        data.loc[data["name"] == name, "fiveRd_handicap"] = values
-    
-        data.loc[data["name"] == name, "tenRd_handicap"] = get_handicap(data.loc[data["name"] == name], window=10)
-    
-        data.loc[data["name"] == name, "twentyRd_handicap"] = get_handicap(data.loc[data["name"] == name], window=20)
+    data = data.sort_values(by="date", kind="stable")
+
+    # Partition/sort once and build the widest window, the narrower windows are its most recent columns
+    order, codes, n_rounds = player_order(data)
+    recent = differential_windows(data["handicap_diff"].to_numpy(dtype=float)[order], codes, window=20)
+
+    columns = {}
+    for size, column in [(5, "fiveRd_handicap"), (10, "tenRd_handicap"), (20, "twentyRd_handicap")]:
+        columns[column] = handicap_from_windows(recent[:, -size:], np.minimum(n_rounds, size))
+
+    with np.errstate(invalid="ignore"):
+        columns["form_index"] = np.where(n_rounds >= 5, recent[:, -5:].mean(axis=1) * 0.96, np.nan)
+
+    for column, values in columns.items():
+        unsorted = np.empty(len(data))
+        unsorted[order] = values
+        data[column] = unsorted
 
     return data
     
         
-def plot_statistics(data, column, color_map:dict = {"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}):
+def add_forecast_band(fig:go.Figure, last:pd.DataFrame, forecast:pd.DataFrame, column:str, color_map:dict):
+    """ Draw projected values as a dashed line and prediction band per player, starting from each player's last plotted point
+
+    Args:
+    ------------------
+    fig:go.Figure | figure to draw on
+    last:pd.DataFrame | indexed by player: date and value (column) of the last point plotted for them
+    forecast:pd.DataFrame | output of HandicapForecast.forecast()
+    column:str | handicap (projected index) or handicap_diff (projected level), other columns are left without a forecast
+    color_map:dict | dictionary of values to ensure color-coding-consistency across plots
+    """
+
+    if not len(forecast) or column not in ("handicap", "handicap_diff"):
+        return
+
+    prefix = "index" if column == "handicap" else "diff"
+    for name, player in forecast.groupby("name", sort=False):
+        if name not in last.index:
+            continue
+        color = color_map.get(name, "#636EFA")
+        band = f"rgba{(*px.colors.hex_to_rgb(color), 0.15)}" if color.startswith("#") else color
+
+        # Start the projection from the player's last plotted value so it joins the line
+        start = pd.Series([last.at[name, column]])
+        dates = pd.concat([pd.Series([last.at[name, "date"]]), player["date"]], ignore_index=True)
+        low, high, mean = (pd.concat([start, player[f"{prefix}_{stat}"]], ignore_index=True) for stat in ["low", "high", "mean"])
+
+        fig.add_trace(go.Scatter(x=pd.concat([dates, dates[::-1]]), y=pd.concat([high, low[::-1]]), fill="toself", fillcolor=band,
+                                 line={"width":0}, hoverinfo="skip", showlegend=False, legendgroup=name))
+        fig.add_trace(go.Scatter(x=dates, y=mean, mode="lines", line={"color":color, "dash":"dash"}, name=f"{name} (Forecast)",
+                                 legendgroup=name, customdata=np.stack([low, high], axis=-1),
+                                 hovertemplate=f"<b>{name}</b> forecast<br>%{{x|%Y-%m-%d}}<br>Expected: %{{y:.2f}}<br>"
+                                               "Interval: %{customdata[0]:.2f} - %{customdata[1]:.2f}<extra></extra>"))
+
+
+@cached_figure
+def plot_statistics(data, column, color_map:dict = {"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}, forecast:pd.DataFrame=None):
 
     """ Creates a line plot of data tracking the values of a given column over time
 
@@ -273,22 +732,79 @@ def plot_statistics(data, column, color_map:dict = {"Dave":'#636EFA', "Pete":'#E
     data:pd.DataFrame | source of data for the values in the plot
     column:str | name of the column from data to plot
     color_map:dict | dictionary of values to ensure color-coding-consistency across plots
+    forecast:pd.DataFrame | optional output of HandicapForecast.forecast(), drawn as a dashed line and band after each player's
+                            last round when plotting handicap (projected index) or handicap_diff (projected level)
 
     Returns:
     ------------------
-    fig: px.Figure | plotly figure of a lineplot
+    fig: px.Figure | plotly figure of a lineplot, with the differentials counting toward each player's current index highlighted
+                     when plotting handicap_diff and data has a counting_diff column (see counting_differentials())
     """
     
     fig = px.line(data_frame=data.dropna(subset=column),\
                   x="date", y=column, color="name", color_discrete_map=color_map, markers=True, hover_name="name",\
                  title=f"{label_dict[column]} Over Time", labels={"date":"Date", column:label_dict[column]},
                  hover_data={"name":False})
+
+    if column == "handicap_diff" and "counting_diff" in data.columns:
+        counting = data.loc[data["counting_diff"].fillna(False).astype(bool)]
+        fig.add_trace(go.Scatter(x=counting["date"], y=counting[column], mode="markers", name="Counting Toward Index",
+                                 marker={"symbol":"star", "size":13, "color":"gold", "line":{"color":"black", "width":1}},
+                                 customdata=np.stack([counting["name"], counting["counting_rank"]], axis=-1),
+                                 hovertemplate="<b>%{customdata[0]}</b><br>Handicap Differential: %{y:.2f}<br>"
+                                               "Rank in Current Window: %{customdata[1]}<extra></extra>"))
+
+    if forecast is not None:
+        last = data.dropna(subset=column).sort_values("date", kind="stable").groupby("name").tail(1)
+        add_forecast_band(fig, last.set_index("name")[["date", column]], forecast, column, color_map)
     
     fig.update_layout(legend={"title":"Player Name"})
 
     return fig
 
 
+@cached_figure
+def plot_bucketed_statistics(data, column, period:str, color_map:dict = {"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'},
+                             forecast:pd.DataFrame=None):
+
+    """ Creates a line plot of per-bucket means over time, with a band from each bucket's min to its max
+
+    Args:
+    ------------------
+    data:pd.DataFrame | bucketed values from TrendPyramid.query(): name, date, mean, min, max, count
+    column:str | name of the aggregated column, used for labels
+    period:str | bucket size shown in the title, e.g. "Weekly"
+    color_map:dict | dictionary of values to ensure color-coding-consistency across plots
+    forecast:pd.DataFrame | optional output of HandicapForecast.forecast(), drawn after each player's last bucket
+
+    Returns:
+    ------------------
+    fig: go.Figure | plotly figure of one mean line and min-max band per player
+    """
+
+    fig = go.Figure()
+    for name, player in data.groupby("name", sort=False):
+        color = color_map.get(name, "#636EFA")
+        band = f"rgba{(*px.colors.hex_to_rgb(color), 0.15)}" if color.startswith("#") else color
+
+        fig.add_trace(go.Scatter(x=pd.concat([player["date"], player["date"][::-1]]), y=pd.concat([player["max"], player["min"][::-1]]),
+                                 fill="toself", fillcolor=band, line={"width":0}, hoverinfo="skip", showlegend=False, legendgroup=name))
+        fig.add_trace(go.Scatter(x=player["date"], y=player["mean"], mode="lines+markers", name=name, legendgroup=name,
+                                 line={"color":color}, customdata=player[["min", "max", "count"]],
+                                 hovertemplate=f"<b>{name}</b><br>%{{x|%Y-%m-%d}}<br>Mean: %{{y:.2f}}<br>"
+                                               "Range: %{customdata[0]:.0f} - %{customdata[1]:.0f}<br>Rounds: %{customdata[2]}<extra></extra>"))
+
+    if forecast is not None:
+        last = data.sort_values("date").groupby("name").tail(1).set_index("name")
+        add_forecast_band(fig, last[["date", "mean"]].rename(columns={"mean":column}), forecast, column, color_map)
+
+    fig.update_layout(title=f"{period} {label_dict[column]} Over Time", xaxis_title="Date", yaxis_title=label_dict[column],
+                      legend={"title":"Player Name"})
+
+    return fig
+
+
+@cached_figure
 def histplot(data:pd.DataFrame, column:str, color_map:dict = {"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}):
     """ Display the distribution of a continuous numeric variable
 
@@ -316,6 +832,7 @@ def histplot(data:pd.DataFrame, column:str, color_map:dict = {"Dave":'#636EFA',
     return fig_h
 
 
+@cached_figure
 def pie_chart(data:pd.DataFrame, column:str, player:str=None):
     """
     Pie chart that shows the proportions of fairways hit, gir, 3 putts, penalties - the sub-categories of score
@@ -350,13 +867,88 @@ def pie_chart(data:pd.DataFrame, column:str, player:str=None):
         return fig
 
 
-def dist_plot(data:pd.DataFrame, column:str):
+def pie_chart_counts(data:pd.DataFrame, column:str) -> pd.Series:
+    """
+    Value counts of a column for every player, computed in a single grouped pass
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source data containing the records of golf rounds
+    column:str | name of the metric for which the proportions will be counted
+
+    Returns:
+    -----------------
+    counts:pd.Series | number of rounds indexed by (name, value)
+    """
+
+    # Sorted index keeps numeric values in ascending order, like the category_orders of pie_chart()
+    return data.groupby(["name", column]).size()
+
+
+def pie_charts(data:pd.DataFrame, column:str, players:list=None, max_players:int=9, subplots:bool=False,
+               counts:pd.Series=None, cols:int=3):
+    """
+    Batched version of pie_chart() that builds the pie charts for many players from one shared groupby result
+
+    Args:
+    -----------------
+    data:pd.DataFrame | source data containing the records of golf rounds
+    column:str | name of the metric for which the proportions will be shown
+    players:list | optional names of the players to chart, defaults to every player with a value for the column
+    max_players:int | cap on the number of players rendered eagerly, None to render all of them
+    subplots:bool | if True return a single subplot grid figure, otherwise a dict of per-player figures
+    counts:pd.Series | optional output of pie_chart_counts() to reuse, e.g. when rendering the remaining players later
+    cols:int | number of columns in the subplot grid
+
+    Returns:
+    -----------------
+    figs:dict | {player: go.Figure} of donut charts, or a single go.Figure grid if subplots is True
+    """
+
+    if counts is None:
+        counts = pie_chart_counts(data, column)
+
+    if players is None:
+        players = pd.unique(counts.index.get_level_values("name"))
+    players = [p for p in players if p in counts.index.get_level_values("name")]
+    if max_players is not None:
+        players = players[:max_players]
+
+    numeric = pd.api.types.is_numeric_dtype(data[column])
+
+    def make_pie(player):
+        player_counts = counts.loc[player]
+        return go.Pie(labels=player_counts.index.astype(str), values=player_counts.values, hole=.5, name=player,
+                      sort=not numeric, hovertemplate=f"{label_dict[column]}: %{{label}}<br>Rounds: %{{value}}<extra>{player}</extra>")
+
+    if subplots:
+        rows = max(int(np.ceil(len(players) / cols)), 1)
+        fig = make_subplots(rows=rows, cols=cols, specs=[[{"type":"domain"}] * cols] * rows, subplot_titles=players)
+        for idx, player in enumerate(players):
+            fig.add_trace(make_pie(player), row=idx // cols + 1, col=idx % cols + 1)
+        fig.update_layout(title=f"Proportion of {label_dict[column]} by Player", height=350 * rows,
+                          legend={"title":label_dict[column]})
+        return fig
+
+    figs = {}
+    for player in players:
+        fig = go.Figure(make_pie(player))
+        fig.update_layout(title=f"{player}'s Proportion of {label_dict[column]}", legend={"title":player})
+        figs[player] = fig
+
+    return figs
+
+
+@cached_figure
+def dist_plot(data:pd.DataFrame, column:str, bandwidth="scott"):
     """
     Function to generate a plotly figure of KDE distributions for selected columns 
 
     Args
     -----------
     data: pd.DataFrame | data with columns: "name" and continuous variable of interest
+    column:str | continuous variable of interest
+    bandwidth:str|float | kernel bandwidth rule, "scott", "silverman", or a fixed value (see kde.bandwidths())
 
     Returns
     -----------
@@ -371,15 +963,14 @@ def dist_plot(data:pd.DataFrame, column:str):
     fig = go.Figure()
 
     colors = px.colors.qualitative.Vivid
-    
-    for i, player in enumerate(data["name"].unique()):
-        player_data = data.loc[data["name"]== player][column]
 
-        player_kde = ff.create_distplot([player_data], group_labels=[player], show_hist=False, show_rug=False)
+    # KDE curves for every player in one batched pass
+    curves = kde_curves(data, column, bandwidth=bandwidth)
     
+    for i, player in enumerate(curves.columns):
         # Player KDE Plot
-        fig.add_trace(go.Scatter(x=player_kde['data'][0]['x'], y=player_kde['data'][0]['y'], 
-                                 mode='lines', name=player, fill='tozeroy', line=dict(color=colors[i]), opacity=0.9,
+        fig.add_trace(go.Scatter(x=curves.index, y=curves[player], 
+                                 mode='lines', name=player, fill='tozeroy', line=dict(color=colors[i % len(colors)]), opacity=0.9,
                                  hoverinfo='x', xhoverformat=".2f", hovertemplate=f'{column.replace("_", " ").title()}: %{{x:.2f}}'))
     
     # Update layout
@@ -394,6 +985,7 @@ def dist_plot(data:pd.DataFrame, column:str):
     return fig
 
 
+@cached_figure
 def mean_med_stats(data:pd.DataFrame, column:str, color_map:dict={"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}):
     """
     Function to generate a plotly barplots of mean and median column values
@@ -438,6 +1030,7 @@ def mean_med_stats(data:pd.DataFrame, column:str, color_map:dict={"Dave":'#636EF
 
 
 
+@cached_figure
 def rolling_avg(data:pd.DataFrame, column:str, window:int, color_map:dict={"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}):
     """
     Function to generate a plotly lineplot of rolling mean column values
@@ -469,18 +1062,99 @@ def rolling_avg(data:pd.DataFrame, column:str, window:int, color_map:dict={"Dave
     return fig
 
 
+def hash_jitter(index:pd.Index, strength:float=0.25, seed:int=0) -> np.ndarray:
+    """
+    Deterministic jitter derived from the row labels, so the same round lands in the same place on every rerun
+
+    Args:
+    -------------
+    index:pd.Index | row labels of the data being plotted
+    strength:float | jitter is drawn from [-strength, strength)
+    seed:int | seed mixed into the hash stream
+
+    Returns:
+    -------------
+    jitter:np.ndarray | one offset per row
+    """
+
+    # splitmix64 finalizer over the hashed labels
+    with np.errstate(over="ignore"):
+        z = pd.util.hash_array(np.asarray(index)) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+
+    uniform = (z >> np.uint64(11)).astype(float) * 2.0 ** -53
+    return (uniform * 2 - 1) * strength
+
+
+@cached_figure
+def density_scatter(data:pd.DataFrame, column:str, bins:int=30, cols:int=3):
+    """
+    Server-side 2D-binned density of adjusted gross score vs a contributing column, one panel per player.
+    Used in place of a point cloud when there are too many rounds to send every point to the browser
+
+    Args:
+    -------------
+    data:pd.DataFrame | source of data
+    column:str | selected contributing column, i.e. 3-putts, putts, fairways, gir, etc
+    bins:int | maximum number of bins along each axis
+    cols:int | number of columns in the subplot grid
+
+    Returns:
+    --------------
+    fig:plotly.graph_objects.Figure | heatmaps of round counts per (column, score) bin for each player
+    """
+
+    plot_data = data.dropna(subset=[column, "adj_gross_score"])
+    codes, players = pd.factorize(plot_data["name"])
+    x = plot_data[column].to_numpy(dtype=float)
+    y = plot_data["adj_gross_score"].to_numpy(dtype=float)
+
+    # Integer-valued stats get one bin per value, capped at bins
+    x_edges = np.histogram_bin_edges(x, bins=int(min(bins, max(np.ptp(x), 1) + 1)))
+    y_edges = np.histogram_bin_edges(y, bins=int(min(bins, max(np.ptp(y), 1) + 1)))
+    nx, ny = len(x_edges) - 1, len(y_edges) - 1
+    x_bin = np.clip(np.searchsorted(x_edges, x, side="right") - 1, 0, nx - 1)
+    y_bin = np.clip(np.searchsorted(y_edges, y, side="right") - 1, 0, ny - 1)
+
+    # Every player's 2D histogram in a single bincount
+    counts = np.bincount((codes * ny + y_bin) * nx + x_bin, minlength=len(players) * ny * nx).reshape(len(players), ny, nx)
+    counts = np.where(counts > 0, counts, np.nan)
+
+    x_mid = (x_edges[:-1] + x_edges[1:]) / 2
+    y_mid = (y_edges[:-1] + y_edges[1:]) / 2
+    rows = max(int(np.ceil(len(players) / cols)), 1)
+
+    fig = make_subplots(rows=rows, cols=cols, subplot_titles=list(players), shared_xaxes=True, shared_yaxes=True)
+    for idx, player in enumerate(players):
+        fig.add_trace(go.Heatmap(x=x_mid, y=y_mid, z=counts[idx], name=player, coloraxis="coloraxis",
+                                 hovertemplate=f"{label_dict[column]}: %{{x:.1f}}<br>Adj. Score: %{{y:.1f}}<br>Rounds: %{{z}}<extra>{player}</extra>"),
+                      row=idx // cols + 1, col=idx % cols + 1)
+
+    fig.update_layout(title=f"Adj Score vs {label_dict[column]}<br><sup>Density of Rounds for Each Player</sup>",
+                      coloraxis={"colorscale":"Viridis", "colorbar":{"title":"Rounds"}}, height=350 * rows)
+    fig.update_xaxes(title_text=label_dict[column], row=rows)
+    fig.update_yaxes(title_text="Adj. Score", col=1)
+
+    return fig
+
+
+@cached_figure
 def scatter(data:pd.DataFrame, column:str, color_map:dict={"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}, size:str=None,
-           jitter_strength=0.25):
+           jitter_strength=0.25, seed:int=0, density_threshold:int=5000):
     """
     Scatterplot of adjusted gross score on the y-axis vs a selected contributing column on the x-axis
 
     Args:
     -------------
-    data:pd.DataFrame | source of data
+    data:pd.DataFrame | source of data, it is not modified
     column:str | selected contributing column, i.e. 3-putts, putts, fairways, gir, etc
     color_map:dict | color mapping to ensure color-consistency
     size:str | optional additional contributing column to include more dimensions
     jitter_strenght:float | amount of jitter for the x-axis values
+    seed:int | seed for the hash-based jitter, the same seed always gives the same plot
+    density_threshold:int | above this many rounds a per-player density view is returned instead, None to always plot points
 
     Returns:
     --------------
@@ -488,14 +1162,19 @@ def scatter(data:pd.DataFrame, column:str, color_map:dict={"Dave":'#636EFA', "Pe
     
     """
 
+    if density_threshold is not None and data[column].notna().sum() > density_threshold:
+        return density_scatter(data, column)
+
     if size:
         title = f"Adj Score vs {label_dict[column]} with {label_dict[size]} as Size<br><sup>X-Jittered for Visibility (Integer values will appear slightly offset)</sup>"
     else:
         title = f"Adj Score vs {label_dict[column]}<br><sup>X-Jittered for Visibility (Integer values will appear slightly offset)</sup>"
 
-    data["jittered_col"] = data[column] + np.random.uniform(-jitter_strength, jitter_strength, size=len(data))
+    # Only the plotted columns are copied, the caller's frame is left alone
+    plot_data = data[["name", "adj_gross_score", column] + ([size] if size and size != column else [])]
+    plot_data = plot_data.assign(jittered_col=plot_data[column] + hash_jitter(plot_data.index, jitter_strength, seed))
     
-    fig = px.scatter(data_frame=data, x="jittered_col", y="adj_gross_score", color="name", color_discrete_map=color_map, size=size,
+    fig = px.scatter(data_frame=plot_data, x="jittered_col", y="adj_gross_score", color="name", color_discrete_map=color_map, size=size,
                      hover_name="name", labels={"adj_gross_score":"Adj. Score", "jittered_col":label_dict[column]}, 
                      title = title, hover_data={"name":False, "jittered_col":":.0f"})
 
@@ -564,6 +1243,7 @@ def find_round(data:pd.DataFrame, name:str, date:pd.Timestamp='2024-07-22'):
         return fig
 
 
+@cached_figure
 def total_profit(data:pd.DataFrame, color_map:dict={"Dave":'#636EFA', "Pete":'#EF553B', "Eric":'#00CC96'}):
     """
     Display the total +/- for a player's records in the data
@@ -588,6 +1268,7 @@ def total_profit(data:pd.DataFrame, color_map:dict={"Dave":'#636EFA', "Pete":'#E
 
 
 # -----------------------------------Make this more general for categorical and columnar selection ----------------------
+@cached_figure
 def agg_features_by_cat(data:pd.DataFrame, category:str, feature:str, aggfunc:str):
     """
     Display the PnL by match format
@@ -616,6 +1297,32 @@ def agg_features_by_cat(data:pd.DataFrame, category:str, feature:str, aggfunc:st
     return fig
 
 
+
+@cached_figure
+def head_to_head_heatmap(data:pd.DataFrame, metric:str="profit/loss"):
+    """
+    Heatmap of a head-to-head metric for every player against every opponent
+
+    Args:
+    ---------------
+    data:pd.DataFrame | source of data
+    metric:str | one of ["rounds", "profit/loss", "diff_gap", "win_rate"]
+
+    Returns:
+    ----------------
+    fig:plotly.express.figure | player x opponent heatmap
+    """
+
+    matrix = HeadToHead.from_rounds(data).matrices()[metric]
+
+    midpoint = {"rounds":None, "profit/loss":0, "diff_gap":0, "win_rate":.5}[metric]
+    fig = px.imshow(matrix, text_auto=True if metric == "rounds" else ".2f", color_continuous_midpoint=midpoint,
+                    color_continuous_scale="Blues" if metric == "rounds" else ("RdBu_r" if metric == "diff_gap" else "RdBu"),
+                    labels={"x":"Opponent", "y":"Player Name", "color":h2h_labels[metric]},
+                    title=f"Head-to-Head {h2h_labels[metric]}<br><sup>Each Row is a Player's Record Against Each Opponent</sup>")
+
+    return fig
+
         
 def explanation_of_plots():
     """